@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark: per-token delta handling for long streamed replies.
+
+Compares the legacy handler loop (regex split per token, code-interpreter
+regex rebuilt and run over the whole accumulated reply, string
+concatenation) against StreamDeltaProcessor.
+
+    python scripts/benchmarks/bench_delta_processor.py --tokens 10000
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+api_root = os.path.join(project_root, "src", "api")
+if api_root not in sys.path:
+    sys.path.insert(0, api_root)
+
+from entities_api.inference.delta_processor import \
+    StreamDeltaProcessor  # noqa: E402
+
+REASONING_PATTERN = re.compile(r"(<think>|</think>)")
+
+
+def build_tokens(n_tokens, with_code):
+    """Splits a synthetic reply into ~4 character tokens, tags split on purpose."""
+    reasoning = "<think>" + "let me think about this. " * (n_tokens // 10) + "</think>"
+    text = "Here is a long and detailed answer. " * (n_tokens // 3)
+    body = reasoning + text
+    if with_code:
+        body += (
+            '{"name": "code_interpreter", "arguments": {"code": "'
+            + "print('hello world')\n" * (n_tokens // 12)
+            + '"}}'
+        )
+    tokens = [body[i : i + 4] for i in range(0, len(body), 4)]
+    return tokens[:n_tokens]
+
+
+def legacy_loop(tokens):
+    """The pre-refactor per-token logic shared by the provider handlers."""
+
+    def parse_code_interpreter_partial(text):
+        pattern = re.compile(
+            r"""
+            \{\s*['"]name['"]\s*:\s*['"]code_interpreter['"]\s*,\s*
+            ['"]arguments['"]\s*:\s*\{\s*['"]code['"]\s*:\s*
+            (?P<code>.*)
+        """,
+            re.VERBOSE | re.DOTALL,
+        )
+        match = pattern.search(text)
+        return {"code": match.group("code").strip()} if match else None
+
+    def process_code_chunks(content_chunk, code_buffer):
+        results = []
+        code_buffer += content_chunk
+        if "\n" in code_buffer:
+            newline_pos = code_buffer.find("\n") + 1
+            results.append(
+                json.dumps({"type": "hot_code", "content": code_buffer[:newline_pos]})
+            )
+            code_buffer = code_buffer[newline_pos:]
+        if len(code_buffer) > 100:
+            results.append(json.dumps({"type": "hot_code", "content": code_buffer}))
+            code_buffer = ""
+        return results, code_buffer
+
+    out = []
+    assistant_reply = accumulated = reasoning = ""
+    in_reasoning = code_mode = False
+    code_buffer = ""
+    for token in tokens:
+        for seg in REASONING_PATTERN.split(token):
+            if not seg:
+                continue
+            if seg in ("<think>", "</think>"):
+                in_reasoning = seg == "<think>"
+                reasoning += seg
+                out.append(json.dumps({"type": "reasoning", "content": seg}))
+                continue
+            if in_reasoning:
+                reasoning += seg
+                out.append(json.dumps({"type": "reasoning", "content": seg}))
+                continue
+            assistant_reply += seg
+            accumulated += seg
+            partial = parse_code_interpreter_partial(accumulated)
+            if not code_mode and partial:
+                code_mode = True
+                code_buffer = partial.get("code", "")
+                out.append(json.dumps({"type": "hot_code", "content": "```python\n"}))
+                continue
+            if code_mode:
+                results, code_buffer = process_code_chunks(seg, code_buffer)
+                out.extend(results)
+                continue
+            out.append(json.dumps({"type": "content", "content": seg}))
+    return out
+
+
+def processor_loop(tokens):
+    out = []
+    processor = StreamDeltaProcessor()
+    for token in tokens:
+        for event in processor.feed(token):
+            out.append(json.dumps(event))
+    for event in processor.flush():
+        out.append(json.dumps(event))
+    processor.assistant_reply  # noqa: B018 - join once, as the handlers do
+    return out
+
+
+def timed(fn, tokens, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(tokens)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<28}{'legacy (s)':>12}{'processor (s)':>15}{'speedup':>10}")
+    for label, with_code in (("plain reply", False), ("reply + code_interpreter", True)):
+        tokens = build_tokens(args.tokens, with_code)
+        legacy = timed(legacy_loop, tokens, args.repeat)
+        new = timed(processor_loop, tokens, args.repeat)
+        print(f"{label:<28}{legacy:>12.4f}{new:>15.4f}{legacy / new:>9.1f}x")
+        print(f"{'':<28}{'per token (us)':>12}{new / len(tokens) * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Benchmark: thread-to-event-loop chunk hand-off and SSE framing.
+
+Runs K concurrent streams of N canonical JSON delta chunks produced by a
+blocking generator thread and compares:
+
+* legacy  - per-chunk ``run_coroutine_threadsafe(...).result()`` hand-off,
+            ``json.loads``/``json.dumps`` per chunk, optional
+            ``asyncio.sleep(0.01)`` per chunk (``--legacy-sleep``)
+* bridge  - ChunkBridge batches + SSECoalescer frames
+* typed   - as bridge, with StreamChunk objects encoded once at the edge
+
+Reports chunks/s, SSE frames and CPU time per stream.
+
+    python scripts/benchmarks/bench_stream_bridge.py --tokens 5000 --streams 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+api_root = os.path.join(project_root, "src", "api")
+if api_root not in sys.path:
+    sys.path.insert(0, api_root)
+
+from entities_api.utils.stream_bridge import (ChunkBridge,  # noqa: E402
+                                              sse_frames,
+                                              start_thread_producer)
+from entities_api.utils.stream_chunk import StreamChunk  # noqa: E402
+
+
+def produce(n_tokens, token_interval, typed=False):
+    for i in range(n_tokens):
+        if token_interval:
+            time.sleep(token_interval)
+        if typed:
+            yield StreamChunk("content", f"tok{i % 10} ")
+        else:
+            yield json.dumps({"type": "content", "content": f"tok{i % 10} "})
+
+
+async def legacy_stream(n_tokens, token_interval, sleep):
+    """The previous run_sync_generator_in_thread + stream_generator loop."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=10)
+    done = object()
+
+    def run():
+        for item in produce(n_tokens, token_interval):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    task = loop.run_in_executor(None, run)
+    frames = 0
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        chunk_data = json.loads(item)
+        chunk_data.setdefault("type", "content")
+        "data: " + json.dumps(chunk_data) + "\n\n"
+        frames += 1
+        if sleep:
+            await asyncio.sleep(0.01)
+    await task
+    return frames
+
+
+async def bridge_stream(n_tokens, token_interval, typed=False):
+    bridge = ChunkBridge()
+    start_thread_producer(bridge, produce, n_tokens, token_interval, typed)
+    frames = 0
+    async for _ in sse_frames(bridge):
+        frames += 1
+    return frames
+
+
+async def run_case(name, factory, streams, n_tokens):
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    frames = await asyncio.gather(*(factory() for _ in range(streams)))
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    total_chunks = streams * n_tokens
+    print(
+        f"{name:<14} wall {wall:7.3f}s  {total_chunks / wall:11,.0f} chunks/s  "
+        f"frames/stream {sum(frames) / streams:8.1f}  "
+        f"CPU/stream {cpu / streams * 1000:8.2f} ms  "
+        f"CPU/chunk {cpu / total_chunks * 1e6:6.2f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument(
+        "--token-interval-ms",
+        type=float,
+        default=0.0,
+        help="Simulated provider pacing between tokens",
+    )
+    parser.add_argument(
+        "--legacy-sleep",
+        action="store_true",
+        help="Include the old per-chunk asyncio.sleep(0.01) (slow)",
+    )
+    args = parser.parse_args()
+    interval = args.token_interval_ms / 1000
+
+    print(f"{args.streams} streams x {args.tokens} chunks")
+
+    async def bench():
+        await run_case(
+            "legacy",
+            lambda: legacy_stream(args.tokens, interval, args.legacy_sleep),
+            args.streams,
+            args.tokens,
+        )
+        await run_case(
+            "bridge",
+            lambda: bridge_stream(args.tokens, interval),
+            args.streams,
+            args.tokens,
+        )
+        await run_case(
+            "typed",
+            lambda: bridge_stream(args.tokens, interval, typed=True),
+            args.streams,
+            args.tokens,
+        )
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Benchmark: context window truncation on long threads.
+
+Builds threads of N messages with precomputed token counts (so tokenizer
+cost is excluded) and compares:
+
+* legacy  - the previous ConversationTruncator.truncate: pop(0) until the
+            tail fits, re-sort with ``conversation.index``, merge roles
+* planner - truncation_strategies.apply_truncation with each strategy
+
+    python scripts/benchmarks/bench_truncation.py --messages 1000 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+api_root = os.path.join(project_root, "src", "api")
+if api_root not in sys.path:
+    sys.path.insert(0, api_root)
+
+from entities_api.services.truncation_strategies import (  # noqa: E402
+    TRUNCATION_STRATEGIES, apply_truncation, build_truncation_strategy)
+
+
+def build_thread(n_messages, seed=7):
+    rng = random.Random(seed)
+    roles = ("user", "assistant", "assistant", "tool")
+    messages = [{"role": "system", "content": "system prompt"}]
+    for i in range(n_messages - 1):
+        messages.append({"role": roles[i % len(roles)], "content": f"message {i}"})
+    counts = [rng.randint(20, 400) for _ in messages]
+    return messages, counts
+
+
+def legacy_truncate(conversation, counts, threshold_tokens):
+    """The previous algorithm, with token counts looked up instead of encoded."""
+    count_of = {id(m): c for m, c in zip(conversation, counts)}
+    system_messages = [m for m in conversation if m.get("role") == "system"]
+    other_messages = [m for m in conversation if m.get("role") != "system"]
+    system_token_count = sum(count_of[id(m)] for m in system_messages)
+    other_token_count = sum(count_of[id(m)] for m in other_messages)
+    if system_token_count + other_token_count <= threshold_tokens:
+        return legacy_merge(conversation)
+
+    optimal_other_tokens = threshold_tokens - system_token_count
+    truncated_other = other_messages.copy()
+    while truncated_other and other_token_count > optimal_other_tokens:
+        other_token_count -= count_of[id(truncated_other.pop(0))]
+
+    truncated = system_messages + truncated_other
+    truncated.sort(key=lambda m: conversation.index(m))
+    return legacy_merge(truncated)
+
+
+def legacy_merge(conversation):
+    if not conversation:
+        return conversation
+    merged = [dict(conversation[0])]
+    for msg in conversation[1:]:
+        last = merged[-1]
+        if msg.get("role") == last.get("role"):
+            last["content"] = f"{last.get('content', '')}\n{msg.get('content', '')}"
+        else:
+            merged.append(dict(msg))
+    return merged
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument(
+        "--keep",
+        type=float,
+        default=0.25,
+        help="Fraction of the thread's tokens that fits the budget",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_messages in args.messages:
+        messages, counts = build_thread(n_messages)
+        budget = sum(counts) * args.keep
+        print(f"\n{n_messages} messages, budget {budget:,.0f} tokens")
+
+        seconds, expected = timed(
+            lambda: legacy_truncate(messages, counts, budget), args.repeat
+        )
+        print(f"  {'legacy':<18} {seconds * 1000:10.2f} ms  kept {len(expected)}")
+
+        for name in TRUNCATION_STRATEGIES:
+            strategy = build_truncation_strategy(name)
+            seconds, result = timed(
+                lambda: apply_truncation(messages, counts, budget, strategy),
+                args.repeat,
+            )
+            note = ""
+            if name == "sliding_window":
+                note = "  (matches legacy)" if result == expected else "  (MISMATCH)"
+            print(f"  {name:<18} {seconds * 1000:10.2f} ms  kept {len(result)}{note}")
+
+
+if __name__ == "__main__":
+    main()
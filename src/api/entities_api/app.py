@@ -1,14 +1,23 @@
 #
 #!/usr/bin/env python
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from projectdavid_common import UtilsInterface
 from sqlalchemy import create_engine, text
 
+from entities_api.inference.async_openai_client import \
+    close_async_openai_client
+from entities_api.inference.client_pool import get_client_pool
+from entities_api.inference.provider_registry import (
+    configured_warmup_models, get_provider_registry)
 from entities_api.models.models import Base
 from entities_api.routers import \
     api_router  # This central router includes all decoupled routers
+from entities_api.routers.metrics_router import router as metrics_router
+from entities_api.workers.run_worker import start_in_process_worker
 
 # Initialize the logging utility
 logging_utility = UtilsInterface.LoggingUtility()
@@ -21,9 +30,28 @@ SPECIAL_DB_URL = os.getenv("SPECIAL_DB_URL")
 special_engine = create_engine(SPECIAL_DB_URL, echo=True) if SPECIAL_DB_URL else None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the provider registry up front and optionally warm the configured
+    # models (handler instances + tokenizers) before serving traffic.
+    registry = get_provider_registry()
+    warmup_models = configured_warmup_models()
+    if warmup_models:
+        logging_utility.info(f"Warming inference providers: {warmup_models}")
+        await asyncio.to_thread(registry.warmup, warmup_models)
+    # Only with RUN_EXECUTION=queue and the in-memory queue backend.
+    run_worker = start_in_process_worker()
+    yield
+    if run_worker is not None:
+        await asyncio.to_thread(run_worker.stop)
+    await close_async_openai_client()
+    get_client_pool().close()
+
+
 def create_app(init_db=True):
     logging_utility.info("Creating FastAPI app")
     app = FastAPI(
+        lifespan=lifespan,
         title="Entities",
         description="API for AI inference",
         version="1.0.0",
@@ -34,6 +62,8 @@ def create_app(init_db=True):
 
     # Include the central API router with all decoupled routers under the /v1 prefix
     app.include_router(api_router, prefix="/v1")
+    # Prometheus scrape endpoint, unversioned.
+    app.include_router(metrics_router)
 
     @app.get("/")
     def read_root():
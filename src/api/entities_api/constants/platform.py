@@ -55,6 +55,39 @@ MODEL_MAP = {
 }
 
 
+# ------------------------------------------------
+# The same open model served by several vendors.
+# Hedged streams (INFERENCE_HEDGING) and failovers
+# away from an open circuit may send a request to
+# any other member of the group.
+# _________________________________________________
+MODEL_EQUIVALENCE_MAP = {
+    "deepseek-v3": [
+        "hyperbolic/deepseek-ai/DeepSeek-V3",
+        "together-ai/deepseek-ai/DeepSeek-V3",
+        "deepseek-ai/deepseek-chat",
+    ],
+    "deepseek-r1": [
+        "hyperbolic/deepseek-ai/DeepSeek-R1",
+        "together-ai/deepseek-ai/DeepSeek-R1",
+        "deepseek-ai/deepseek-reasoner",
+    ],
+    "llama-3.3-70b": [
+        "hyperbolic/meta-llama/Llama-3.3-70B-Instruct",
+        "together-ai/meta-llama/Llama-3.3-70B-Instruct-Turbo",
+    ],
+}
+
+# Hedges and circuit-breaker failovers never reuse the caller's key with
+# another vendor; they run under the platform's own key for that vendor
+# (keyed by provider name, i.e. ASYNC_PROVIDER).
+PROVIDER_PLATFORM_API_KEY_ENV = {
+    "Hyperbolic": "HYPERBOLIC_API_KEY",
+    "TogetherAI": "TOGETHER_API_KEY",
+    "DeepSeek": "DEEPSEEK_API_KEY",
+}
+
+
 WEB_SEARCH_BASE_URL = "http://localhost:8080/"
 
 # Extend SUPPORTED_MIME_TYPES and define helper
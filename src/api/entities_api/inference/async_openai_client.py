@@ -0,0 +1,136 @@
+"""
+Shared asyncio client for OpenAI-compatible chat completion streams.
+
+Hyperbolic, Together and DeepSeek all expose the OpenAI
+``/chat/completions`` SSE protocol. Instead of one blocking SDK iterator
+(and one executor thread) per stream, every async handler streams through
+a single ``httpx.AsyncClient`` per event loop, so connections are pooled
+across providers and API keys and a worker can hold thousands of
+concurrent streams.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+try:  # HTTP/2 needs the optional ``h2`` package (httpx[http2]).
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ProviderStreamError(RuntimeError):
+    """
+    Raised when a provider rejects a stream (``status_code`` set) or reports
+    an error inside it.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncOpenAICompatibleClient:
+    """
+    Streams ``(content, reasoning_content)`` deltas from any
+    OpenAI-compatible endpoint. Base URL and API key are supplied per call,
+    so one instance (and one connection pool) serves every provider.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = int(
+            os.getenv("INFERENCE_HTTP_MAX_CONNECTIONS", "2000")
+        ),
+        max_keepalive_connections: int = 200,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+    ):
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+
+    async def stream_chat_completion(
+        self, base_url: str, api_key: str, payload: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[str, str]]:
+        url = f"{base_url.rstrip('/')}/chat/completions"
+        body = {key: value for key, value in payload.items() if value is not None}
+        body["stream"] = True
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        request = self.client.stream("POST", url, json=body, headers=headers)
+        async with request as response:
+            if response.status_code >= 400:
+                detail = (await response.aread()).decode("utf-8", "replace")
+                raise ProviderStreamError(
+                    f"HTTP {response.status_code} from {url}: {detail[:500]}",
+                    status_code=response.status_code,
+                )
+
+            async for line in response.aiter_lines():
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logging_utility.warning("Skipping malformed SSE line: %s", data)
+                    continue
+
+                if chunk.get("object") == "error" or "error" in chunk:
+                    error = chunk.get("error") or chunk
+                    if isinstance(error, dict):
+                        error = error.get("message")
+                    raise ProviderStreamError(str(error or "Unknown provider error"))
+
+                choices = chunk.get("choices")
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or {}
+                content = delta.get("content") or ""
+                reasoning = delta.get("reasoning_content") or ""
+                if content or reasoning:
+                    yield content, reasoning
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+# httpx.AsyncClient binds to the loop that first uses it; keep one per loop.
+_clients: Dict[asyncio.AbstractEventLoop, AsyncOpenAICompatibleClient] = {}
+
+
+def get_async_openai_client(
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> AsyncOpenAICompatibleClient:
+    """Returns the shared client for the running event loop."""
+    loop = loop or asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        for stale in [known for known in _clients if known.is_closed()]:
+            del _clients[stale]
+        client = _clients[loop] = AsyncOpenAICompatibleClient()
+    return client
+
+
+async def close_async_openai_client() -> None:
+    """Closes the client for the running loop (call on application shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
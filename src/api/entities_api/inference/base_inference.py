@@ -1,4 +1,5 @@
 import abc
+import asyncio
 import base64
 import inspect
 import json
@@ -9,20 +10,17 @@ import re
 import threading
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
-from functools import lru_cache
-from typing import Any, Callable, Dict, Generator, Optional
+from functools import lru_cache, partial
+from typing import (Any, AsyncGenerator, AsyncIterator, Callable, Dict,
+                    Generator, Iterable, Iterator, List, Optional, Tuple,
+                    Union)
 
-import httpx
 from openai import OpenAI
-from projectdavid import Entity
-from projectdavid.clients.actions_client import ActionsClient
-from projectdavid.clients.assistants_client import AssistantsClient
 from projectdavid.clients.files_client import FileClient
-from projectdavid.clients.messages_client import MessagesClient
-from projectdavid.clients.runs import RunsClient
 from projectdavid.clients.threads_client import ThreadsClient
-from projectdavid.clients.tools_client import ToolsClient
 from projectdavid.clients.users_client import UsersClient
 from projectdavid.clients.vectors import VectorStoreClient
 from projectdavid_common import ValidationInterface
@@ -35,16 +33,86 @@ from entities_api.constants.assistant import (
     WEB_SEARCH_PRESENTATION_FOLLOW_UP_INSTRUCTIONS)
 from entities_api.constants.platform import (ERROR_NO_CONTENT,
                                              SPECIAL_CASE_TOOL_HANDLING)
+from entities_api.inference.async_openai_client import \
+    get_async_openai_client
+from entities_api.inference.client_pool import get_client_pool
+from entities_api.inference.completion_cache import get_completion_cache
+from entities_api.inference.concurrency_governor import \
+    get_concurrency_governor
+from entities_api.inference.delta_processor import (
+    CODE_INTERPRETER_PATTERN, StreamDeltaProcessor)
+from entities_api.inference.hedging import (build_hedge_legs, hedging_enabled,
+                                             provider_leg, race_first_token)
+from entities_api.inference.provider_health import get_provider_health
+from entities_api.inference.stream_metrics import (STREAM_CANCELLED,
+                                                   STREAM_COMPLETED,
+                                                   STREAM_DISCONNECTED,
+                                                   STREAM_FAILED, StreamTimer,
+                                                   get_stream_metrics)
+from entities_api.inference.tool_call_recognizer import ToolCallRecognizer
+from entities_api.inference.turn_state import begin_turn, current_turn
 from entities_api.platform_tools.code_interpreter.code_execution_client import \
     StreamOutput
 from entities_api.platform_tools.platform_tool_service import \
     PlatformToolService
+from entities_api.services.action_waiter import (OUTCOME_COMPLETED,
+                                                 OUTCOME_EXPIRED,
+                                                 OUTCOME_RUN_STATUS,
+                                                 OUTCOME_TOOL_OUTPUT,
+                                                 TERMINAL_ACTION_STATUSES,
+                                                 ActionWaitResult,
+                                                 get_action_waiter)
+from entities_api.services.cancellation_registry import \
+    get_cancellation_registry
 from entities_api.services.conversation_truncator import ConversationTruncator
 from entities_api.services.logging_service import LoggingUtility
+from entities_api.services.service_gateway import (GATEWAY_MODE_IN_PROCESS,
+                                                    get_service_gateway)
+from entities_api.services.thread_context_cache import \
+    get_thread_context_cache
+from entities_api.services.truncation_strategies import PIN_KEY, strip_pins
+from entities_api.system_message.system_prompt import \
+    get_system_prompt_assembler
+from entities_api.utils.async_to_sync import iterate_sync_in_thread
+from entities_api.utils.stream_chunk import StreamChunk, as_chunk
 
 logging_utility = LoggingUtility()
+
+# Handlers yield StreamChunk objects; some tool paths still yield JSON text.
+Chunk = Union[StreamChunk, str]
 validator = ValidationInterface()
 
+# Creates action records for tool calls recognised mid-stream, so the
+# database round trip overlaps with the tail of the provider stream.
+_action_prep_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="action-prep"
+)
+
+# Runs the platform tools of a parallel tool-call turn side by side.
+_tool_call_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_CALL_WORKERS", "8")),
+    thread_name_prefix="tool-call",
+)
+
+
+@lru_cache(maxsize=1)
+def _tool_call_timeouts() -> Tuple[float, Dict[str, float]]:
+    """Default and per-tool timeouts (seconds) for parallel tool calls."""
+    default = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", "60"))
+    raw = os.getenv("TOOL_CALL_TIMEOUTS", "").strip()
+    try:
+        per_tool = {name: float(value) for name, value in json.loads(raw).items()}
+    except (ValueError, AttributeError, TypeError):
+        if raw:
+            logging_utility.warning("Ignoring malformed TOOL_CALL_TIMEOUTS: %s", raw)
+        per_tool = {}
+    return default, per_tool
+
+
+def tool_call_timeout(tool_name: str) -> float:
+    default, per_tool = _tool_call_timeouts()
+    return per_tool.get(tool_name, default)
+
 
 class MissingParameterError(ValueError):
     """Specialized error for missing service parameters"""
@@ -60,7 +128,14 @@ class AuthenticationError(PermissionError):
 
 class BaseInference(ABC):
 
-    REASONING_PATTERN = re.compile(r"(<think>|</think>)")
+    # Native asyncio streaming (see ``astream``). Handlers for
+    # OpenAI-compatible providers set ASYNC_PROVIDER to opt in.
+    ASYNC_PROVIDER: Optional[str] = None
+    PROVIDER_BASE_URL_ENV: Optional[str] = None
+    PROVIDER_DEFAULT_BASE_URL: Optional[str] = None
+    PROVIDER_API_KEY_ENV: Optional[str] = None
+    STREAM_PARAMS: Dict[str, Any] = {"max_tokens": None, "temperature": 0.6}
+    SPLIT_REASONING = True
 
     def __init__(
         self,
@@ -78,66 +153,27 @@ class BaseInference(ABC):
         self.assistant_id = assistant_id
         self.thread_id = thread_id
         self.available_functions = available_functions
-        self._cancelled = False
         self._services = {}
         self.code_interpreter_response = False
-        self.tool_response = None
-        self.function_call = None
-        self.client = Together(api_key=os.getenv("TOGETHER_API_KEY"))
-
-        # Instantiate the default OpenAI client
-        try:
-            self.openai_client = OpenAI(
-                api_key=os.getenv("TOGETHER_API_KEY"),
-                base_url=self.base_url,
-                timeout=httpx.Timeout(30.0, read=30.0),
-            )
-        except Exception as e:
-            logging_utility.error(
-                "Failed to initialize default OpenAI client: %s", e, exc_info=True
-            )
-            self.openai_client = None
-
-        # Instantiate the default Together client
-        try:
-            self.together_client = Together(
-                api_key=os.getenv("TOGETHER_API_KEY"),
-            )
-
-        except Exception as e:
-            logging_utility.error(
-                "Failed to initialize default OpenAI client: %s", e, exc_info=True
-            )
-            self.openai_client = None
-
-        # 2. Initialize the default project_david client
-        project_david_api_key = os.getenv("ADMIN_API_KEY")
-
-        project_david_base_url = self.base_url
-
-        try:
-            if not project_david_api_key:
-                raise ConfigurationError("ADMIN_API_KEY is not set.")
-            if not project_david_base_url:
-                raise ConfigurationError(
-                    "Base URL for Project David client is not set."
-                )
-
-            self.project_david_client = Entity(
-                api_key=project_david_api_key,
-                base_url=project_david_base_url,
-                # time out handled internally
-            )
-            logging_utility.debug(
-                "Default project_david client initialized successfully."
-            )
-        except Exception as e:
-            logging_utility.error(
-                "Failed to initialize default project_david client: %s",
-                e,
-                exc_info=True,
-            )
-            self.project_david_client = None  # Ensure it's None on failure
+        self._assistant_tools: Dict[str, list] = {}
+        self._assistant_meta: Dict[str, dict] = {}
+        # Context assembly time of the latest window built per thread.
+        self._context_seconds: Dict[str, float] = {}
+        self._prepared_actions: Dict[Tuple[str, str, str], Future] = {}
+        self._prepared_actions_lock = threading.Lock()
+
+        # Provider SDK clients come from the process-wide client pool (see
+        # openai_client / together_client). Platform services (messages,
+        # runs, actions, ...) are reached through the shared gateway:
+        # in-process by default, HTTP as fallback.
+        self.service_gateway = get_service_gateway()
+        self.cancellation_registry = get_cancellation_registry()
+        self.context_cache = get_thread_context_cache()
+        self.completion_cache = get_completion_cache()
+        self.governor = get_concurrency_governor()
+        self.provider_health = get_provider_health()
+        self.system_prompts = get_system_prompt_assembler()
+        self.stream_metrics = get_stream_metrics()
 
         self.truncator_params = {
             "model_name": model_name,
@@ -221,121 +257,37 @@ class BaseInference(ABC):
             except Exception as e:
                 raise AuthenticationError(f"Credential validation failed: {str(e)}")
 
-    @lru_cache(maxsize=32)
+    @property
+    def openai_client(self) -> OpenAI:
+        """Default OpenAI-compatible client from the shared pool."""
+        return get_client_pool().openai(os.getenv("TOGETHER_API_KEY"), self.base_url)
+
+    @property
+    def together_client(self) -> Together:
+        """Default TogetherAI client from the shared pool."""
+        return get_client_pool().together(os.getenv("TOGETHER_API_KEY"))
+
     def _get_together_client(
         self, api_key: Optional[str], base_url: Optional[str] = None
     ) -> Together:
         """
-        Retrieves or creates a Project David client for the given API key.
-        Uses an LRU cache for reuse. If api_key is None, returns the default client.
-        """
-        if api_key:
-            logging_utility.debug("Creating client for specific key (not cached).")
-            try:
-                return Together(
-                    api_key=api_key,
-                    # base_url=base_url,
-                )
-            except Exception as e:
-                logging_utility.error(
-                    "Failed to create specific TogetherAI client: %s",
-                    e,
-                    exc_info=True,
-                )
-                if self.together_client:
-                    logging_utility.warning(
-                        "Falling back to default client due to error."
-                    )
-                    return self.together_client
-                else:
-                    raise RuntimeError(
-                        "Default TogetherAI client is not initialized, and specific client creation failed."
-                    )
-        else:
-            if self.together_client:
-                logging_utility.debug(
-                    "Using default project_david client (no specific key provided)."
-                )
-                return self.together_client
-            else:
-                raise RuntimeError("Default TogetherAI client is not initialized.")
-
-    @lru_cache(maxsize=32)
-    def _get_project_david_client(
-        self, api_key: Optional[str], base_url: Optional[str] = None
-    ) -> Entity:
-        """
-        Retrieves or creates a Project David client for the given API key.
-        Uses an LRU cache for reuse. If api_key is None, returns the default client.
+        Returns the pooled TogetherAI client for ``api_key``, or the default
+        client when no key is given.
         """
-        if api_key:
-            logging_utility.debug("Creating client for specific key (not cached).")
-            try:
-                return Entity(
-                    api_key=api_key,
-                    base_url=base_url,
-                )
-            except Exception as e:
-                logging_utility.error(
-                    "Failed to create specific project_david client: %s",
-                    e,
-                    exc_info=True,
-                )
-                if self.project_david_client:
-                    logging_utility.warning(
-                        "Falling back to default client due to error."
-                    )
-                    return self.project_david_client
-                else:
-                    raise RuntimeError(
-                        "Default project_david client is not initialized, and specific client creation failed."
-                    )
-        else:
-            if self.project_david_client:
-                logging_utility.debug(
-                    "Using default project_david client (no specific key provided)."
-                )
-                return self.project_david_client
-            else:
-                raise RuntimeError("Default project_david client is not initialized.")
+        if not api_key:
+            return self.together_client
+        return get_client_pool().together(api_key)
 
-    @lru_cache(maxsize=32)
     def _get_openai_client(
         self, api_key: Optional[str], base_url: Optional[str] = None
     ) -> OpenAI:
         """
-        Retrieves or creates an OpenAI client for the given API key.
-        Uses an LRU cache for reuse. If api_key is None, returns the default client.
+        Returns the pooled OpenAI-compatible client for ``api_key`` and
+        ``base_url``, or the default client when no key is given.
         """
-        if api_key:
-            logging_utility.debug("Creating client for specific key (not cached).")
-            try:
-                return OpenAI(
-                    api_key=api_key,
-                    base_url=base_url,
-                    timeout=httpx.Timeout(30.0, read=30.0),
-                )
-            except Exception as e:
-                logging_utility.error(
-                    "Failed to create specific OpenAI client: %s", e, exc_info=True
-                )
-                if self.openai_client:
-                    logging_utility.warning(
-                        "Falling back to default client due to error."
-                    )
-                    return self.openai_client
-                else:
-                    raise RuntimeError(
-                        "Default OpenAI client is not initialized, and specific client creation failed."
-                    )
-        else:
-            if self.openai_client:
-                logging_utility.debug(
-                    "Using default OpenAI client (no specific key provided)."
-                )
-                return self.openai_client
-            else:
-                raise RuntimeError("Default OpenAI client is not initialized.")
+        if not api_key:
+            return self.openai_client
+        return get_client_pool().openai(api_key, base_url)
 
     def get_assistant_id(self):
         return self.assistant_id
@@ -349,10 +301,7 @@ class BaseInference(ABC):
 
     @property
     def assistant_service(self):
-        return self._get_service(
-            AssistantsClient,
-            custom_params=[os.getenv("BASE_URL"), os.getenv("ADMIN_API_KEY")],
-        )
+        return self.service_gateway.assistants
 
     # ----------------------
     # A tread is never created
@@ -367,24 +316,15 @@ class BaseInference(ABC):
 
     @property
     def message_service(self):
-        return self._get_service(
-            MessagesClient,
-            custom_params=[os.getenv("BASE_URL"), os.getenv("ADMIN_API_KEY")],
-        )
+        return self.service_gateway.messages
 
     @property
     def run_service(self):
-        return self._get_service(
-            RunsClient,
-            custom_params=[os.getenv("BASE_URL"), os.getenv("ADMIN_API_KEY")],
-        )
+        return self.service_gateway.runs
 
     @property
     def tool_service(self):
-        return self._get_service(
-            ToolsClient,
-            custom_params=[os.getenv("BASE_URL"), os.getenv("ADMIN_API_KEY")],
-        )
+        return self.service_gateway.tools
 
     @property
     def platform_tool_service(self):
@@ -395,10 +335,7 @@ class BaseInference(ABC):
 
     @property
     def action_client(self):
-        return self._get_service(
-            ActionsClient,
-            custom_params=[os.getenv("BASE_URL"), os.getenv("ADMIN_API_KEY")],
-        )
+        return self.service_gateway.actions
 
     @property
     def vector_store_service(self):
@@ -449,17 +386,31 @@ class BaseInference(ABC):
             del self._services[service_class]
             logging_utility.debug(f"Invalidated cache for {service_class.__name__}")
 
+    # Tool-call state belongs to the run being processed, not to the
+    # handler, which every run in the process shares (see turn_state).
     def set_tool_response_state(self, value):
-        self.tool_response = value
+        current_turn().tool_response = value
 
     def get_tool_response_state(self):
-        return self.tool_response
+        return current_turn().tool_response
 
     def set_function_call_state(self, value):
-        self.function_call = value
+        current_turn().function_call = value
 
     def get_function_call_state(self):
-        return self.function_call
+        return current_turn().function_call
+
+    def set_tool_calls_state(self, value):
+        current_turn().tool_calls = list(value or [])
+
+    def get_tool_calls_state(self) -> List[Dict[str, Any]]:
+        """All calls of the pending turn, or just the function call state."""
+        turn = current_turn()
+        if not turn.function_call:
+            return []
+        if turn.tool_calls and turn.tool_calls[0] == turn.function_call:
+            return turn.tool_calls
+        return [turn.function_call]
 
     @abc.abstractmethod
     def stream(
@@ -471,7 +422,7 @@ class BaseInference(ABC):
         model: Any,
         stream_reasoning: bool = True,
         api_key: Optional[str] = None,
-    ) -> Generator[str, None, None]:
+    ) -> Generator[Chunk, None, None]:
         """
         Begin a structured streaming session from the assistant model.
 
@@ -485,7 +436,8 @@ class BaseInference(ABC):
             api_key (Optional[str]): Optional API key to override default config.
 
         Yields:
-            str: JSON string-encoded response chunks (type: "content", "reasoning", "hot_code", "error")
+            StreamChunk: response chunks (type: "content", "reasoning",
+            "hot_code", "error"), encoded once at the SSE boundary
         """
         pass
 
@@ -502,16 +454,7 @@ class BaseInference(ABC):
             A dictionary with the key 'code' containing the extracted text,
             or None if no match is found.
         """
-        pattern = re.compile(
-            r"""
-            \{\s*['"]name['"]\s*:\s*['"]code_interpreter['"]\s*,\s*   # "name": "code_interpreter"
-            ['"]arguments['"]\s*:\s*\{\s*['"]code['"]\s*:\s*             # "arguments": {"code":
-            (?P<code>.*)                                               # Capture the rest as code content
-        """,
-            re.VERBOSE | re.DOTALL,
-        )
-
-        match = pattern.search(text)
+        match = CODE_INTERPRETER_PATTERN.search(text)
         if match:
             return {"code": match.group("code").strip()}
         else:
@@ -644,113 +587,26 @@ class BaseInference(ABC):
 
         return True
 
-    def normalize_roles(self, conversation_history):
+    def normalize_roles(self, conversation_history, keep_pins=False):
         """
         Normalize roles to ensure consistency with the Hyperbolic API.
+
+        With ``keep_pins`` the pin flag of pinned messages is kept for the
+        truncation strategy; it must be stripped before the provider call.
         """
         normalized_history = []
         for message in conversation_history:
             role = message.get("role", "").strip().lower()
             if role not in ["user", "assistant", "system", "tool", "platform"]:
                 role = "user"
-            normalized_history.append(
-                {"role": role, "content": message.get("content", "").strip()}
-            )
+            normalized = {"role": role, "content": message.get("content", "").strip()}
+            if keep_pins and message.get(PIN_KEY):
+                normalized[PIN_KEY] = True
+            normalized_history.append(normalized)
         return normalized_history
 
-    def extract_function_candidates(self, text):
-        """
-        Extracts potential JSON function call patterns from arbitrary text positions.
-        Handles cases where function calls are embedded within other content.
-        """
-        # Regex pattern explanation:
-        # - Looks for {...} structures with 'name' and 'arguments' keys
-        # - Allows for nested JSON structures
-        # - Tolerates some invalid JSON formatting that might appear in streams
-        pattern = r"""
-            \{                      # Opening curly brace
-            \s*                     # Optional whitespace
-            (["'])name\1\s*:\s*     # 'name' key with quotes
-            (["'])(.*?)\2\s*,\s*    # Capture tool name
-            (["'])arguments\4\s*:\s* # 'arguments' key
-            (\{.*?\})               # Capture arguments object
-            \s*\}                   # Closing curly brace
-        """
-
-        candidates = []
-        try:
-            matches = re.finditer(pattern, text, re.DOTALL | re.VERBOSE)
-            for match in matches:
-                candidate = match.group(0)
-                # Validate basic structure before adding
-                if '"name"' in candidate and '"arguments"' in candidate:
-                    candidates.append(candidate)
-        except Exception as e:
-            logging_utility.error(f"Candidate extraction error: {str(e)}")
-
-        return candidates
-
-    def extract_function_calls_within_body_of_text(self, text: str):
-        """
-        Extracts and validates all tool invocation patterns from unstructured text.
-        Handles multi-line JSON and schema validation without recursive patterns.
-        """
-        # Remove markdown code fences (e.g., ```json ... ```)
-        text = re.sub(r"```(?:json)?(.*?)```", r"\1", text, flags=re.DOTALL)
-
-        # Normalization phase
-        text = re.sub(r"[“”]", '"', text)
-        text = re.sub(r"(\s|\\n)+", " ", text)
-
-        print(f"Text after normalization: {text}")
-
-        def extract_json_block(text):
-            start = text.find('{')
-            if start == -1:
-                return None
-
-            brace_count = 0
-            for i in range(start, len(text)):
-                if text[i] == '{':
-                    brace_count += 1
-                elif text[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        json_str = text[start:i + 1]
-                        return json_str
-            return None
-
-        # Simplified pattern without recursion
-        pattern = r"""
-            \{         # Opening curly brace
-            .*?        # Any characters
-            "name"\s*:\s*"(?P<name>[^"]+)"
-            .*?        # Any characters
-            "arguments"\s*:\s*\{(?P<args>.*?)\}
-            .*?        # Any characters
-            \}         # Closing curly brace
-        """
-
-        # tool_matches = []
-        # for match in re.finditer(pattern, text, re.DOTALL | re.VERBOSE):
-        #     print(f"This has been a match: {match.group()}")
-        try:
-            # Reconstruct with proper JSON formatting
-            raw_json = extract_json_block(text)
-            print(f"This is the extracted JSON: {raw_json}")
-            parsed = json.loads(raw_json)
-
-            # Schema validation
-            if not all(key in parsed for key in ["name", "arguments"]):
-                return []
-            if not isinstance(parsed["arguments"], dict):
-                return []
-
-            # tool_matches.append(parsed)
-        except (json.JSONDecodeError, KeyError):
-            return []
-
-        return [parsed]
+    def _normalize_keeping_pins(self, conversation_history):
+        return self.normalize_roles(conversation_history, keep_pins=True)
 
     def ensure_valid_json(self, text: str):
         """
@@ -908,56 +764,62 @@ class BaseInference(ABC):
             logging_utility.warning(f"Normalization failed: {str(e)}")
             return content  # Preserve for legacy handling if needed
 
-    def handle_error(self, assistant_reply, thread_id, assistant_id, run_id):
-        """Handle errors and store partial assistant responses."""
-        if assistant_reply:
+    def _save_reply(self, assistant_reply, thread_id, assistant_id, reasoning=None):
+        """
+        Stores the assistant's reply. Its reasoning is stored beside it, not
+        in the content, so later turns do not send it back to the model.
+        """
+        client = self.service_gateway
+        kwargs = {}
+        if reasoning:
+            if getattr(client, "mode", None) == GATEWAY_MODE_IN_PROCESS:
+                kwargs["reasoning"] = reasoning
+            else:
+                logging_utility.debug(
+                    "Reasoning of %d chars not stored (HTTP service gateway)",
+                    len(reasoning),
+                )
+        return client.messages.save_assistant_message_chunk(
+            thread_id=thread_id,
+            content=assistant_reply,
+            role="assistant",
+            assistant_id=assistant_id,
+            sender_id=assistant_id,
+            is_last_chunk=True,
+            **kwargs,
+        )
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
+    def handle_error(
+        self, assistant_reply, thread_id, assistant_id, run_id, reasoning=None
+    ):
+        """Handle errors and store partial assistant responses."""
+        if assistant_reply or reasoning:
 
-            client.messages.save_assistant_message_chunk(
-                thread_id=thread_id,
-                content=assistant_reply,
-                role="assistant",
-                assistant_id=assistant_id,
-                sender_id=assistant_id,
-                is_last_chunk=True,
-            )
-            logging_utility.info("Partial assistant response stored successfully.")
+            if assistant_reply:
+                self._save_reply(assistant_reply, thread_id, assistant_id, reasoning)
+                logging_utility.info("Partial assistant response stored successfully.")
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
+            self.service_gateway.runs.update_run_status(
+                run_id, validator.StatusEnum.failed
             )
 
-            client.runs.update_run_status(run_id, validator.StatusEnum.failed)
-
-    def finalize_conversation(self, assistant_reply, thread_id, assistant_id, run_id):
+    def finalize_conversation(
+        self, assistant_reply, thread_id, assistant_id, run_id, reasoning=None
+    ):
         """Finalize the conversation by storing the assistant's reply."""
 
         if assistant_reply:
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
-
-            message = client.messages.save_assistant_message_chunk(
-                thread_id=thread_id,
-                content=assistant_reply,
-                role="assistant",
-                assistant_id=assistant_id,
-                sender_id=assistant_id,
-                is_last_chunk=True,
+            message = self._save_reply(
+                assistant_reply, thread_id, assistant_id, reasoning
             )
 
             logging_utility.info("Assistant response stored successfully.")
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
+            self.service_gateway.runs.update_run_status(
+                run_id, validator.StatusEnum.completed
             )
 
-            client.runs.update_run_status(run_id, validator.StatusEnum.completed)
-
             return message
 
     def get_vector_store_id_for_assistant(
@@ -988,54 +850,183 @@ class BaseInference(ABC):
         self, run_id: str, poll_interval: float = 1.0
     ) -> None:
         """
-        Starts a background thread to listen for cancellation events.
-        Only starts if it hasn't already been started.
+        Registers the run with the process-wide cancellation registry.
+
+        No thread or HTTP traffic is started per run: RunService.cancel_run
+        signals the registry directly and cross-process cancels arrive
+        through its backend. ``poll_interval`` is kept for compatibility.
         """
-        from entities_api.services.event_handler import EntitiesEventHandler
+        self.cancellation_registry.watch(run_id)
 
-        if (
-            hasattr(self, "_cancellation_thread")
-            and self._cancellation_thread.is_alive()
-        ):
-            logging_utility.info("Cancellation listener already running.")
-            return
+    def check_cancellation_flag(self, run_id: str) -> bool:
+        """Non-blocking check of the cancellation flag (a memory read)."""
+        return self.cancellation_registry.is_cancelled(run_id)
 
-        def handle_event(event_type: str, event_data: Any):
-            if event_type == "cancelled":
-                return "cancelled"
+    # ------------------------------------------------------------------ #
+    # Early action creation
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _action_key(run_id, tool_name, function_args) -> Tuple[str, str, str]:
+        return (
+            run_id,
+            tool_name,
+            json.dumps(function_args or {}, sort_keys=True, default=str),
+        )
 
-        client = self._get_project_david_client(
-            api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
+    def _prepare_action(self, run_id: str, tool_call: Dict[str, Any]) -> None:
+        """
+        Starts creating the action for a tool call recognised mid-stream.
+        The record is picked up by ``_create_action`` once the stream ends.
+        """
+        key = self._action_key(run_id, tool_call["name"], tool_call["arguments"])
+        with self._prepared_actions_lock:
+            if key in self._prepared_actions:
+                return
+            self._prepared_actions[key] = _action_prep_executor.submit(
+                self.action_client.create_action,
+                tool_name=tool_call["name"],
+                run_id=run_id,
+                function_args=tool_call["arguments"],
+            )
+        logging_utility.debug(
+            "Run %s: preparing action for tool %s ahead of stream end",
+            run_id,
+            tool_call["name"],
         )
 
-        def listen_for_cancellation():
-            event_handler = EntitiesEventHandler(
-                run_service=client.runs,
-                action_service=client.actions,
-                event_callback=handle_event,
-            )
-            while not self._cancelled:
-                if event_handler._emit_event("cancelled", run_id) == "cancelled":
-                    self._cancelled = True
-                    logging_utility.info(
-                        f"Cancellation event detected for run {run_id}"
-                    )
-                    break
-                time.sleep(poll_interval)
+    def _create_action(self, tool_name: str, run_id: str, function_args: dict):
+        """Returns the action prepared mid-stream, or creates it now."""
+        key = self._action_key(run_id, tool_name, function_args)
+        with self._prepared_actions_lock:
+            prepared = self._prepared_actions.pop(key, None)
+
+        if prepared is not None:
+            try:
+                return prepared.result()
+            except Exception as e:
+                logging_utility.warning(
+                    "Run %s: prepared action for %s failed (%s); retrying.",
+                    run_id,
+                    tool_name,
+                    e,
+                )
+
+        return self.action_client.create_action(
+            tool_name=tool_name, run_id=run_id, function_args=function_args
+        )
+
+    def _discard_prepared_actions(self, run_id: str, keep=None) -> None:
+        """
+        Cancels actions prepared for ``run_id`` that will not be executed,
+        e.g. after a stream error or cancellation. ``keep`` is the tool call
+        (or list of calls) about to be processed.
+        """
+        if isinstance(keep, dict):
+            keep = [keep]
+        keep_keys = {
+            self._action_key(run_id, call["name"], call["arguments"])
+            for call in keep or []
+        }
+        with self._prepared_actions_lock:
+            stale = [
+                key
+                for key in self._prepared_actions
+                if key[0] == run_id and key not in keep_keys
+            ]
+            futures = [self._prepared_actions.pop(key) for key in stale]
+
+        for future in futures:
+            try:
+                action = future.result()
+                self.action_client.update_action(action_id=action.id, status="cancelled")
+            except Exception as e:
+                logging_utility.warning(
+                    "Run %s: could not discard prepared action: %s", run_id, e
+                )
+
+    def _new_tool_call_recognizer(
+        self, assistant_id: Optional[str], run_id: Optional[str] = None
+    ) -> ToolCallRecognizer:
+        """
+        Builds a recognizer validated against the assistant's tools. With a
+        run_id, recognised calls start their action creation immediately.
+        """
+        on_tool_call = None
+        if run_id is not None:
 
-        self._cancellation_thread = threading.Thread(
-            target=listen_for_cancellation, daemon=True
+            def on_tool_call(tool_call):
+                self._prepare_action(run_id, tool_call)
+
+        return ToolCallRecognizer(
+            tool_schemas=self._assistant_tools.get(assistant_id),
+            always_allowed=PLATFORM_TOOLS,
+            on_tool_call=on_tool_call,
         )
-        self._cancellation_thread.start()
 
-    def check_cancellation_flag(self) -> bool:
-        """Non-blocking check of the cancellation flag."""
-        return self._cancelled
+    def _poll_action_outcome(self, run_id: str, action_id: str):
+        """
+        Fallback check for tool results recorded by another process: the
+        action reached a terminal status, or the run left action_required.
+        """
+        client = self.service_gateway
+        action = client.actions.get_action(action_id)
+        status = getattr(action.status, "value", action.status)
+        if status in TERMINAL_ACTION_STATUSES:
+            return ActionWaitResult(
+                action_id, status, status=status, output=action.result
+            )
+
+        run = client.runs.retrieve_run(run_id)
+        # The in-process gateway returns the enum, the SDK a plain string.
+        run_status = getattr(run.status, "value", run.status)
+        if run_status != "action_required":
+            return ActionWaitResult(action_id, OUTCOME_RUN_STATUS, status=run_status)
+        return None
+
+    def _action_wait_timeout(self, action) -> Optional[float]:
+        """Seconds until the action's own expiry, if it has one."""
+        expires_at = getattr(action, "expires_at", None)
+        if not expires_at:
+            return None
+        if isinstance(expires_at, str):
+            try:
+                expires_at = datetime.fromisoformat(expires_at)
+            except ValueError:
+                return None
+        if isinstance(expires_at, datetime):
+            expires_at = expires_at.timestamp()
+        return float(expires_at) - time.time()
+
+    def _expire_action(self, run_id: str, action) -> None:
+        client = self.service_gateway
+        try:
+            client.actions.update_action(action_id=action.id, status="expired")
+            client.runs.update_run_status(
+                run_id=run_id, new_status=validator.StatusEnum.expired
+            )
+        except Exception as e:
+            logging_utility.error(
+                "Run %s: failed to expire action %s: %s", run_id, action.id, e
+            )
 
-    def _process_tool_calls(self, thread_id, assistant_id, content, run_id, api_key):
+    def _process_tool_calls(
+        self, thread_id, assistant_id, content, run_id, api_key=None
+    ):
+        """
+        Hands a consumer tool call to the client and blocks until the client
+        answers. Returns the submitted tool output (None when the wait ended
+        without one, e.g. the run was cancelled or the action expired).
+        """
+        action = self._hand_over_action(run_id, content)
+        return self._resume_after_action(run_id, action)
 
+    def _hand_over_action(self, run_id, content):
+        """
+        Creates the action for a consumer tool call, registers it with the
+        action waiter and moves the run to pending_action.
+        """
         # Save the tool invocation for state management.
-        action = self.action_client.create_action(
+        action = self._create_action(
             tool_name=content["name"], run_id=run_id, function_args=content["arguments"]
         )
 
@@ -1043,33 +1034,95 @@ class BaseInference(ABC):
             "Created action %s for tool %s", action.id, content["name"]
         )
 
-        # Update run status to 'action_required'
-        client = self._get_project_david_client(
-            api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-        )
+        # Register before the client can see the action, then hand it over.
+        waiter = get_action_waiter()
+        waiter.register(action.id, run_id)
 
-        client.runs.update_run_status(
-            run_id=run_id, new_status=validator.StatusEnum.pending_action
-        )
+        client = self.service_gateway
+        try:
+            client.runs.update_run_status(
+                run_id=run_id, new_status=validator.StatusEnum.pending_action
+            )
+        except Exception:
+            waiter.unregister(action.id)
+            raise
         logging_utility.info(f"Run {run_id} status updated to action_required")
+        return action
+
+    @staticmethod
+    def _action_required_chunk(run_id, action, content) -> StreamChunk:
+        """
+        The in-band announcement of a handed-over action, so streaming
+        clients can answer it without polling the actions endpoint.
+        """
+        return StreamChunk(
+            "action_required",
+            "",
+            {
+                "run_id": run_id,
+                "action_id": action.id,
+                "tool": content["name"],
+                "arguments": content["arguments"],
+            },
+        )
 
-        # Now wait for the run's status to change from 'action_required'.
-        while True:
+    def _resume_after_action(self, run_id, action):
+        """
+        Blocks until the client answers ``action`` and puts the run back in
+        progress. Returns the tool output, or None when generation should
+        not continue.
+        """
+        result = self._await_action(run_id, action)
+        if result is None:
+            return None
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
+        if result.outcome in (OUTCOME_TOOL_OUTPUT, OUTCOME_COMPLETED):
+            try:
+                self.service_gateway.runs.update_run_status(
+                    run_id=run_id, new_status=validator.StatusEnum.in_progress
+                )
+            except Exception as e:
+                logging_utility.warning(
+                    "Run %s: could not resume after tool output: %s", run_id, e
+                )
 
-            run = client.runs.retrieve_run(run_id)
-            if run.status != "action_required":
-                break
-            time.sleep(1)
+        if not result.resumable:
+            return None
 
         logging_utility.info(
             "Action status transition complete. Reprocessing conversation."
         )
 
-        return content
+        return result.output
+
+    def _await_action(self, run_id, action) -> Optional[ActionWaitResult]:
+        """
+        Blocks until the client answers a registered action. Returns None
+        when the action expired (the run is expired with it).
+        """
+        waiter = get_action_waiter()
+        timeout = waiter.default_timeout
+        action_timeout = self._action_wait_timeout(action)
+        if action_timeout is not None:
+            timeout = min(timeout, action_timeout)
+
+        result = waiter.wait(
+            action.id,
+            timeout=timeout,
+            poll=lambda action_id: self._poll_action_outcome(run_id, action_id),
+        )
+        logging_utility.info(
+            "Run %s: wait for action %s ended (%s) after %.2fs",
+            run_id,
+            action.id,
+            result.outcome,
+            result.waited,
+        )
+
+        if result.outcome == OUTCOME_EXPIRED and result.status is None:
+            self._expire_action(run_id, action)
+            return None
+        return result
 
     def _handle_web_search(self, thread_id, assistant_id, function_output, action):
         """Special handling for web search results."""
@@ -1168,9 +1221,7 @@ class BaseInference(ABC):
 
         try:
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
+            client = self.service_gateway
 
             client.messages.submit_tool_output(
                 thread_id=thread_id,
@@ -1205,7 +1256,7 @@ class BaseInference(ABC):
             )
 
             # Create action with sanitized logging
-            action = self.action_client.create_action(
+            action = self._create_action(
                 tool_name=content["name"],
                 run_id=run_id,
                 function_args=content["arguments"],
@@ -1216,9 +1267,7 @@ class BaseInference(ABC):
             )
 
             # Update run status
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
+            client = self.service_gateway
 
             client.runs.update_run_status(
                 run_id=run_id, new_status=validator.StatusEnum.pending_action
@@ -1241,33 +1290,9 @@ class BaseInference(ABC):
                 "Tool %s executed successfully for run %s", content["name"], run_id
             )
 
-            # Handle specific tool types
-            tool_handlers = {
-                "code_interpreter": self._handle_code_interpreter,
-                "web_search": self._handle_web_search,
-                "vector_store_search": self._handle_vector_search,
-                "computer": self._handle_computer,
-            }
-
-            handler = tool_handlers.get(content["name"])
-            if handler:
-                handler(
-                    thread_id=thread_id,
-                    assistant_id=assistant_id,
-                    function_output=function_output,
-                    action=action,
-                )
-            else:
-                logging_utility.warning(
-                    "No specific handler for tool %s, using default processing",
-                    content["name"],
-                )
-                self._submit_tool_output(
-                    thread_id=thread_id,
-                    assistant_id=assistant_id,
-                    content=function_output,
-                    action=action,
-                )
+            self._submit_platform_tool_output(
+                thread_id, assistant_id, content["name"], function_output, action
+            )
 
         except Exception as e:
             logging_utility.error(
@@ -1279,6 +1304,213 @@ class BaseInference(ABC):
             self.action_client.update_action(action_id=action.id, status="failed")
             raise  # Re-raise for upstream handling
 
+    def _submit_platform_tool_output(
+        self, thread_id, assistant_id, tool_name, function_output, action
+    ):
+        """Submits a platform tool's output through its tool-specific handler."""
+        tool_handlers = {
+            "code_interpreter": self._handle_code_interpreter,
+            "web_search": self._handle_web_search,
+            "vector_store_search": self._handle_vector_search,
+            "computer": self._handle_computer,
+        }
+
+        handler = tool_handlers.get(tool_name)
+        if handler:
+            handler(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                function_output=function_output,
+                action=action,
+            )
+        else:
+            logging_utility.warning(
+                "No specific handler for tool %s, using default processing",
+                tool_name,
+            )
+            self.submit_tool_output(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                content=function_output,
+                action=action,
+            )
+
+    def _fail_tool_call(self, thread_id, assistant_id, action, error: str) -> None:
+        """Tells the model a tool call failed and marks its action failed."""
+        try:
+            self.service_gateway.messages.submit_tool_output(
+                thread_id=thread_id,
+                content=f"ERROR: {error}",
+                role="tool",
+                assistant_id=assistant_id,
+                tool_id="dummy",
+            )
+        finally:
+            self.action_client.update_action(action_id=action.id, status="failed")
+
+    def _process_tool_call_batch(
+        self, thread_id, run_id, assistant_id, calls, api_key=None
+    ):
+        """
+        Runs all tool calls of one assistant turn together.
+
+        Platform tools without streamed output (web_search,
+        vector_store_search) run concurrently in the tool-call pool, each
+        bounded by ``tool_call_timeout``. Consumer tools are handed to the
+        client in one go, announced in-band as ``action_required`` chunks,
+        and awaited together. Platform outputs are submitted in call order
+        once they are all in, so the single follow-up generation sees every
+        result. Code interpreter and computer calls stream their output and
+        run afterwards, one by one.
+        """
+        self.set_assistant_id(assistant_id=assistant_id)
+        self.set_thread_id(thread_id=thread_id)
+
+        streamed = [
+            call for call in calls if call["name"] in SPECIAL_CASE_TOOL_HANDLING
+        ]
+        batched = [
+            call for call in calls if call["name"] not in SPECIAL_CASE_TOOL_HANDLING
+        ]
+        logging_utility.info(
+            "Run %s: running %d tool calls in parallel (%s)",
+            run_id,
+            len(batched),
+            ", ".join(call["name"] for call in batched),
+        )
+
+        actions = [
+            self._create_action(
+                tool_name=call["name"], run_id=run_id, function_args=call["arguments"]
+            )
+            for call in batched
+        ]
+        platform = [
+            (call, action)
+            for call, action in zip(batched, actions)
+            if call["name"] in PLATFORM_TOOLS
+        ]
+        consumer = [
+            (call, action)
+            for call, action in zip(batched, actions)
+            if call["name"] not in PLATFORM_TOOLS
+        ]
+
+        # Register before the client can see the actions, then hand them over.
+        waiter = get_action_waiter()
+        for _, action in consumer:
+            waiter.register(action.id, run_id)
+        client = self.service_gateway
+        try:
+            client.runs.update_run_status(
+                run_id=run_id, new_status=validator.StatusEnum.pending_action
+            )
+        except Exception:
+            for _, action in consumer:
+                waiter.unregister(action.id)
+            raise
+        for call, action in consumer:
+            yield self._action_required_chunk(run_id, action, call)
+
+        started = time.monotonic()
+        platform_tool_service = self.platform_tool_service
+        running = [
+            (
+                call,
+                action,
+                _tool_call_executor.submit(
+                    platform_tool_service.call_function,
+                    function_name=call["name"],
+                    arguments=call["arguments"],
+                ),
+            )
+            for call, action in platform
+        ]
+
+        for call, action, future in running:
+            timeout = tool_call_timeout(call["name"])
+            try:
+                function_output = future.result(
+                    timeout=max(0.0, started + timeout - time.monotonic())
+                )
+            except FutureTimeoutError:
+                future.cancel()
+                logging_utility.warning(
+                    "Run %s: tool %s timed out after %gs", run_id, call["name"], timeout
+                )
+                self._fail_tool_call(
+                    thread_id,
+                    assistant_id,
+                    action,
+                    f"{call['name']} timed out after {timeout:g}s",
+                )
+                continue
+            except Exception as e:
+                logging_utility.error(
+                    "Run %s: tool %s failed: %s", run_id, call["name"], e
+                )
+                self._fail_tool_call(thread_id, assistant_id, action, str(e))
+                continue
+
+            try:
+                self._submit_platform_tool_output(
+                    thread_id, assistant_id, call["name"], function_output, action
+                )
+            except Exception as e:
+                logging_utility.error(
+                    "Run %s: output of tool %s not submitted: %s",
+                    run_id,
+                    call["name"],
+                    e,
+                )
+
+        resumed = False
+        for index, (_, action) in enumerate(consumer):
+            result = self._await_action(run_id, action)
+            if result is None or not result.resumable:
+                for _, pending in consumer[index + 1 :]:
+                    waiter.unregister(pending.id)
+                return
+            resumed = resumed or result.outcome in (
+                OUTCOME_TOOL_OUTPUT,
+                OUTCOME_COMPLETED,
+            )
+
+        if resumed:
+            try:
+                client.runs.update_run_status(
+                    run_id=run_id, new_status=validator.StatusEnum.in_progress
+                )
+            except Exception as e:
+                logging_utility.warning(
+                    "Run %s: could not resume after tool outputs: %s", run_id, e
+                )
+
+        for call in streamed:
+            if call["name"] == "code_interpreter":
+                yield from self.handle_code_interpreter_action(
+                    thread_id=thread_id,
+                    run_id=run_id,
+                    assistant_id=assistant_id,
+                    arguments_dict=call["arguments"],
+                )
+            else:
+                yield from self.handle_shell_action(
+                    thread_id=thread_id,
+                    run_id=run_id,
+                    assistant_id=assistant_id,
+                    arguments_dict=call["arguments"],
+                )
+
+    def _parallel_tool_calls_allowed(self, run_id: str) -> bool:
+        """Whether the run was created with ``parallel_tool_calls``."""
+        try:
+            run = self.run_service.retrieve_run(run_id)
+        except Exception as e:
+            logging_utility.warning("Run %s: could not read run: %s", run_id, e)
+            return False
+        return bool(getattr(run, "parallel_tool_calls", False))
+
     def submit_tool_output(self, thread_id, content, assistant_id, action):
         """
         Submits tool output and updates the action status.
@@ -1290,9 +1522,7 @@ class BaseInference(ABC):
 
         try:
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
+            client = self.service_gateway
 
             client.messages.submit_tool_output(
                 thread_id=thread_id,
@@ -1313,9 +1543,7 @@ class BaseInference(ABC):
                 "Failed to submit tool output for action %s: %s", action.id, str(e)
             )
 
-            client = self._get_project_david_client(
-                api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-            )
+            client = self.service_gateway
 
             # Send the error message to the user
             client.messages.submit_tool_output(
@@ -1336,7 +1564,7 @@ class BaseInference(ABC):
         self, thread_id, run_id, assistant_id, arguments_dict
     ):
 
-        action = self.action_client.create_action(
+        action = self._create_action(
             tool_name="code_interpreter", run_id=run_id, function_args=arguments_dict
         )
 
@@ -1717,7 +1945,7 @@ class BaseInference(ABC):
             run_shell_commands
 
         # Create an action for the computer command execution
-        action = self.action_client.create_action(
+        action = self._create_action(
             tool_name="computer", run_id=run_id, function_args=arguments_dict
         )
 
@@ -1788,7 +2016,7 @@ class BaseInference(ABC):
         run_id,
         assistant_id,
         model,
-        stream: Callable[..., Generator[str, None, None]],
+        stream: Callable[..., Generator[Chunk, None, None]],
         name=None,
         stream_reasoning=False,
         api_key: Optional[str] = None,
@@ -1828,9 +2056,7 @@ class BaseInference(ABC):
 
         # Inject system reminder into context
 
-        client = self._get_project_david_client(
-            api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-        )
+        client = self.service_gateway
 
         client.messages.create_message(
             thread_id=thread_id,
@@ -1855,44 +2081,39 @@ class BaseInference(ABC):
             reasoning_content = ""
 
             for chunk in stream_generator:
-                parsed = json.loads(chunk) if isinstance(chunk, str) else chunk
+                parsed = as_chunk(chunk)
+                if parsed is None:
+                    continue
 
-                chunk_type = parsed.get("type")
-                content = parsed.get("content", "")
+                chunk_type = parsed.type
+                content = parsed.content
 
                 if chunk_type == "reasoning":
                     reasoning_content += content
-                    yield json.dumps({"type": "reasoning", "content": content})
-
                 elif chunk_type == "content":
                     assistant_reply += content
-                    yield json.dumps({"type": "content", "content": content}) + "\n"
-
                 elif chunk_type == "error":
                     logging_utility.error("Error in assistant stream: %s", content)
-                    yield json.dumps({"type": "error", "content": content})
+                    yield chunk
                     return
 
-                else:
-                    # Default fallback for other chunk types (optional: forward raw)
-                    yield json.dumps(parsed)
-
-                time.sleep(0.01)
+                # Forward the chunk as produced; it is encoded at the SSE edge.
+                yield chunk
 
         except Exception as e:
             error_msg = f"[ERROR] Hyperbolic stream failed: {str(e)}"
             logging_utility.error(error_msg, exc_info=True)
-            yield json.dumps({"type": "error", "content": error_msg})
+            yield StreamChunk("error", error_msg)
             return
 
         # Finalize only if content was generated
         if assistant_reply:
-            full_output = reasoning_content + assistant_reply
             self.finalize_conversation(
-                assistant_reply=full_output,
+                assistant_reply=assistant_reply,
                 thread_id=thread_id,
                 assistant_id=assistant_id,
                 run_id=run_id,
+                reasoning=reasoning_content,
             )
             logging_utility.info("Assistant response finalized and stored.")
 
@@ -1900,39 +2121,562 @@ class BaseInference(ABC):
         if reasoning_content:
             logging_utility.info("Final reasoning content: %s", reasoning_content)
 
-    def _process_code_interpreter_chunks(self, content_chunk, code_buffer):
+    @staticmethod
+    def _iter_openai_deltas(response) -> Iterator[Tuple[str, str]]:
         """
-        Process code chunks while in code mode.
+        Adapts an OpenAI-compatible chunk iterator (OpenAI / Together SDK)
+        to (content, reasoning_content) pairs. Closing the adapter closes
+        the HTTP response, so a stream stopped early stops the provider.
+        """
+        try:
+            for token in response:
+                choices = getattr(token, "choices", None)
+                if not choices or not choices[0]:
+                    continue
+                delta = choices[0].delta
+                yield (
+                    getattr(delta, "content", None) or "",
+                    getattr(delta, "reasoning_content", None) or "",
+                )
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
 
-        Appends the incoming content_chunk to code_buffer,
-        then extracts a single line (if a newline exists) and handles buffer overflow.
+    def _begin_stream(
+        self,
+        run_id: str,
+        assistant_id: str,
+        stream_reasoning: bool = True,
+        split_reasoning: bool = True,
+    ) -> Tuple[StreamDeltaProcessor, ToolCallRecognizer]:
+        """
+        Per-stream state shared by the sync and async loops. Visible content
+        is fed to a ToolCallRecognizer as it streams; a valid tool call
+        starts its action creation before the last token. Tool calls of the
+        run's previous turn are forgotten.
+        """
+        begin_turn()
+        recognizer = self._new_tool_call_recognizer(assistant_id, run_id=run_id)
+        processor = StreamDeltaProcessor(
+            stream_reasoning=stream_reasoning,
+            split_reasoning=split_reasoning,
+            tool_call_recognizer=recognizer,
+        )
+        return processor, recognizer
 
-        Returns:
-            tuple: (results, updated code_buffer)
-                - results: list of JSON strings representing code chunks.
-                - updated code_buffer: the remaining buffer content.
+    @staticmethod
+    def _feed_delta(
+        processor: StreamDeltaProcessor, content: str, reasoning: str
+    ) -> Iterator[StreamChunk]:
+        if reasoning:
+            for event in processor.feed_reasoning(reasoning):
+                yield StreamChunk(event["type"], event["content"])
+        if content:
+            for event in processor.feed(content):
+                yield StreamChunk(event["type"], event["content"])
+
+    def _start_stream_timer(
+        self, thread_id: str, payload: Optional[Dict[str, Any]]
+    ) -> StreamTimer:
+        return self.stream_metrics.timer(
+            self.provider_name,
+            (payload or {}).get("model"),
+            context_seconds=self._context_seconds.pop(thread_id, None),
+        )
+
+    @staticmethod
+    def _time_delta(timer: StreamTimer, recognizer: ToolCallRecognizer) -> None:
+        timer.delta()
+        if timer.tool_call_at is None and recognizer.detected_at is not None:
+            timer.tool_call_detected()
+
+    def _record_stream_metrics(
+        self,
+        timer: StreamTimer,
+        processor: StreamDeltaProcessor,
+        run_id: str,
+        outcome: str,
+    ) -> None:
+        """Exports the stream's timings and stores them in ``Run.usage``."""
+        try:
+            text = processor.reasoning_content + processor.assistant_reply
+            tokens = self.conversation_truncator.count_tokens(text) if text else 0
+            breakdown = self.stream_metrics.finish(timer, tokens, outcome)
+            logging_utility.info("Run %s stream timings: %s", run_id, breakdown)
+            if hasattr(self.run_service, "update_run_usage"):
+                self.run_service.update_run_usage(run_id, breakdown)
+        except Exception as e:
+            logging_utility.warning(
+                "Run %s: could not record stream metrics: %s", run_id, e
+            )
+
+    def _fail_stream(
+        self,
+        processor: StreamDeltaProcessor,
+        error: Exception,
+        error_prefix: str,
+        thread_id: str,
+        run_id: str,
+        assistant_id: str,
+        timer: Optional[StreamTimer] = None,
+    ) -> StreamChunk:
+        """Stores the partial reply and returns the error chunk."""
+        error_msg = f"{error_prefix}: {str(error)}"
+        logging_utility.error(f"Run {run_id}: {error_msg}", exc_info=True)
+        self._discard_prepared_actions(run_id)
+        self.handle_error(
+            processor.assistant_reply,
+            thread_id,
+            assistant_id,
+            run_id,
+            reasoning=processor.reasoning_content,
+        )
+        if timer is not None:
+            self._record_stream_metrics(timer, processor, run_id, STREAM_FAILED)
+        return StreamChunk("error", error_msg)
+
+    def _finish_stream(
+        self,
+        processor: StreamDeltaProcessor,
+        recognizer: ToolCallRecognizer,
+        thread_id: str,
+        run_id: str,
+        assistant_id: str,
+        cancelled: bool = False,
+        timer: Optional[StreamTimer] = None,
+    ) -> None:
+        """Stores the reply and resolves function calls and run status."""
+        assistant_reply = processor.assistant_reply
+        accumulated_content = processor.accumulated_content
+        reasoning_content = processor.reasoning_content
+
+        if assistant_reply:
+            self.finalize_conversation(
+                assistant_reply,
+                thread_id,
+                assistant_id,
+                run_id,
+                reasoning=reasoning_content,
+            )
+
+        if timer is not None:
+            self._record_stream_metrics(
+                timer,
+                processor,
+                run_id,
+                STREAM_CANCELLED if cancelled else STREAM_COMPLETED,
+            )
+
+        if cancelled:
+            self._discard_prepared_actions(run_id)
+            return
+
+        function_call = (
+            self.parse_and_set_function_calls(
+                accumulated_content, assistant_reply, recognizer=recognizer
+            )
+            if accumulated_content
+            else None
+        )
+        self._discard_prepared_actions(
+            run_id, keep=recognizer.tool_calls if function_call else None
+        )
+
+        if function_call:
+            logging_utility.info(
+                "Run %s: tool call(s) %s recognised at char %s of %s",
+                run_id,
+                [call["name"] for call in recognizer.tool_calls],
+                recognizer.detected_at,
+                len(accumulated_content),
+            )
+            self.run_service.update_run_status(
+                run_id, validator.StatusEnum.pending_action
+            )
+
+        if not self.get_function_call_state():
+            self.run_service.update_run_status(run_id, validator.StatusEnum.completed)
+
+        if reasoning_content:
+            logging_utility.info(
+                f"Run {run_id}: Final reasoning content length: {len(reasoning_content)}"
+            )
+
+    def _abandon_stream(
+        self,
+        processor: StreamDeltaProcessor,
+        thread_id: str,
+        run_id: str,
+        assistant_id: str,
+        timer: Optional[StreamTimer] = None,
+    ) -> None:
+        """
+        Wraps up a stream whose client went away: the upstream is already
+        closed; keep the partial reply and mark the run cancelled.
         """
+        logging_utility.warning(
+            "Run %s: client disconnected; provider stream stopped after %d chars",
+            run_id,
+            len(processor.assistant_reply),
+        )
+        try:
+            self._discard_prepared_actions(run_id)
+            if processor.assistant_reply:
+                self.finalize_conversation(
+                    processor.assistant_reply,
+                    thread_id,
+                    assistant_id,
+                    run_id,
+                    reasoning=processor.reasoning_content,
+                )
+            self.run_service.update_run_status(
+                run_id, validator.StatusEnum.cancelled
+            )
+        except Exception as e:
+            logging_utility.error(
+                "Run %s: could not record disconnected stream: %s", run_id, e
+            )
+        if timer is not None:
+            timer.disconnected_at = self.cancellation_registry.disconnected_at(
+                run_id
+            )
+            self._record_stream_metrics(
+                timer, processor, run_id, STREAM_DISCONNECTED
+            )
 
-        self.code_mode = True
+    @staticmethod
+    def _close_deltas(deltas: Any) -> None:
+        close = getattr(deltas, "close", None)
+        if close is not None:
+            close()
 
-        results = []
-        code_buffer += content_chunk
+    @staticmethod
+    async def _aclose_deltas(deltas: Any) -> None:
+        aclose = getattr(deltas, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def _completion_cache_key(
+        self, payload: Optional[Dict[str, Any]], run_id: str
+    ) -> Optional[str]:
+        if not self.completion_cache.cacheable(payload):
+            return None
+        key = self.completion_cache.key(payload)
+        logging_utility.debug("Run %s: completion cache key %s", run_id, key)
+        return key
+
+    def _stream_completion(
+        self,
+        open_deltas: Callable[[], Iterable[Tuple[str, str]]],
+        thread_id: str,
+        run_id: str,
+        assistant_id: str,
+        stream_reasoning: bool = True,
+        error_prefix: str = "Provider stream error",
+        split_reasoning: bool = True,
+        payload: Optional[Dict[str, Any]] = None,
+        api_key: Optional[str] = None,
+    ) -> Generator[StreamChunk, None, None]:
+        """
+        Shared streaming loop for all provider handlers.
+
+        Consumes (content, reasoning_content) deltas from ``open_deltas()``
+        through a StreamDeltaProcessor, yields StreamChunk events, then
+        stores the reply and resolves function calls and run status.
+        ``payload`` is the provider request, used as the completion cache
+        key; ``api_key`` selects the concurrency limits the stream counts
+        against.
+        """
+        processor, recognizer = self._begin_stream(
+            run_id, assistant_id, stream_reasoning, split_reasoning
+        )
+        timer = self._start_stream_timer(thread_id, payload)
+        open_deltas = partial(
+            self.governor.governed,
+            self.provider_name,
+            api_key,
+            assistant_id,
+            partial(
+                self.provider_health.timed,
+                self.provider_name,
+                (payload or {}).get("model"),
+                open_deltas,
+            ),
+        )
+        cache_key = self._completion_cache_key(payload, run_id)
+        if cache_key is not None:
+            open_deltas = partial(self.completion_cache.deltas, cache_key, open_deltas)
+        cancelled = False
+        deltas = None
 
-        # Process one line at a time if a newline is present.
-        if "\n" in code_buffer:
-            newline_pos = code_buffer.find("\n") + 1
-            line_chunk = code_buffer[:newline_pos]
-            code_buffer = code_buffer[newline_pos:]
-            # Optionally, you can add security checks here for forbidden patterns.
-            results.append(json.dumps({"type": "hot_code", "content": line_chunk}))
+        try:
+            deltas = open_deltas()
+            for content, reasoning in deltas:
+                if self.check_cancellation_flag(run_id):
+                    cancelled = True
+                    break
+                yield from self._feed_delta(processor, content, reasoning)
+                self._time_delta(timer, recognizer)
+
+            if cancelled:
+                # Close the provider's response before anything else.
+                self._close_deltas(deltas)
+                timer.stop()
+                if self.cancellation_registry.disconnected_at(run_id) is not None:
+                    self._abandon_stream(
+                        processor, thread_id, run_id, assistant_id, timer
+                    )
+                    return
+                logging_utility.warning(f"Run {run_id} cancelled mid-stream")
+                yield StreamChunk("error", "Run cancelled")
 
-        # Buffer overflow protection: if the code_buffer grows too large,
-        # yield its content as a chunk and reset it.
-        if len(code_buffer) > 100:
-            results.append(json.dumps({"type": "hot_code", "content": code_buffer}))
-            code_buffer = ""
+            for event in processor.flush():
+                yield StreamChunk(event["type"], event["content"])
+
+        except GeneratorExit:
+            # The consumer went away (client disconnect) mid-stream.
+            self._close_deltas(deltas)
+            timer.stop()
+            self._abandon_stream(processor, thread_id, run_id, assistant_id, timer)
+            raise
+        except Exception as e:
+            yield self._fail_stream(
+                processor, e, error_prefix, thread_id, run_id, assistant_id, timer
+            )
+            return
+        finally:
+            timer.stop()
+            self._close_deltas(deltas)
+            self.cancellation_registry.unwatch(run_id)
+
+        self._finish_stream(
+            processor, recognizer, thread_id, run_id, assistant_id, cancelled, timer
+        )
+
+    async def _astream_completion(
+        self,
+        open_deltas: Callable[[], AsyncIterator[Tuple[str, str]]],
+        thread_id: str,
+        run_id: str,
+        assistant_id: str,
+        stream_reasoning: bool = True,
+        error_prefix: str = "Provider stream error",
+        split_reasoning: bool = True,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[Chunk, None]:
+        """
+        Async twin of ``_stream_completion``. Deltas are processed on the
+        event loop; the blocking persistence steps run in a worker thread.
+        """
+        processor, recognizer = self._begin_stream(
+            run_id, assistant_id, stream_reasoning, split_reasoning
+        )
+        timer = self._start_stream_timer(thread_id, payload)
+        cache_key = self._completion_cache_key(payload, run_id)
+        if cache_key is not None:
+            open_deltas = partial(self.completion_cache.adeltas, cache_key, open_deltas)
+        cancelled = False
+        deltas = None
+
+        try:
+            deltas = open_deltas()
+            async for content, reasoning in deltas:
+                if self.check_cancellation_flag(run_id):
+                    cancelled = True
+                    break
+                for chunk in self._feed_delta(processor, content, reasoning):
+                    yield chunk
+                self._time_delta(timer, recognizer)
+
+            if cancelled:
+                await self._aclose_deltas(deltas)
+                timer.stop()
+                if self.cancellation_registry.disconnected_at(run_id) is not None:
+                    await asyncio.to_thread(
+                        self._abandon_stream,
+                        processor,
+                        thread_id,
+                        run_id,
+                        assistant_id,
+                        timer,
+                    )
+                    return
+                logging_utility.warning(f"Run {run_id} cancelled mid-stream")
+                yield StreamChunk("error", "Run cancelled")
 
-        return results, code_buffer
+            for event in processor.flush():
+                yield StreamChunk(event["type"], event["content"])
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # The consumer went away (client disconnect): the producer task
+            # was cancelled or this generator closed mid-stream.
+            await self._aclose_deltas(deltas)
+            timer.stop()
+            await asyncio.to_thread(
+                self._abandon_stream, processor, thread_id, run_id, assistant_id, timer
+            )
+            raise
+        except Exception as e:
+            yield await asyncio.to_thread(
+                self._fail_stream,
+                processor,
+                e,
+                error_prefix,
+                thread_id,
+                run_id,
+                assistant_id,
+                timer,
+            )
+            return
+        finally:
+            timer.stop()
+            self.cancellation_registry.unwatch(run_id)
+
+        await asyncio.to_thread(
+            self._finish_stream,
+            processor,
+            recognizer,
+            thread_id,
+            run_id,
+            assistant_id,
+            cancelled,
+            timer,
+        )
+
+    # ------------------------------------------------------------------ #
+    # Native asyncio path (OpenAI-compatible providers)
+    # ------------------------------------------------------------------ #
+    @property
+    def provider_name(self) -> str:
+        """Label for per-provider limits and statistics."""
+        return self.ASYNC_PROVIDER or type(self).__name__
+
+    @property
+    def supports_async_stream(self) -> bool:
+        """Handlers opt in by declaring ``ASYNC_PROVIDER``."""
+        return self.ASYNC_PROVIDER is not None
+
+    def _resolve_async_endpoint(
+        self, api_key: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        base_url = os.getenv(self.PROVIDER_BASE_URL_ENV or "") or (
+            self.PROVIDER_DEFAULT_BASE_URL
+        )
+        if not api_key and self.PROVIDER_API_KEY_ENV:
+            api_key = os.getenv(self.PROVIDER_API_KEY_ENV)
+        return base_url, api_key
+
+    async def astream(
+        self,
+        thread_id: str,
+        message_id: str,
+        run_id: str,
+        assistant_id: str,
+        model: Any,
+        stream_reasoning: bool = True,
+        api_key: Optional[str] = None,
+    ) -> AsyncGenerator[Chunk, None]:
+        """
+        Streams a completion over the shared ``httpx.AsyncClient`` without
+        tying up an executor thread for the lifetime of the stream.
+        """
+        if not self.supports_async_stream:
+            raise NotImplementedError(f"{type(self).__name__} has no async stream")
+
+        self.start_cancellation_listener(run_id)
+
+        unified_model = model
+        if self._get_model_map(value=model):
+            model = self._get_model_map(value=model)
+
+        base_url, api_key = self._resolve_async_endpoint(api_key)
+        if not base_url or not api_key:
+            logging_utility.error(
+                f"Run {run_id}: {self.ASYNC_PROVIDER} endpoint or API key missing."
+            )
+            yield StreamChunk(
+                "error", f"{self.ASYNC_PROVIDER} client configuration error."
+            )
+            return
+
+        messages = await asyncio.to_thread(
+            self._set_up_context_window, assistant_id, thread_id, True
+        )
+        payload = {"model": model, "messages": messages, **self.STREAM_PARAMS}
+        client = get_async_openai_client()
+
+        # Every stream goes through the first-token race: with one leg it
+        # only records TTFT; hedged assistants add equivalent providers.
+        legs = [
+            provider_leg(
+                self.ASYNC_PROVIDER,
+                unified_model,
+                api_key,
+                assistant_id,
+                partial(client.stream_chat_completion, base_url, api_key, payload),
+            )
+        ]
+        if hedging_enabled(self._assistant_meta.get(assistant_id)):
+            legs += build_hedge_legs(
+                self.ASYNC_PROVIDER, unified_model, messages, client, assistant_id
+            )
+
+        async for chunk in self._astream_completion(
+            lambda: race_first_token(legs),
+            thread_id=thread_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            stream_reasoning=stream_reasoning,
+            error_prefix=f"{self.ASYNC_PROVIDER} stream error",
+            split_reasoning=self.SPLIT_REASONING,
+            payload=payload,
+        ):
+            yield chunk
+
+    async def aprocess_conversation(
+        self,
+        thread_id,
+        message_id,
+        run_id,
+        assistant_id,
+        model,
+        stream_reasoning=False,
+        api_key: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncGenerator[Chunk, None]:
+        """
+        Async counterpart of ``process_conversation``: stream, run any tool
+        call (blocking steps in worker threads), then stream the follow-up.
+        """
+        stream_kwargs = dict(
+            thread_id=thread_id,
+            message_id=message_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            model=model,
+            stream_reasoning=stream_reasoning,
+            api_key=api_key,
+        )
+        async for chunk in self.astream(**stream_kwargs):
+            yield chunk
+
+        fc_state = self.get_function_call_state()
+
+        async for chunk in iterate_sync_in_thread(
+            self.process_function_calls(
+                thread_id=thread_id,
+                run_id=run_id,
+                assistant_id=assistant_id,
+                model=model,
+                api_key=api_key,
+            )
+        ):
+            yield chunk
+
+        if fc_state:
+            async for chunk in self.astream(**stream_kwargs):
+                yield chunk
 
     def _set_up_context_window(self, assistant_id, thread_id, trunk=True):
         """Prepares and optimizes conversation context for model processing.
@@ -1958,110 +2702,135 @@ class BaseInference(ABC):
         Processing Pipeline:
             1. Retrieve assistant configuration and tools
             2. Fetch complete conversation history
-            3. Inject system message with:
-               - Active tools list
+            3. Inject system message (see system_message.system_prompt):
+               - Active tools list as canonical JSON
                - Current instructions
-               - Temporal context (today's date)
+               - Temporal context (today's date), last
             4. Normalize message roles for API consistency
             5. Apply sliding window truncation when enabled
 
         Note:
-            Uses LRU-cached service calls for assistant/message retrieval to optimize
-            repeated requests with identical parameters.
+            Message history and per-message token counts come from the per-thread
+            context cache, so only messages added since the last turn are fetched
+            and tokenised.
         """
 
-        client = self._get_project_david_client(
-            api_key=os.getenv("ADMIN_API_KEY"), base_url=os.getenv("BASE_URL")
-        )
+        started = time.monotonic()
+        client = self.service_gateway
 
         assistant = client.assistants.retrieve_assistant(assistant_id=assistant_id)
 
         tools = self.tool_service.list_tools(
             assistant_id=assistant_id, restructure=True
         )
+        # Kept for validating tool calls recognised in the upcoming stream.
+        self._assistant_tools[assistant_id] = tools
+        self._assistant_meta[assistant_id] = (
+            getattr(assistant, "meta_data", None) or {}
+        )
 
-        # Get the current date and time
-        today = datetime.now()
+        # Static prefix (canonical tools JSON + instructions) first, the
+        # date last, so provider prefix caches hit across turns.
+        system_prompt = self.system_prompts.build(
+            assistant_id, assistant.instructions, tools
+        )
+        system_message = system_prompt.content
+        logging_utility.debug(
+            "Assistant %s system prompt prefix %s",
+            assistant_id,
+            system_prompt.version,
+        )
 
-        # Format the date and time as a string
-        formatted_datetime = today.strftime("%Y-%m-%d %H:%M:%S")
-        # Include the formatted date and time in the system message
-        conversation_history = client.messages.get_formatted_messages(
-            thread_id,
-            system_message="tools:"
-            + str(tools)
-            + "\n"
-            + assistant.instructions
-            + "\n"
-            + f"Today's date and time:, {formatted_datetime}",
+        messages, token_counts = self._thread_history(
+            thread_id, system_message, with_token_counts=trunk
         )
 
-        messages = self.normalize_roles(conversation_history)
+        if trunk:
+            # Sliding Windows Truncation
+            messages = self.conversation_truncator.truncate(messages, token_counts)
+        messages = strip_pins(messages)
 
-        # Sliding Windows Truncation
-        truncated_message = self.conversation_truncator.truncate(messages)
+        self._context_seconds[thread_id] = time.monotonic() - started
+        return messages
 
-        if trunk:
-            return truncated_message
-        else:
-            return messages
+    def _thread_history(self, thread_id, system_message, with_token_counts=True):
+        """
+        Returns the normalised thread history behind ``system_message`` and,
+        when requested, the token count of each message.
+
+        Served from the per-thread context cache, so only messages added
+        since the previous turn are fetched, normalised and tokenised. The
+        HTTP gateway has no incremental endpoint and reads the whole thread.
+        """
+        messages_api = self.service_gateway.messages
+        if not hasattr(messages_api, "get_formatted_messages_since"):
+            conversation_history = messages_api.get_formatted_messages(
+                thread_id, system_message=system_message
+            )
+            return self._normalize_keeping_pins(conversation_history), None
+
+        truncator = self.conversation_truncator if with_token_counts else None
+        tokenizer = self.truncator_params["model_name"]
+        history, token_counts = self.context_cache.history(
+            thread_id,
+            load=lambda after, exclude: messages_api.get_formatted_messages_since(
+                thread_id,
+                after_created_at=after,
+                exclude_ids=exclude,
+                tokenizer=tokenizer,
+            ),
+            normalize=self._normalize_keeping_pins,
+            count_tokens=truncator.count_tokens_batch if truncator else None,
+            tokenizer_key=tokenizer,
+        )
+
+        system_entry = self.normalize_roles(
+            [{"role": "system", "content": system_message}]
+        )
+        if token_counts is not None:
+            system_tokens = truncator.count_tokens(system_entry[0]["content"])
+            token_counts = [system_tokens] + token_counts
+        return system_entry + history, token_counts
 
     def parse_and_set_function_calls(
-        self, accumulated_content: str, assistant_reply: str
+        self,
+        accumulated_content: str,
+        assistant_reply: str,
+        recognizer: Optional[ToolCallRecognizer] = None,
     ) -> Optional[Dict[str, Any]]:
         """
-        Parses the accumulated content for function calls.
+        Resolves the function call for a finished reply.
+
+        Uses the recognizer that watched the stream when given; otherwise the
+        content is scanned once. Calls are validated against the assistant's
+        tool schemas.
 
         Returns:
             dict | None: The parsed function call payload if detected, else None.
         """
-        parsed_function_call = None
-
-        if accumulated_content:
-            logging_utility.debug("Raw accumulated content: %s", accumulated_content)
+        if not accumulated_content:
+            return None
 
-            # check if there is a JSON in the message, I mean, if the message is just JSON (true or false)
-            json_accumulated_content = self.ensure_valid_json(text=accumulated_content)
+        if recognizer is None:
+            recognizer = self._new_tool_call_recognizer(self.assistant_id)
+            recognizer.feed(accumulated_content)
 
-            # set the function call based on the JSON, if the message is just JSON
-            if json_accumulated_content:
-                function_call = self.is_valid_function_call_response(
-                    json_data=json_accumulated_content
-                )
-                logging_utility.debug("Valid Function call: %s", function_call)
+        parsed_function_call = recognizer.finish(accumulated_content)
 
-                complex_vector_search = self.is_complex_vector_search(
-                    data=json_accumulated_content
-                )
-
-                if function_call or complex_vector_search:
-                    self.set_tool_response_state(True)
-                    self.set_function_call_state(json_accumulated_content)
-                    parsed_function_call = json_accumulated_content
-                    logging_utility.debug(
-                        "Function call State set with payload: %s", parsed_function_call
-                    )
-            else:
-                # if the output does not contain a direct JSON, we look if the JSON is inside the message body
-                logging_utility.debug(
-                    "Looking for JSON inside assistant response..."
-                )
-                tool_invocation_in_multi_line_text = (
-                    self.extract_function_calls_within_body_of_text(text=assistant_reply)
-                )
-                if tool_invocation_in_multi_line_text:
-                    logging_utility.debug(
-                        "Embedded Function Call detected: %s",
-                        tool_invocation_in_multi_line_text,
-                    )
-                    self.set_tool_response_state(True)
-                    embedded_call = tool_invocation_in_multi_line_text[0]
-                    self.set_function_call_state(embedded_call)
-                    parsed_function_call = embedded_call
-                else:
-                    logging_utility.debug(
-                        f"Did not find any JSON in the assistant reply: {assistant_reply}"
-                    )
+        if parsed_function_call:
+            self.set_tool_response_state(True)
+            self.set_function_call_state(parsed_function_call)
+            # A reply may carry several calls (an array or consecutive
+            # objects); all of them are run when the run allows it.
+            self.set_tool_calls_state(recognizer.tool_calls)
+            logging_utility.debug(
+                "Function call State set with payload: %s", recognizer.tool_calls
+            )
+        elif recognizer.rejected:
+            logging_utility.warning(
+                "Ignored tool call(s) not matching the assistant's tools: %s",
+                [call.get("name") for call in recognizer.rejected],
+            )
 
         return parsed_function_call
 
@@ -2075,6 +2844,24 @@ class BaseInference(ABC):
         if not fc_state:
             return
 
+        calls = self.get_tool_calls_state()
+        if len(calls) > 1:
+            if self._parallel_tool_calls_allowed(run_id):
+                yield from self._process_tool_call_batch(
+                    thread_id=thread_id,
+                    run_id=run_id,
+                    assistant_id=assistant_id,
+                    calls=calls,
+                    api_key=api_key,
+                )
+                return
+            logging_utility.info(
+                "Run %s: parallel_tool_calls is off; running the first of %d calls",
+                run_id,
+                len(calls),
+            )
+            self._discard_prepared_actions(run_id, keep=fc_state)
+
         tool_name = fc_state.get("name")
         arguments_dict = fc_state.get("arguments")
 
@@ -2110,24 +2897,16 @@ class BaseInference(ABC):
                 )
             else:
                 # Special-case platform tools (using consumer tool processing)
-                self._process_tool_calls(
-                    thread_id=thread_id,
-                    assistant_id=assistant_id,
-                    content=fc_state,
-                    run_id=run_id,
-                )
+                action = self._hand_over_action(run_id, fc_state)
+                yield self._action_required_chunk(run_id, action, fc_state)
+                self._resume_after_action(run_id, action)
 
         # --- Consumer Tool Handling ---
         else:
             # Non-platform (consumer) tools
-
-            self._process_tool_calls(
-                thread_id=thread_id,
-                assistant_id=assistant_id,
-                content=fc_state,
-                run_id=run_id,
-                api_key=api_key,
-            )
+            action = self._hand_over_action(run_id, fc_state)
+            yield self._action_required_chunk(run_id, action, fc_state)
+            self._resume_after_action(run_id, action)
 
         # --- Stream Output ---
         # if processed:
@@ -0,0 +1,211 @@
+# entities_api/inference/circuit_breaker.py
+
+"""
+Per-provider circuit breakers.
+
+Each provider's circuit is fed the outcome of every stream's first token
+(see ProviderLatencyTracker): a first token is a success, a failure before
+one is a failure. The circuit
+
+* opens when, over the last CIRCUIT_WINDOW streams (at least
+  CIRCUIT_MIN_REQUESTS), the failure rate reaches
+  CIRCUIT_FAILURE_THRESHOLD, or after CIRCUIT_CONSECUTIVE_FAILURES
+  failures in a row;
+* stays open for CIRCUIT_COOLDOWN_SECONDS, during which the selector
+  routes equivalent models to healthy providers;
+* then turns half-open and lets a single probe through. A successful
+  probe closes the circuit; a failed one re-opens it with the cooldown
+  doubled, up to CIRCUIT_MAX_COOLDOWN_SECONDS. A probe that never reports
+  back frees the slot after CIRCUIT_PROBE_TIMEOUT_SECONDS.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Circuit:
+    __slots__ = (
+        "state",
+        "outcomes",
+        "consecutive_failures",
+        "opened_at",
+        "cooldown",
+        "probe_started_at",
+        "times_opened",
+    )
+
+    def __init__(self, window: int, cooldown: float):
+        self.state = CLOSED
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.cooldown = cooldown
+        self.probe_started_at: Optional[float] = None
+        self.times_opened = 0
+
+
+class CircuitBreakerBoard:
+    """Circuit state for every provider seen so far."""
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_requests: int = 5,
+        failure_threshold: float = 0.5,
+        consecutive_failures: int = 5,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+        probe_timeout: float = 60.0,
+    ):
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_threshold = failure_threshold
+        self.consecutive_failures = consecutive_failures
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _circuit(self, provider: str) -> _Circuit:
+        circuit = self._circuits.get(provider)
+        if circuit is None:
+            circuit = self._circuits[provider] = _Circuit(self.window, self.cooldown)
+        return circuit
+
+    def _open_locked(self, provider: str, circuit: _Circuit, now: float) -> None:
+        circuit.state = OPEN
+        circuit.opened_at = now
+        circuit.probe_started_at = None
+        circuit.times_opened += 1
+        logging_utility.warning(
+            "Circuit for %s opened for %.1fs (%d consecutive failures)",
+            provider,
+            circuit.cooldown,
+            circuit.consecutive_failures,
+        )
+
+    def allow(self, provider: str) -> bool:
+        """
+        Whether a request may go to ``provider`` now. In half-open state
+        this hands out the single probe slot.
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(provider)
+            if circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN:
+                if now - circuit.opened_at < circuit.cooldown:
+                    return False
+                circuit.state = HALF_OPEN
+                circuit.probe_started_at = None
+            if (
+                circuit.probe_started_at is None
+                or now - circuit.probe_started_at >= self.probe_timeout
+            ):
+                circuit.probe_started_at = now
+                logging_utility.info("Circuit for %s half-open; probing", provider)
+                return True
+            return False
+
+    def record_success(self, provider: str) -> None:
+        with self._lock:
+            circuit = self._circuit(provider)
+            circuit.outcomes.append(True)
+            circuit.consecutive_failures = 0
+            # Streams admitted before the circuit opened may still succeed;
+            # only the probe closes it.
+            if circuit.state == HALF_OPEN:
+                logging_utility.info("Circuit for %s closed", provider)
+                circuit.state = CLOSED
+                circuit.cooldown = self.cooldown
+                circuit.probe_started_at = None
+                circuit.outcomes.clear()
+
+    def record_failure(self, provider: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(provider)
+            circuit.outcomes.append(False)
+            circuit.consecutive_failures += 1
+            if circuit.state == HALF_OPEN:
+                circuit.cooldown = min(self.max_cooldown, circuit.cooldown * 2)
+                self._open_locked(provider, circuit, now)
+                return
+            if circuit.state == OPEN:
+                return
+            failures = circuit.outcomes.count(False)
+            if circuit.consecutive_failures >= self.consecutive_failures or (
+                len(circuit.outcomes) >= self.min_requests
+                and failures / len(circuit.outcomes) >= self.failure_threshold
+            ):
+                self._open_locked(provider, circuit, now)
+
+    def state(self, provider: str) -> str:
+        with self._lock:
+            circuit = self._circuits.get(provider)
+            return circuit.state if circuit else CLOSED
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                provider: {
+                    "state": circuit.state,
+                    "failure_rate": (
+                        round(circuit.outcomes.count(False) / len(circuit.outcomes), 4)
+                        if circuit.outcomes
+                        else None
+                    ),
+                    "consecutive_failures": circuit.consecutive_failures,
+                    "times_opened": circuit.times_opened,
+                    "retry_in_seconds": (
+                        round(max(0.0, circuit.cooldown - (now - circuit.opened_at)), 1)
+                        if circuit.state == OPEN
+                        else None
+                    ),
+                }
+                for provider, circuit in sorted(self._circuits.items())
+            }
+
+
+_board: Optional[CircuitBreakerBoard] = None
+_board_lock = threading.Lock()
+
+
+def get_circuit_breakers() -> CircuitBreakerBoard:
+    """Returns the process-wide board, creating it on first use."""
+    global _board
+    if _board is None:
+        with _board_lock:
+            if _board is None:
+                _board = CircuitBreakerBoard(
+                    window=int(os.getenv("CIRCUIT_WINDOW", "20")),
+                    min_requests=int(os.getenv("CIRCUIT_MIN_REQUESTS", "5")),
+                    failure_threshold=float(
+                        os.getenv("CIRCUIT_FAILURE_THRESHOLD", "0.5")
+                    ),
+                    consecutive_failures=int(
+                        os.getenv("CIRCUIT_CONSECUTIVE_FAILURES", "5")
+                    ),
+                    cooldown=float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30")),
+                    max_cooldown=float(
+                        os.getenv("CIRCUIT_MAX_COOLDOWN_SECONDS", "300")
+                    ),
+                    probe_timeout=float(
+                        os.getenv("CIRCUIT_PROBE_TIMEOUT_SECONDS", "60")
+                    ),
+                )
+    return _board
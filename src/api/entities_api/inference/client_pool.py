@@ -0,0 +1,247 @@
+# entities_api/inference/client_pool.py
+
+"""
+Process-wide pool of provider SDK clients.
+
+Handlers used to build Together/OpenAI clients in ``__init__`` and cache
+per-key clients with ``lru_cache`` on instance methods. Those caches were
+keyed on the handler and the raw API key, so every handler instance held
+its own clients, nothing was ever released, and each new BYO key paid a
+fresh TLS handshake.
+
+The pool keeps:
+
+* one keep-alive ``httpx.Client`` per base URL (HTTP/2 when ``h2`` is
+  installed), shared by every OpenAI-compatible client for that endpoint,
+  so a new API key reuses already-open connections;
+* one SDK client per ``(provider, base_url, sha256(api_key))``, bounded by
+  INFERENCE_CLIENT_POOL_SIZE (LRU) and dropped after
+  INFERENCE_CLIENT_IDLE_SECONDS without use.
+
+Raw keys are never used as cache keys or reported in stats.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from openai import OpenAI
+from projectdavid_common.utilities.logging_service import LoggingUtility
+from together import Together
+
+from entities_api.inference.async_openai_client import HTTP2_AVAILABLE
+
+logging_utility = LoggingUtility()
+
+PROVIDER_OPENAI = "openai"
+PROVIDER_TOGETHER = "together"
+
+DEFAULT_POOL_SIZE = 256
+DEFAULT_IDLE_SECONDS = 900.0
+# Idle entries are swept at most this often, on the request path.
+EVICTION_SWEEP_INTERVAL = 30.0
+
+
+def hash_api_key(api_key: Optional[str]) -> str:
+    """Stable, non-reversible pool key for an API key."""
+    if not api_key:
+        return "-"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+
+class _PooledClient:
+    __slots__ = ("client", "created_at", "last_used", "hits")
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.created_at = self.last_used = time.monotonic()
+        self.hits = 0
+
+
+class ProviderClientPool:
+    """Bounded LRU of provider clients over shared per-endpoint transports."""
+
+    def __init__(
+        self,
+        max_clients: int = DEFAULT_POOL_SIZE,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        max_connections: int = 200,
+        max_keepalive_connections: int = 50,
+    ):
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[Tuple[str, str, str], _PooledClient]" = (
+            OrderedDict()
+        )
+        self._transports: Dict[str, httpx.Client] = {}
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------ #
+    # Transports
+    # ------------------------------------------------------------------ #
+    def http_client(self, base_url: Optional[str]) -> httpx.Client:
+        """The shared keep-alive HTTP client for ``base_url``."""
+        endpoint = (base_url or "").rstrip("/")
+        with self._lock:
+            transport = self._transports.get(endpoint)
+            if transport is None:
+                transport = self._transports[endpoint] = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    timeout=httpx.Timeout(30.0, read=30.0),
+                    limits=self._limits,
+                    follow_redirects=True,
+                )
+        return transport
+
+    def warm_endpoint(self, base_url: str) -> Dict[str, Any]:
+        """
+        Opens a connection (TCP + TLS) to ``base_url`` so the first request
+        does not pay for the handshake. Any HTTP response counts as warm.
+        """
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"base_url": base_url.rstrip("/")}
+        try:
+            self.http_client(base_url).head(base_url)
+            result["warm"] = True
+        except Exception as e:
+            logging_utility.warning("TLS warm-up failed for %s: %s", base_url, e)
+            result["warm"] = False
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    def warm(self, base_urls: Iterable[Optional[str]]) -> List[Dict[str, Any]]:
+        endpoints = {url.rstrip("/") for url in base_urls if url}
+        return [self.warm_endpoint(url) for url in sorted(endpoints)]
+
+    # ------------------------------------------------------------------ #
+    # Clients
+    # ------------------------------------------------------------------ #
+    def get(
+        self,
+        provider: str,
+        base_url: Optional[str],
+        api_key: Optional[str],
+        factory: Callable[[], Any],
+    ) -> Any:
+        """Returns the pooled client for the key, building it on a miss."""
+        key = (provider, (base_url or "").rstrip("/"), hash_api_key(api_key))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= EVICTION_SWEEP_INTERVAL:
+                self._evict_idle_locked(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                entry.last_used = now
+                entry.hits += 1
+                self.hits += 1
+                return entry.client
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss on the same key keeps
+        # whichever client was stored first.
+        client = factory()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._clients[key] = _PooledClient(client)
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+                    self.evictions += 1
+            return entry.client
+
+    def openai(self, api_key: Optional[str], base_url: Optional[str]) -> OpenAI:
+        return self.get(
+            PROVIDER_OPENAI,
+            base_url,
+            api_key,
+            lambda: OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self.http_client(base_url),
+            ),
+        )
+
+    def together(self, api_key: Optional[str]) -> Together:
+        return self.get(
+            PROVIDER_TOGETHER, None, api_key, lambda: Together(api_key=api_key)
+        )
+
+    def _evict_idle_locked(self, now: float) -> None:
+        self._last_sweep = now
+        stale = [
+            key
+            for key, entry in self._clients.items()
+            if now - entry.last_used >= self.idle_seconds
+        ]
+        for key in stale:
+            # Transports are shared, so dropping the wrapper never closes a
+            # connection another client is using.
+            del self._clients[key]
+        self.evictions += len(stale)
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            self._evict_idle_locked(time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_provider: Dict[str, int] = {}
+            for provider, _, _ in self._clients:
+                by_provider[provider] = by_provider.get(provider, 0) + 1
+            lookups = self.hits + self.misses
+            return {
+                "clients": len(self._clients),
+                "max_clients": self.max_clients,
+                "clients_by_provider": by_provider,
+                "transports": sorted(self._transports),
+                "http2": HTTP2_AVAILABLE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            transports = list(self._transports.values())
+            self._transports.clear()
+            self._clients.clear()
+        for transport in transports:
+            transport.close()
+
+
+_pool: Optional[ProviderClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ProviderClientPool:
+    """Returns the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProviderClientPool(
+                    max_clients=int(
+                        os.getenv("INFERENCE_CLIENT_POOL_SIZE", DEFAULT_POOL_SIZE)
+                    ),
+                    idle_seconds=float(
+                        os.getenv(
+                            "INFERENCE_CLIENT_IDLE_SECONDS", DEFAULT_IDLE_SECONDS
+                        )
+                    ),
+                )
+    return _pool
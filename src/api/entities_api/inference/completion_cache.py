@@ -0,0 +1,362 @@
+# entities_api/inference/completion_cache.py
+
+"""
+Deterministic completion cache.
+
+Replays, eval suites and repeated FAQ questions send byte-identical
+payloads to the provider. With the cache on, the raw ``(content,
+reasoning)`` deltas of a completed stream are stored under a hash of the
+final provider payload (model, messages, sampling parameters). An
+identical payload later replays those deltas through the normal stream
+loop, so clients receive the same ``content`` / ``reasoning`` chunks and
+the reply, tool calls and run status are handled as for a live stream.
+
+Streams that fail or are cancelled are never stored.
+
+Two tiers:
+
+* memory - LRU bounded by COMPLETION_CACHE_SIZE entries and
+  COMPLETION_CACHE_MAX_BYTES;
+* disk   - one JSON file per entry under COMPLETION_CACHE_DIR (unset: no
+  disk tier), oldest files pruned beyond COMPLETION_CACHE_DISK_MAX_BYTES.
+  Disk hits are promoted to memory.
+
+Both expire entries after COMPLETION_CACHE_TTL_SECONDS.
+
+COMPLETION_CACHE selects the mode: ``off`` (default), ``on`` (only
+payloads with temperature 0 - sampled output is not deterministic) or
+``force`` (cache whatever the temperature).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import (Any, AsyncIterator, Callable, Dict, Iterable, Iterator,
+                    List, Optional, Tuple)
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+CACHE_OFF = "off"
+CACHE_ON = "on"
+CACHE_FORCE = "force"
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 24 * 3600.0
+# Per-delta bookkeeping counted on top of the text itself.
+DELTA_OVERHEAD_BYTES = 64
+# Transport flags that do not change the completion.
+IGNORED_PAYLOAD_KEYS = ("stream",)
+
+Delta = Tuple[str, str]
+
+
+def _entry_size(deltas: List[Delta]) -> int:
+    return sum(
+        len(content) + len(reasoning) + DELTA_OVERHEAD_BYTES
+        for content, reasoning in deltas
+    )
+
+
+class _Entry:
+    __slots__ = ("deltas", "size", "stored_at")
+
+    def __init__(self, deltas: List[Delta], stored_at: float):
+        self.deltas = deltas
+        self.size = _entry_size(deltas)
+        self.stored_at = stored_at
+
+
+class CompletionCache:
+    """Two-tier (memory LRU + disk) store of completed delta streams."""
+
+    def __init__(
+        self,
+        mode: str = CACHE_OFF,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+    ):
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------ #
+    # Keys and eligibility
+    # ------------------------------------------------------------------ #
+    def cacheable(self, payload: Optional[Dict[str, Any]]) -> bool:
+        """Whether a stream for ``payload`` may be served from the cache."""
+        if self.mode == CACHE_OFF or payload is None:
+            return False
+        if self.mode != CACHE_FORCE and (payload.get("temperature") or 0) > 0:
+            self.bypassed += 1
+            return False
+        return True
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        """sha256 of the canonical JSON of the payload."""
+        canonical = {
+            name: value
+            for name, value in payload.items()
+            if name not in IGNORED_PAYLOAD_KEYS and value is not None
+        }
+        encoded = json.dumps(
+            canonical,
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------ #
+    # Memory tier
+    # ------------------------------------------------------------------ #
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return now - stored_at >= self.ttl_seconds
+
+    def _remember_locked(self, key: str, entry: _Entry) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[List[Delta]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry.stored_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.deltas
+                del self._entries[key]
+                self._bytes -= entry.size
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember_locked(key, entry)
+        return entry.deltas
+
+    def put(self, key: str, deltas: List[Delta]) -> None:
+        entry = _Entry(list(deltas), time.time())
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._remember_locked(key, entry)
+            self.stores += 1
+        self._write_disk(key, entry)
+
+    # ------------------------------------------------------------------ #
+    # Disk tier
+    # ------------------------------------------------------------------ #
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str, now: float) -> Optional[_Entry]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                record = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging_utility.warning("Unreadable completion cache file %s: %s", path, e)
+            return None
+
+        if self._expired(record["stored_at"], now):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return _Entry([tuple(delta) for delta in record["deltas"]], record["stored_at"])
+
+    def _write_disk(self, key: str, entry: _Entry) -> None:
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(
+                    {"stored_at": entry.stored_at, "deltas": entry.deltas}, handle
+                )
+            written = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging_utility.warning("Could not write completion cache file: %s", e)
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += written
+            over = self._disk_bytes > self.disk_max_bytes
+        if over:
+            self._prune_disk()
+
+    def _disk_files(self) -> Iterable[Tuple[str, int, float]]:
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _prune_disk(self) -> None:
+        """Deletes the oldest files until the tier is at 90% of its budget."""
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * 0.9
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    # ------------------------------------------------------------------ #
+    # Stream wrappers
+    # ------------------------------------------------------------------ #
+    def deltas(
+        self, key: str, open_deltas: Callable[[], Iterable[Delta]]
+    ) -> Iterator[Delta]:
+        """Replays ``key`` or streams ``open_deltas()``, storing it on success."""
+        cached = self.get(key)
+        if cached is not None:
+            yield from cached
+            return
+        recorded: List[Delta] = []
+        for delta in open_deltas():
+            recorded.append(delta)
+            yield delta
+        self.put(key, recorded)
+
+    async def adeltas(
+        self, key: str, open_deltas: Callable[[], AsyncIterator[Delta]]
+    ) -> AsyncIterator[Delta]:
+        """Async twin of ``deltas``; tier I/O runs in a worker thread."""
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            for delta in cached:
+                yield delta
+            return
+        recorded: List[Delta] = []
+        async for delta in open_deltas():
+            recorded.append(delta)
+            yield delta
+        await asyncio.to_thread(self.put, key, recorded)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "mode": self.mode,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_dir": self.disk_dir,
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (
+                    round((self.hits + self.disk_hits) / lookups, 4)
+                    if lookups
+                    else None
+                ),
+                "stores": self.stores,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+            }
+
+
+def configured_cache_mode() -> str:
+    mode = os.getenv("COMPLETION_CACHE", CACHE_OFF).strip().lower()
+    if mode not in (CACHE_OFF, CACHE_ON, CACHE_FORCE):
+        logging_utility.warning(
+            "Unknown COMPLETION_CACHE '%s', completion cache stays off.", mode
+        )
+        return CACHE_OFF
+    return mode
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Returns the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompletionCache(
+                    mode=configured_cache_mode(),
+                    max_entries=int(
+                        os.getenv("COMPLETION_CACHE_SIZE", DEFAULT_MAX_ENTRIES)
+                    ),
+                    max_bytes=int(
+                        os.getenv("COMPLETION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+                    ),
+                    ttl_seconds=float(
+                        os.getenv("COMPLETION_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+                    ),
+                    disk_dir=os.getenv("COMPLETION_CACHE_DIR") or None,
+                    disk_max_bytes=int(
+                        os.getenv(
+                            "COMPLETION_CACHE_DISK_MAX_BYTES", DEFAULT_DISK_MAX_BYTES
+                        )
+                    ),
+                )
+    return _cache
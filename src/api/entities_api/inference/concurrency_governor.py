@@ -0,0 +1,417 @@
+# entities_api/inference/concurrency_governor.py
+
+"""
+Concurrency and rate governor for provider streams.
+
+Bursts used to fan straight out to the providers, which answered with 429s
+that surfaced as failed runs. Every provider stream now takes a permit
+from the limiter for its ``(provider, sha256(api_key))`` pair first. A
+limiter allows at most ``concurrency`` streams in flight and, when a rate
+is set, starts at most ``rate`` per second (token bucket, ``burst``
+deep). Requests over the limit wait in a queue instead of failing:
+
+* queues are per assistant and served round-robin, so one assistant's
+  burst cannot starve the others sharing a key;
+* a request that has not been admitted after INFERENCE_QUEUE_MAX_WAIT
+  seconds fails with ProviderBusyError.
+
+Defaults (per provider and key) come from INFERENCE_MAX_CONCURRENCY
+(0 = no limit), INFERENCE_RATE_LIMIT (0 = no rate limit) and
+INFERENCE_RATE_BURST; INFERENCE_PROVIDER_LIMITS overrides them per
+provider, e.g. ``{"Hyperbolic": {"concurrency": 8, "rate": 4, "burst": 8}}``.
+Both limits are off by default: a ceiling that suits one provider and key
+would throttle another, so limits are opted into per deployment.
+
+Works from threads (sync handlers) and from the event loop (async
+handlers) against the same limits.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import (Any, AsyncIterator, Callable, Deque, Dict, Iterable,
+                    Iterator, Optional, Tuple)
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+from entities_api.inference.client_pool import hash_api_key
+from entities_api.inference.provider_health import percentile
+
+logging_utility = LoggingUtility()
+
+# 0: no concurrency limit unless configured.
+DEFAULT_CONCURRENCY = 0
+DEFAULT_MAX_QUEUE_WAIT = 30.0
+# Idle limiters are dropped once there are more than this many.
+MAX_IDLE_LIMITERS = 1024
+WAIT_SAMPLES = 500
+WAIT_PERCENTILES = (("p50", 50.0), ("p95", 95.0), ("max", 100.0))
+ANONYMOUS_ASSISTANT = "-"
+
+Delta = Tuple[str, str]
+
+
+class ProviderBusyError(RuntimeError):
+    """Raised when a stream is not admitted within the maximum queue wait."""
+
+
+class _Waiter:
+    __slots__ = ("assistant", "wake", "enqueued_at", "granted")
+
+    def __init__(self, assistant: str, wake: Callable[[], None], now: float):
+        self.assistant = assistant
+        self.wake = wake
+        self.enqueued_at = now
+        self.granted = False
+
+
+class _Limiter:
+    """Limits for one (provider, key); guarded by the governor's lock."""
+
+    def __init__(self, concurrency: int, rate: float, burst: float):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.inflight = 0
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.queued = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.admitted = 0
+        self.rejected = 0
+        self.last_used = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            elapsed = now - self.refilled_at
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.refilled_at = now
+
+    def token_eta(self, now: float) -> Optional[float]:
+        """Seconds until a rate token is available (None: not rate-bound)."""
+        if self.rate <= 0 or self.tokens >= 1:
+            return None
+        return (1 - self.tokens) / self.rate
+
+    def try_take(self, now: float) -> bool:
+        if 0 < self.concurrency <= self.inflight:
+            return False
+        self._refill(now)
+        if self.rate > 0:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+        self.inflight += 1
+        self.admitted += 1
+        self.last_used = now
+        return True
+
+    def enqueue(self, waiter: _Waiter) -> None:
+        self.queues.setdefault(waiter.assistant, deque()).append(waiter)
+        self.queued += 1
+
+    def remove(self, waiter: _Waiter) -> None:
+        queue = self.queues.get(waiter.assistant)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+            if not queue:
+                del self.queues[waiter.assistant]
+
+    def dispatch(self, now: float) -> None:
+        """Admits queued waiters round-robin by assistant while capacity lasts."""
+        while self.queues and self.try_take(now):
+            assistant, queue = next(iter(self.queues.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self.queues.move_to_end(assistant)
+            else:
+                del self.queues[assistant]
+            waiter.granted = True
+            self.waits.append(now - waiter.enqueued_at)
+            waiter.wake()
+
+    def release(self, now: float) -> None:
+        self.inflight -= 1
+        self.last_used = now
+        self.dispatch(now)
+
+    @property
+    def idle(self) -> bool:
+        return self.inflight == 0 and not self.queues
+
+
+class Permit:
+    """Admission for one stream; release exactly once when it ends."""
+
+    __slots__ = ("_governor", "_limiter", "_released")
+
+    def __init__(self, governor: "ConcurrencyGovernor", limiter: _Limiter):
+        self._governor = governor
+        self._limiter = limiter
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._governor._release(self._limiter)
+
+
+class ConcurrencyGovernor:
+    """Per-(provider, API key) concurrency limits with fair queueing."""
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: float = 0.0,
+        burst: Optional[float] = None,
+        max_queue_wait: float = DEFAULT_MAX_QUEUE_WAIT,
+        provider_limits: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.max_queue_wait = max_queue_wait
+        self.provider_limits = provider_limits or {}
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], _Limiter] = {}
+
+    def _limiter(self, provider: str, api_key: Optional[str]) -> _Limiter:
+        key = (provider, hash_api_key(api_key))
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            overrides = self.provider_limits.get(provider, {})
+            rate = float(overrides.get("rate", self.rate))
+            default_burst = max(1.0, rate) if "rate" in overrides else self.burst
+            limiter = self._limiters[key] = _Limiter(
+                int(overrides.get("concurrency", self.concurrency)),
+                rate,
+                float(overrides.get("burst", default_burst)),
+            )
+            if len(self._limiters) > MAX_IDLE_LIMITERS:
+                self._drop_idle_locked()
+        return limiter
+
+    def _drop_idle_locked(self) -> None:
+        idle = sorted(
+            (limiter.last_used, key)
+            for key, limiter in self._limiters.items()
+            if limiter.idle
+        )
+        for _, key in idle[: len(self._limiters) - MAX_IDLE_LIMITERS]:
+            del self._limiters[key]
+
+    # ------------------------------------------------------------------ #
+    # Admission
+    # ------------------------------------------------------------------ #
+    def _admit(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        assistant_id: Optional[str],
+        wake: Callable[[], None],
+    ) -> Tuple[_Limiter, Optional[_Waiter]]:
+        """Admits at once when nobody is queued and capacity allows."""
+        now = time.monotonic()
+        with self._lock:
+            limiter = self._limiter(provider, api_key)
+            if not limiter.queues and limiter.try_take(now):
+                limiter.waits.append(0.0)
+                return limiter, None
+            waiter = _Waiter(assistant_id or ANONYMOUS_ASSISTANT, wake, now)
+            limiter.enqueue(waiter)
+            return limiter, waiter
+
+    def _poll(
+        self, provider: str, limiter: _Limiter, waiter: _Waiter, deadline: float
+    ) -> Optional[float]:
+        """None once admitted, else how long to sleep before polling again."""
+        now = time.monotonic()
+        with self._lock:
+            if not waiter.granted:
+                limiter.dispatch(now)
+            if waiter.granted:
+                return None
+            if now >= deadline:
+                limiter.remove(waiter)
+                limiter.rejected += 1
+                raise ProviderBusyError(
+                    f"{provider} is at capacity; not admitted within "
+                    f"{self.max_queue_wait:g}s"
+                )
+            eta = limiter.token_eta(now)
+        remaining = deadline - now
+        return remaining if eta is None else min(remaining, eta)
+
+    def _abandon(self, limiter: _Limiter, waiter: _Waiter) -> None:
+        # Rejected waiters are already out of the queue; remove is a no-op.
+        with self._lock:
+            if waiter.granted:
+                limiter.release(time.monotonic())
+            else:
+                limiter.remove(waiter)
+
+    def acquire(
+        self,
+        provider: str,
+        api_key: Optional[str] = None,
+        assistant_id: Optional[str] = None,
+    ) -> Permit:
+        """Blocks until admitted; raises ProviderBusyError on timeout."""
+        event = threading.Event()
+        limiter, waiter = self._admit(provider, api_key, assistant_id, event.set)
+        if waiter is not None:
+            deadline = time.monotonic() + self.max_queue_wait
+            try:
+                delay = self._poll(provider, limiter, waiter, deadline)
+                while delay is not None:
+                    event.wait(delay)
+                    event.clear()
+                    delay = self._poll(provider, limiter, waiter, deadline)
+            except BaseException:
+                self._abandon(limiter, waiter)
+                raise
+        return Permit(self, limiter)
+
+    async def aacquire(
+        self,
+        provider: str,
+        api_key: Optional[str] = None,
+        assistant_id: Optional[str] = None,
+    ) -> Permit:
+        """Async ``acquire``; waiting never blocks the event loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        limiter, waiter = self._admit(
+            provider,
+            api_key,
+            assistant_id,
+            lambda: loop.call_soon_threadsafe(event.set),
+        )
+        if waiter is not None:
+            deadline = time.monotonic() + self.max_queue_wait
+            try:
+                delay = self._poll(provider, limiter, waiter, deadline)
+                while delay is not None:
+                    try:
+                        await asyncio.wait_for(event.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    event.clear()
+                    delay = self._poll(provider, limiter, waiter, deadline)
+            except BaseException:
+                self._abandon(limiter, waiter)
+                raise
+        return Permit(self, limiter)
+
+    def _release(self, limiter: _Limiter) -> None:
+        with self._lock:
+            limiter.release(time.monotonic())
+
+    # ------------------------------------------------------------------ #
+    # Stream wrappers
+    # ------------------------------------------------------------------ #
+    def governed(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        assistant_id: Optional[str],
+        open_deltas: Callable[[], Iterable[Delta]],
+    ) -> Iterator[Delta]:
+        """Streams ``open_deltas()`` while holding a permit."""
+        permit = self.acquire(provider, api_key, assistant_id)
+        try:
+            yield from open_deltas()
+        finally:
+            permit.release()
+
+    async def agoverned(
+        self,
+        provider: str,
+        api_key: Optional[str],
+        assistant_id: Optional[str],
+        open_deltas: Callable[[], AsyncIterator[Delta]],
+    ) -> AsyncIterator[Delta]:
+        permit = await self.aacquire(provider, api_key, assistant_id)
+        try:
+            async for delta in open_deltas():
+                yield delta
+        finally:
+            permit.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = [
+                (provider, key_hash, limiter, list(limiter.waits))
+                for (provider, key_hash), limiter in self._limiters.items()
+            ]
+            report = []
+            for provider, key_hash, limiter, waits in limiters:
+                report.append(
+                    {
+                        "provider": provider,
+                        "key": key_hash[:8],
+                        "concurrency": limiter.concurrency,
+                        "rate": limiter.rate,
+                        "inflight": limiter.inflight,
+                        "queued": limiter.queued,
+                        "queued_by_assistant": {
+                            assistant: len(queue)
+                            for assistant, queue in limiter.queues.items()
+                        },
+                        "admitted": limiter.admitted,
+                        "rejected": limiter.rejected,
+                        "wait_ms": {
+                            label: round((percentile(waits, q) or 0.0) * 1000, 1)
+                            for label, q in WAIT_PERCENTILES
+                        },
+                    }
+                )
+        return {
+            "max_queue_wait_seconds": self.max_queue_wait,
+            "queued": sum(entry["queued"] for entry in report),
+            "inflight": sum(entry["inflight"] for entry in report),
+            "limiters": report,
+        }
+
+
+def _provider_limits() -> Dict[str, Dict[str, float]]:
+    raw = os.getenv("INFERENCE_PROVIDER_LIMITS", "").strip()
+    if not raw:
+        return {}
+    try:
+        limits = json.loads(raw)
+    except ValueError as e:
+        logging_utility.warning("Ignoring malformed INFERENCE_PROVIDER_LIMITS: %s", e)
+        return {}
+    return limits if isinstance(limits, dict) else {}
+
+
+_governor: Optional[ConcurrencyGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_concurrency_governor() -> ConcurrencyGovernor:
+    """Returns the process-wide governor, creating it on first use."""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                burst = os.getenv("INFERENCE_RATE_BURST")
+                _governor = ConcurrencyGovernor(
+                    concurrency=int(
+                        os.getenv("INFERENCE_MAX_CONCURRENCY", DEFAULT_CONCURRENCY)
+                    ),
+                    rate=float(os.getenv("INFERENCE_RATE_LIMIT", "0")),
+                    burst=float(burst) if burst else None,
+                    max_queue_wait=float(
+                        os.getenv("INFERENCE_QUEUE_MAX_WAIT", DEFAULT_MAX_QUEUE_WAIT)
+                    ),
+                    provider_limits=_provider_limits(),
+                )
+    return _governor
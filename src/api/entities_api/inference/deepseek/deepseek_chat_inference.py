@@ -16,7 +16,6 @@ from abc import ABC
 from typing import Any, Generator, Optional
 
 from dotenv import load_dotenv
-from projectdavid_common import ValidationInterface
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
 from entities_api.inference.base_inference import BaseInference
@@ -34,6 +33,11 @@ class DeepSeekChatInference(BaseInference, ABC):
     (“deepseek-chat”, “deepseek-reasoner”, DeepSeek‑R1/V3, …).
     """
 
+    ASYNC_PROVIDER = "DeepSeek"
+    PROVIDER_BASE_URL_ENV = "DEEPSEEK_BASE_URL"
+    PROVIDER_DEFAULT_BASE_URL = "https://api.deepseek.com/v1"
+    STREAM_PARAMS = {"max_tokens": None, "temperature": 0.6, "top_p": 0.9}
+
     # ------------------------------------------------------------------ #
     # Provider‑specific boot‑strap (optional)
     # ------------------------------------------------------------------ #
@@ -77,154 +81,37 @@ class DeepSeekChatInference(BaseInference, ABC):
         base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
         client = AsyncDeepSeekClient(api_key=api_key, base_url=base_url)
 
-        assistant_reply: str = ""
-        accumulated: str = ""
-        reasoning: str = ""
-        in_reasoning, code_mode = False, False
-        code_buf: str = ""
+        request_payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.6,
+            "top_p": 0.9,
+            "max_tokens": None,
+        }
 
-        try:
+        def open_deltas():
             async_stream = client.stream_chat_completion(
                 prompt_or_messages=messages,
                 model=model,
-                temperature=0.6,
-                top_p=0.9,
-                max_tokens=None,
+                temperature=request_payload["temperature"],
+                top_p=request_payload["top_p"],
+                max_tokens=request_payload["max_tokens"],
             )
-
-            # bridge async SSE → sync generator
+            # bridge async SSE → sync generator
             for token in async_to_sync_stream(async_stream):
-                if self.check_cancellation_flag():
-                    log.warning(f"Run {run_id} cancelled mid‑stream")
-                    yield json.dumps({"type": "error", "content": "Run cancelled"})
-                    break
-
-                # ---------- split reasoning tags, if any --------------- #
-                segments = (
-                    self.REASONING_PATTERN.split(token)
-                    if hasattr(self, "REASONING_PATTERN")
-                    else [token]
-                )
-                for seg in segments:
-                    if not seg:
-                        continue
-
-                    if seg == "<think>":
-                        in_reasoning = True
-                        reasoning += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-                    if seg == "</think>":
-                        in_reasoning = False
-                        reasoning += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-
-                    # Reasoning branch
-                    if in_reasoning:
-                        reasoning += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-
-                    # Visible assistant text
-                    assistant_reply += seg
-                    accumulated += seg
-
-                    # --- code‑interpreter hot‑path -------------------- #
-                    partial_match = (
-                        self.parse_code_interpreter_partial(accumulated)
-                        if hasattr(self, "parse_code_interpreter_partial")
-                        else None
-                    )
-
-                    if not code_mode and partial_match:
-                        # a full ```python …``` block just finished
-                        full = partial_match.get("full_match")
-                        if full and full in accumulated:
-                            accumulated = accumulated.split(full, 1)[-1]
-
-                        code_mode = True
-                        code_buf = partial_match.get("code", "")
-                        self.code_mode = True
-                        yield json.dumps({"type": "hot_code", "content": "```python\n"})
-
-                        if code_buf and hasattr(
-                            self, "_process_code_interpreter_chunks"
-                        ):
-                            res, code_buf = self._process_code_interpreter_chunks(
-                                "", code_buf
-                            )
-                            for r in res:
-                                yield r
-                                assistant_reply += (
-                                    r
-                                    if isinstance(r, str)
-                                    else json.loads(r)["content"]
-                                )
-                        continue
-
-                    if code_mode:
-                        if hasattr(self, "_process_code_interpreter_chunks"):
-                            res, code_buf = self._process_code_interpreter_chunks(
-                                seg, code_buf
-                            )
-                            for r in res:
-                                yield r
-                                assistant_reply += (
-                                    r
-                                    if isinstance(r, str)
-                                    else json.loads(r).get("content", "")
-                                )
-                        else:
-                            yield json.dumps({"type": "hot_code", "content": seg})
-                        continue
-
-                    # normal text token
-                    if not code_buf:
-                        yield json.dumps({"type": "content", "content": seg})
-
-        except Exception as exc:  # pylint: disable=broad-except
-            msg = f"DeepSeek client error: {exc}"
-            log.error(msg, exc_info=True)
-            if hasattr(self, "handle_error"):
-                self.handle_error(
-                    reasoning + assistant_reply, thread_id, assistant_id, run_id
-                )
-            yield json.dumps({"type": "error", "content": msg})
-            return
+                yield token, ""
 
-        # ---------- conversation bookkeeping -------------------------- #
-        if assistant_reply and hasattr(self, "finalize_conversation"):
-            self.finalize_conversation(
-                reasoning + assistant_reply, thread_id, assistant_id, run_id
-            )
-
-        function_call = (
-            self.parse_and_set_function_calls(accumulated, assistant_reply)
-            if accumulated and hasattr(self, "parse_and_set_function_calls")
-            else False
+        yield from self._stream_completion(
+            open_deltas,
+            thread_id=thread_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            stream_reasoning=stream_reasoning,
+            error_prefix="DeepSeek client error",
+            payload=request_payload,
+            api_key=api_key,
         )
 
-        if function_call:
-            self.run_service.update_run_status(
-                run_id, ValidationInterface.StatusEnum.pending_action
-            )
-
-        if (
-            hasattr(self, "run_service")
-            and hasattr(ValidationInterface, "StatusEnum")
-            and not self.get_function_call_state()
-        ):
-            self.run_service.update_run_status(
-                run_id, ValidationInterface.StatusEnum.completed
-            )
-
-        if reasoning:
-            log.info(f"Run {run_id}: reasoning tokens = {len(reasoning)}")
-
     # ------------------------------------------------------------------ #
     # 2)  Function‑calls & helper wrappers
     # ------------------------------------------------------------------ #
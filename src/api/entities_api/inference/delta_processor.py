@@ -0,0 +1,261 @@
+"""
+Incremental processing of streamed completion deltas.
+
+Every provider handler used to re-split each token on the reasoning tags,
+re-run the code-interpreter regex over the whole accumulated reply and grow
+the reply by string concatenation, which made long replies quadratic. The
+StreamDeltaProcessor keeps that state incrementally so that each delta costs
+time proportional to its own length:
+
+* ``<think>`` / ``</think>`` tags are recognised even when a tag is split
+  across chunk boundaries (the partial tag is held back until it resolves).
+* Code-interpreter entry is detected by scanning a bounded window at the
+  end of the visible text instead of the full reply.
+* ``hot_code`` lines are emitted from a small line buffer.
+* Reply, accumulated content and reasoning are kept as lists of parts and
+  joined once on demand.
+* Visible text can be forwarded to a ToolCallRecognizer so tool calls are
+  recognised while the stream is still running.
+
+The processor returns plain event dicts (``{"type": ..., "content": ...}``);
+callers decide how to serialise them.
+"""
+
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from entities_api.inference.tool_call_recognizer import ToolCallRecognizer
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+CODE_INTERPRETER_PATTERN = re.compile(
+    r"""
+    \{\s*['"]name['"]\s*:\s*['"]code_interpreter['"]\s*,\s*   # "name": "code_interpreter"
+    ['"]arguments['"]\s*:\s*\{\s*['"]code['"]\s*:\s*             # "arguments": {"code":
+    (?P<code>.*)                                               # Capture the rest as code content
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# The code-interpreter marker is short; scanning the last few hundred
+# characters is enough to find it while keeping the per-token cost bounded.
+CODE_MARKER_WINDOW = 512
+
+# Mirrors BaseInference._process_code_interpreter_chunks.
+HOT_CODE_OVERFLOW = 100
+
+
+def _partial_tag_start(text: str) -> int:
+    """
+    Returns the index where a possibly incomplete reasoning tag starts at
+    the end of ``text``, or -1 when the tail cannot be the start of a tag.
+    """
+    start = text.rfind("<", max(0, len(text) - len(THINK_CLOSE)))
+    if start == -1:
+        return -1
+    tail = text[start:]
+    if tail in (THINK_OPEN, THINK_CLOSE):
+        return -1
+    if THINK_OPEN.startswith(tail) or THINK_CLOSE.startswith(tail):
+        return start
+    return -1
+
+
+class StreamDeltaProcessor:
+    """
+    Turns raw provider deltas into content / reasoning / hot_code events.
+
+    Args:
+        stream_reasoning: Emit reasoning events. Reasoning is kept in
+            ``reasoning_content`` either way, so it is persisted even when
+            it is not streamed.
+        split_reasoning: Recognise ``<think>`` tags inside content deltas.
+        detect_code_interpreter: Switch to ``hot_code`` output once the
+            code-interpreter call prefix appears in the visible text.
+        tool_call_recognizer: Receives every visible (non-reasoning) segment.
+    """
+
+    def __init__(
+        self,
+        stream_reasoning: bool = True,
+        split_reasoning: bool = True,
+        detect_code_interpreter: bool = True,
+        tool_call_recognizer: Optional["ToolCallRecognizer"] = None,
+    ):
+        self.stream_reasoning = stream_reasoning
+        self.split_reasoning = split_reasoning
+        self.detect_code_interpreter = detect_code_interpreter
+        self.tool_call_recognizer = tool_call_recognizer
+
+        self.in_reasoning = False
+        self.code_mode = False
+
+        self._reply_parts: List[str] = []
+        self._accumulated_parts: List[str] = []
+        self._reasoning_parts: List[str] = []
+        self._joined: Dict[str, str] = {}
+
+        self._pending_tag = ""
+        self._scan_window = ""
+        self._code_buffer = ""
+
+    # ------------------------------------------------------------------ #
+    # Accumulated text (joined lazily, cached until the next append)
+    # ------------------------------------------------------------------ #
+    def _join(self, key: str, parts: List[str]) -> str:
+        cached = self._joined.get(key)
+        if cached is None:
+            cached = "".join(parts)
+            if len(parts) > 1:
+                parts[:] = [cached]
+            self._joined[key] = cached
+        return cached
+
+    @property
+    def assistant_reply(self) -> str:
+        return self._join("reply", self._reply_parts)
+
+    @property
+    def accumulated_content(self) -> str:
+        return self._join("accumulated", self._accumulated_parts)
+
+    @property
+    def reasoning_content(self) -> str:
+        return self._join("reasoning", self._reasoning_parts)
+
+    def _append_visible(self, text: str) -> None:
+        self._reply_parts.append(text)
+        self._accumulated_parts.append(text)
+        self._joined.pop("reply", None)
+        self._joined.pop("accumulated", None)
+        if self.tool_call_recognizer is not None:
+            self.tool_call_recognizer.feed(text)
+
+    def _append_reasoning(self, text: str) -> None:
+        self._reasoning_parts.append(text)
+        self._joined.pop("reasoning", None)
+
+    # ------------------------------------------------------------------ #
+    # Feeding
+    # ------------------------------------------------------------------ #
+    def feed_reasoning(self, text: str) -> List[Dict[str, str]]:
+        """Handles a provider-native ``reasoning_content`` delta."""
+        if not text:
+            return []
+        self._append_reasoning(text)
+        if not self.stream_reasoning:
+            return []
+        return [{"type": "reasoning", "content": text}]
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Handles a ``content`` delta and returns the events it produces."""
+        if not text:
+            return []
+        events: List[Dict[str, str]] = []
+
+        if not self.split_reasoning:
+            self._feed_segment(text, events)
+            return events
+
+        if self._pending_tag:
+            text = self._pending_tag + text
+            self._pending_tag = ""
+
+        pos = 0
+        while True:
+            open_at = text.find(THINK_OPEN, pos)
+            close_at = text.find(THINK_CLOSE, pos)
+            if open_at == -1 and close_at == -1:
+                break
+            if close_at == -1 or (open_at != -1 and open_at < close_at):
+                tag_at, tag = open_at, THINK_OPEN
+            else:
+                tag_at, tag = close_at, THINK_CLOSE
+
+            if tag_at > pos:
+                self._feed_segment(text[pos:tag_at], events)
+            self._feed_tag(tag, events)
+            pos = tag_at + len(tag)
+
+        rest = text[pos:]
+        held_at = _partial_tag_start(rest)
+        if held_at != -1:
+            self._pending_tag = rest[held_at:]
+            rest = rest[:held_at]
+        if rest:
+            self._feed_segment(rest, events)
+        return events
+
+    def flush(self) -> List[Dict[str, str]]:
+        """Releases held-back text and any buffered code at end of stream."""
+        events: List[Dict[str, str]] = []
+        if self._pending_tag:
+            pending, self._pending_tag = self._pending_tag, ""
+            self._feed_segment(pending, events)
+        if self._code_buffer:
+            events.append({"type": "hot_code", "content": self._code_buffer})
+            self._code_buffer = ""
+        return events
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _feed_tag(self, tag: str, events: List[Dict[str, str]]) -> None:
+        self.in_reasoning = tag == THINK_OPEN
+        self._append_reasoning(tag)
+        if self.stream_reasoning:
+            events.append({"type": "reasoning", "content": tag})
+
+    def _feed_segment(self, seg: str, events: List[Dict[str, str]]) -> None:
+        if self.in_reasoning:
+            self._append_reasoning(seg)
+            if self.stream_reasoning:
+                events.append({"type": "reasoning", "content": seg})
+            return
+
+        self._append_visible(seg)
+
+        if self.code_mode:
+            self._emit_code(seg, events)
+            return
+
+        if self.detect_code_interpreter:
+            code = self._match_code_interpreter(seg)
+            if code is not None:
+                self.code_mode = True
+                events.append({"type": "hot_code", "content": "```python\n"})
+                if code:
+                    self._emit_code(code, events)
+                return
+
+        events.append({"type": "content", "content": seg})
+
+    def _match_code_interpreter(self, seg: str) -> Optional[str]:
+        window = self._scan_window + seg
+        if len(window) > CODE_MARKER_WINDOW:
+            window = window[-CODE_MARKER_WINDOW:]
+        self._scan_window = window
+        if "{" not in window:
+            return None
+        match = CODE_INTERPRETER_PATTERN.search(window)
+        if match is None:
+            return None
+        self._scan_window = ""
+        return match.group("code").strip()
+
+    def _emit_code(self, chunk: str, events: List[Dict[str, str]]) -> None:
+        buffer = self._code_buffer + chunk
+
+        # One line per delta, as the handlers have always done.
+        newline_at = buffer.find("\n")
+        if newline_at != -1:
+            events.append({"type": "hot_code", "content": buffer[: newline_at + 1]})
+            buffer = buffer[newline_at + 1 :]
+
+        if len(buffer) > HOT_CODE_OVERFLOW:
+            events.append({"type": "hot_code", "content": buffer})
+            buffer = ""
+
+        self._code_buffer = buffer
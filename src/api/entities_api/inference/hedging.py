@@ -0,0 +1,283 @@
+# entities_api/inference/hedging.py
+
+"""
+Hedged streams: race the first token across providers.
+
+The same open model (DeepSeek-V3, DeepSeek-R1, Llama 3.3, ...) is served by
+several vendors; MODEL_EQUIVALENCE_MAP lists which unified model ids are
+interchangeable. With hedging on, a stream starts on the requested
+provider. If no token has arrived after the provider's hedge delay (its
+recent p95 TTFT, see provider_health), the same request goes to the
+fastest equivalent provider as well. Whichever produces a token first is
+streamed; the other is cancelled and its connection closed. A provider
+that fails before its first token is replaced by the next one at once.
+
+Only raw ``(content, reasoning)`` deltas are raced. Persistence, tool-call
+recognition and run status stay with the handler the run was routed to, so
+exactly one assistant message is written whichever provider wins.
+
+Configure with:
+
+* INFERENCE_HEDGING          - ``off`` (default), ``assistant`` (assistants
+                               whose meta_data sets ``hedged_inference``) or
+                               ``all``.
+* INFERENCE_HEDGE_MAX_LEGS   - providers a stream may be sent to (default 2).
+* INFERENCE_HEDGE_*_DELAY_MS - see provider_health.
+"""
+
+import asyncio
+import os
+from functools import partial
+from typing import (Any, AsyncIterator, Callable, Dict, List, Optional,
+                    Sequence, Tuple)
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+from entities_api.constants.platform import (PROVIDER_PLATFORM_API_KEY_ENV,
+                                             MODEL_EQUIVALENCE_MAP)
+from entities_api.inference.concurrency_governor import \
+    get_concurrency_governor
+from entities_api.inference.provider_health import (ProviderLatencyTracker,
+                                                    get_provider_health)
+
+logging_utility = LoggingUtility()
+
+HEDGING_OFF = "off"
+HEDGING_ASSISTANT = "assistant"
+HEDGING_ALL = "all"
+HEDGE_META_KEY = "hedged_inference"
+
+Delta = Tuple[str, str]
+
+
+def hedging_mode() -> str:
+    mode = os.getenv("INFERENCE_HEDGING", HEDGING_OFF).strip().lower()
+    if mode not in (HEDGING_OFF, HEDGING_ASSISTANT, HEDGING_ALL):
+        logging_utility.warning(
+            "Unknown INFERENCE_HEDGING '%s', hedging stays off.", mode
+        )
+        return HEDGING_OFF
+    return mode
+
+
+def hedging_enabled(assistant_meta: Optional[Dict[str, Any]]) -> bool:
+    """Whether a stream for an assistant with ``assistant_meta`` is hedged."""
+    mode = hedging_mode()
+    if mode == HEDGING_ALL:
+        return True
+    if mode == HEDGING_ASSISTANT:
+        return bool((assistant_meta or {}).get(HEDGE_META_KEY))
+    return False
+
+
+def equivalent_models(model_id: str) -> List[str]:
+    """Unified ids serving the same model as ``model_id``, excluding it."""
+    wanted = model_id.lower()
+    for members in MODEL_EQUIVALENCE_MAP.values():
+        if any(member.lower() == wanted for member in members):
+            return [member for member in members if member.lower() != wanted]
+    return []
+
+
+def platform_api_key(provider: str) -> Optional[str]:
+    """The platform's own key for ``provider``, if one is configured."""
+    key_env = PROVIDER_PLATFORM_API_KEY_ENV.get(provider)
+    return (os.getenv(key_env) if key_env else None) or None
+
+
+class HedgeLeg:
+    """One provider a stream may be sent to."""
+
+    __slots__ = ("provider", "model", "open")
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        open_deltas: Callable[[], AsyncIterator[Delta]],
+    ):
+        self.provider = provider
+        self.model = model
+        self.open = open_deltas
+
+    def __repr__(self) -> str:
+        return f"HedgeLeg({self.provider}, {self.model})"
+
+
+def provider_leg(
+    provider: str,
+    model: str,
+    api_key: Optional[str],
+    assistant_id: Optional[str],
+    open_deltas: Callable[[], AsyncIterator[Delta]],
+) -> HedgeLeg:
+    """
+    A leg that waits for the provider's concurrency permit, then streams
+    with its TTFT and early failures recorded.
+    """
+    return HedgeLeg(
+        provider,
+        model,
+        partial(
+            get_concurrency_governor().agoverned,
+            provider,
+            api_key,
+            assistant_id,
+            partial(get_provider_health().atimed, provider, model, open_deltas),
+        ),
+    )
+
+
+def build_hedge_legs(
+    primary_provider: str,
+    model_id: str,
+    messages: List[Dict[str, Any]],
+    client: Any,
+    assistant_id: Optional[str] = None,
+    tracker: Optional[ProviderLatencyTracker] = None,
+) -> List[HedgeLeg]:
+    """
+    Alternate legs for ``model_id``, fastest provider first. Providers that
+    are the primary's, not async-capable, or without a platform key are
+    skipped. Each leg waits for its own provider's concurrency permit.
+    """
+    # Imported here: the registry imports every handler, which import us.
+    from entities_api.inference.provider_registry import (
+        ProviderRegistry, get_provider_registry)
+
+    registry = get_provider_registry()
+    legs: Dict[str, HedgeLeg] = {}
+    for alternate in equivalent_models(model_id):
+        try:
+            handler = registry.resolve_specific_handler(alternate)
+        except ValueError as e:
+            logging_utility.debug("No hedge handler for %s: %s", alternate, e)
+            continue
+
+        provider = getattr(handler, "ASYNC_PROVIDER", None)
+        if not provider or provider == primary_provider or provider in legs:
+            continue
+        api_key = platform_api_key(provider)
+        base_url = ProviderRegistry.provider_base_url(handler)
+        if not api_key or not base_url:
+            continue
+
+        payload = {
+            "model": handler._get_model_map(value=alternate) or alternate,
+            "messages": messages,
+            **handler.STREAM_PARAMS,
+        }
+        legs[provider] = provider_leg(
+            provider,
+            alternate,
+            api_key,
+            assistant_id,
+            partial(client.stream_chat_completion, base_url, api_key, payload),
+        )
+
+    tracker = tracker or get_provider_health()
+    max_alternates = max(0, int(os.getenv("INFERENCE_HEDGE_MAX_LEGS", "2")) - 1)
+    return [legs[name] for name in tracker.rank(legs)][:max_alternates]
+
+
+async def _close(iterator: AsyncIterator[Delta]) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception as e:
+            logging_utility.debug("Error closing hedge stream: %s", e)
+
+
+async def race_first_token(
+    legs: Sequence[HedgeLeg],
+    delay: Optional[float] = None,
+    tracker: Optional[ProviderLatencyTracker] = None,
+) -> AsyncIterator[Delta]:
+    """
+    Streams the deltas of whichever leg produces a token first.
+
+    ``legs[0]`` starts immediately; each further leg starts when no leg has
+    produced a token ``delay`` seconds (default: the first leg's hedge
+    delay) after the previous one started, or as soon as every running leg
+    has failed. The first token decides the winner; the other legs are
+    cancelled. TTFT and failures are recorded by the legs themselves (see
+    ``provider_leg``).
+    """
+    if delay is None:
+        tracker = tracker or get_provider_health()
+        delay = tracker.hedge_delay(legs[0].provider)
+
+    waiting = list(legs)
+    racing: Dict["asyncio.Future[Delta]", Tuple[HedgeLeg, Any]] = {}
+    winner: Optional[Tuple[HedgeLeg, Any]] = None
+    first: Optional[Delta] = None
+    last_error: Optional[BaseException] = None
+
+    def launch() -> None:
+        leg = waiting.pop(0)
+        iterator = leg.open().__aiter__()
+        task = asyncio.ensure_future(iterator.__anext__())
+        racing[task] = (leg, iterator)
+
+    try:
+        launch()
+        while winner is None:
+            done, _ = await asyncio.wait(
+                racing,
+                timeout=delay if waiting else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                logging_utility.info(
+                    "No first token after %.0f ms; hedging to %s",
+                    delay * 1000,
+                    waiting[0],
+                )
+                launch()
+                continue
+
+            for task in [task for task in racing if task in done]:
+                leg, iterator = racing.pop(task)
+                error = task.exception()
+                if isinstance(error, StopAsyncIteration):
+                    # An empty reply is still an answer.
+                    error, delta = None, None
+                elif error is None:
+                    delta = task.result()
+
+                if error is not None:
+                    logging_utility.warning(
+                        "%s failed before its first token: %s", leg, error
+                    )
+                    last_error = error
+                    await _close(iterator)
+                elif winner is None:
+                    winner, first = (leg, iterator), delta
+                else:
+                    await _close(iterator)
+
+            if winner is None and not racing:
+                if not waiting:
+                    raise last_error
+                launch()
+    finally:
+        # Losers (or everything, if the consumer went away mid-race).
+        for task in racing:
+            task.cancel()
+        if racing:
+            await asyncio.gather(*racing, return_exceptions=True)
+        for leg, iterator in racing.values():
+            await _close(iterator)
+        racing.clear()
+
+    leg, iterator = winner
+    if len(legs) - len(waiting) > 1:
+        logging_utility.info("Hedged stream won by %s", leg)
+    try:
+        if first is not None:
+            yield first
+        async for delta in iterator:
+            yield delta
+    finally:
+        await _close(iterator)
@@ -4,7 +4,6 @@ from abc import ABC
 from typing import Any, Generator, Optional
 
 from dotenv import load_dotenv
-from projectdavid_common import ValidationInterface
 
 from entities_api.inference.base_inference import BaseInference
 from entities_api.services.logging_service import LoggingUtility
@@ -15,6 +14,10 @@ logging_utility = LoggingUtility()
 
 class HyperbolicR1Inference(BaseInference, ABC):
 
+    ASYNC_PROVIDER = "Hyperbolic"
+    PROVIDER_BASE_URL_ENV = "HYPERBOLIC_BASE_URL"
+    PROVIDER_DEFAULT_BASE_URL = "https://api.hyperbolic.xyz/v1"
+
     def setup_services(self):
         logging_utility.debug(
             "HyperbolicDeepSeekV3Inference specific setup completed (if any)."
@@ -123,183 +126,18 @@ class HyperbolicR1Inference(BaseInference, ABC):
             )
             return
 
-        assistant_reply = ""
-        accumulated_content = ""
-        reasoning_content = ""
-        in_reasoning = False
-        code_mode = False
-        code_buffer = ""
-
-        try:
-
-            response = client_to_use.chat.completions.create(**request_payload)
-
-            # Process the stream
-            for token in response:
-                if self.check_cancellation_flag():
-                    logging_utility.warning(f"Run {run_id} cancelled mid-stream")
-                    yield json.dumps({"type": "error", "content": "Run cancelled"})
-                    break
-
-                if not hasattr(token, "choices") or not token.choices:
-                    continue
-
-                delta = token.choices[0].delta
-
-                # Process reasoning if present and enabled
-                delta_reasoning = getattr(delta, "reasoning_content", "")
-                if delta_reasoning and stream_reasoning:
-                    reasoning_content += delta_reasoning
-                    yield json.dumps({"type": "reasoning", "content": delta_reasoning})
-
-                # Process content
-                delta_content = getattr(delta, "content", "")
-                if not delta_content:
-                    continue
-
-                # Split content based on reasoning tags
-                segments = (
-                    self.REASONING_PATTERN.split(delta_content)
-                    if hasattr(self, "REASONING_PATTERN")
-                    else [delta_content]
-                )
-                for seg in segments:
-                    if not seg:
-                        continue
-
-                    # Handle reasoning tags
-                    if seg == "<think>":
-                        in_reasoning = True
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-                    elif seg == "</think>":
-                        in_reasoning = False
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-
-                    # Process content or reasoning segment
-                    if in_reasoning:
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                    else:
-                        assistant_reply += seg
-                        accumulated_content += seg
-
-                        # Handle code interpreter logic if applicable
-                        if hasattr(self, "parse_code_interpreter_partial"):
-                            partial_match = self.parse_code_interpreter_partial(
-                                accumulated_content
-                            )
-                        else:
-                            partial_match = None
-
-                        if not code_mode and partial_match:
-                            # Enter code mode
-                            full_match = partial_match.get(
-                                "full_match"
-                            )  # Ensure parse_code_interpreter_partial returns this if needed
-                            if full_match:
-                                match_index = accumulated_content.find(full_match)
-                                if match_index != -1:
-                                    accumulated_content = accumulated_content[
-                                        match_index + len(full_match) :
-                                    ]
-                            code_mode = True
-                            code_buffer = partial_match.get("code", "")
-                            self.code_mode = True
-                            yield json.dumps(
-                                {"type": "hot_code", "content": "```python\n"}
-                            )
-                            # Process initial buffer if code interpreter chunks method exists
-                            if code_buffer and hasattr(
-                                self, "_process_code_interpreter_chunks"
-                            ):
-                                results, code_buffer = (
-                                    self._process_code_interpreter_chunks(
-                                        "", code_buffer
-                                    )
-                                )
-                                for r in results:
-                                    yield r
-                                    assistant_reply += (
-                                        r
-                                        if isinstance(r, str)
-                                        else json.loads(r).get("content", "")
-                                    )  # Accumulate string content
-                            continue
-
-                        if code_mode:
-                            # Process code chunks if method exists
-                            if hasattr(self, "_process_code_interpreter_chunks"):
-                                results, code_buffer = (
-                                    self._process_code_interpreter_chunks(
-                                        seg, code_buffer
-                                    )
-                                )
-                                for r in results:
-                                    yield r
-                                    assistant_reply += (
-                                        r
-                                        if isinstance(r, str)
-                                        else json.loads(r).get("content", "")
-                                    )  # Accumulate string content
-                            else:  # Fallback if method missing
-                                yield json.dumps({"type": "hot_code", "content": seg})
-                            continue
-
-                        # Yield normal content if not in code mode
-                        if not code_buffer:
-                            yield json.dumps({"type": "content", "content": seg})
-
-        except Exception as e:
-            # Error message now uses key_source_log determined earlier
-            error_msg = f"Hyperbolic SDK error (using {key_source_log} key): {str(e)}"
-            logging_utility.error(f"Run {run_id}: {error_msg}", exc_info=True)
-            if hasattr(self, "handle_error"):
-                self.handle_error(
-                    reasoning_content + assistant_reply, thread_id, assistant_id, run_id
-                )
-            yield json.dumps({"type": "error", "content": error_msg})
-            return
-
-        # Finalize conversation and parse function calls
-        if assistant_reply and hasattr(self, "finalize_conversation"):
-            self.finalize_conversation(
-                reasoning_content + assistant_reply, thread_id, assistant_id, run_id
-            )
-
-        if accumulated_content and hasattr(self, "parse_and_set_function_calls"):
-
-            function_call = self.parse_and_set_function_calls(
-                accumulated_content, assistant_reply
-            )
-
-        else:
-            function_call = False
-
-        if function_call:
-            self.run_service.update_run_status(
-                run_id, ValidationInterface.StatusEnum.pending_action
-            )
-
-        # Update run status if applicable
-        if hasattr(self, "run_service") and hasattr(ValidationInterface, "StatusEnum"):
-            if (
-                not self.get_function_call_state()
-            ):  # Check state using appropriate method
-                self.run_service.update_run_status(
-                    run_id, ValidationInterface.StatusEnum.completed
-                )
-
-        if reasoning_content:
-            logging_utility.info(
-                f"Run {run_id}: Final reasoning content length: {len(reasoning_content)}"
-            )
+        yield from self._stream_completion(
+            lambda: self._iter_openai_deltas(
+                client_to_use.chat.completions.create(**request_payload)
+            ),
+            thread_id=thread_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            stream_reasoning=stream_reasoning,
+            error_prefix=f"Hyperbolic SDK error (using {key_source_log} key)",
+            payload=request_payload,
+            api_key=api_key,
+        )
 
     def process_function_calls(
         self,
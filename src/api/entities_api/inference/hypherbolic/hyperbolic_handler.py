@@ -1,6 +1,6 @@
 # entities_api/inference/handlers/hyperbolic_handler.py
 
-from typing import Any, Generator, Optional, Type
+from typing import Any, AsyncGenerator, Generator, Optional, Type
 
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
@@ -13,6 +13,7 @@ from entities_api.inference.hypherbolic.hyperbolic_llama_3_3 import \
 from entities_api.inference.hypherbolic.hyperbolic_quen_qwq_32b import \
     HyperbolicQuenQwq32bInference
 from entities_api.inference.inference_arbiter import InferenceArbiter
+from entities_api.utils.async_to_sync import iterate_sync_in_thread
 
 logging_utility = LoggingUtility()
 
@@ -106,6 +107,39 @@ class HyperbolicHandler:
             **kwargs,
         )
 
+    async def aprocess_conversation(
+        self,
+        thread_id,
+        message_id,
+        run_id,
+        assistant_id,
+        model,
+        stream_reasoning=False,
+        api_key: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Native asyncio dispatch. Handlers without an async stream are driven
+        from a worker thread instead.
+        """
+        handler = self._get_specific_handler_instance(model)
+        call_kwargs = dict(
+            thread_id=thread_id,
+            message_id=message_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            model=model,
+            stream_reasoning=stream_reasoning,
+            api_key=api_key,
+            **kwargs,
+        )
+        if getattr(handler, "supports_async_stream", False):
+            chunks = handler.aprocess_conversation(**call_kwargs)
+        else:
+            chunks = iterate_sync_in_thread(handler.process_conversation(**call_kwargs))
+        async for chunk in chunks:
+            yield chunk
+
     def stream(
         self,
         thread_id: str,
@@ -4,7 +4,6 @@ from abc import ABC
 from typing import Any, Generator, Optional
 
 from dotenv import load_dotenv
-from projectdavid_common import ValidationInterface
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
 from entities_api.inference.base_inference import BaseInference
@@ -18,6 +17,11 @@ logging_utility = LoggingUtility()
 
 class HyperbolicQuenQwq32bInference(BaseInference, ABC):
 
+    ASYNC_PROVIDER = "Hyperbolic"
+    PROVIDER_BASE_URL_ENV = "HYPERBOLIC_BASE_URL"
+    PROVIDER_DEFAULT_BASE_URL = "https://api.hyperbolic.xyz/v1"
+    STREAM_PARAMS = {"max_tokens": None, "temperature": 0.6, "top_p": 0.9}
+
     def setup_services(self):
         logging_utility.debug(
             "HyperbolicDeepSeekV3Inference specific setup completed (if any)."
@@ -91,14 +95,7 @@ class HyperbolicQuenQwq32bInference(BaseInference, ABC):
 
         client = AsyncHyperbolicClient(api_key=api_key, base_url=hyperbolic_base_url)
 
-        assistant_reply = ""
-        accumulated_content = ""
-        reasoning_content = ""
-        in_reasoning = False
-        code_mode = False
-        code_buffer = ""
-
-        try:
+        def open_deltas():
             async_stream = client.stream_chat_completion(
                 prompt=messages[-1]["content"],
                 model=model,
@@ -106,140 +103,19 @@ class HyperbolicQuenQwq32bInference(BaseInference, ABC):
                 top_p=request_payload["top_p"],
                 max_tokens=request_payload["max_tokens"],
             )
-
             for token in async_to_sync_stream(async_stream):
-                if self.check_cancellation_flag():
-                    logging_utility.warning(f"Run {run_id} cancelled mid-stream")
-                    yield json.dumps({"type": "error", "content": "Run cancelled"})
-                    break
-
-                segments = (
-                    self.REASONING_PATTERN.split(token)
-                    if hasattr(self, "REASONING_PATTERN")
-                    else [token]
-                )
-
-                for seg in segments:
-                    if not seg:
-                        continue
-
-                    if seg == "<think>":
-                        in_reasoning = True
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-                    elif seg == "</think>":
-                        in_reasoning = False
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-
-                    if in_reasoning:
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                    else:
-                        assistant_reply += seg
-                        accumulated_content += seg
+                yield token, ""
 
-                        if hasattr(self, "parse_code_interpreter_partial"):
-                            partial_match = self.parse_code_interpreter_partial(
-                                accumulated_content
-                            )
-                        else:
-                            partial_match = None
-
-                        if not code_mode and partial_match:
-                            full_match = partial_match.get("full_match")
-                            if full_match:
-                                match_index = accumulated_content.find(full_match)
-                                if match_index != -1:
-                                    accumulated_content = accumulated_content[
-                                        match_index + len(full_match) :
-                                    ]
-                            code_mode = True
-                            code_buffer = partial_match.get("code", "")
-                            self.code_mode = True
-                            yield json.dumps(
-                                {"type": "hot_code", "content": "```python\n"}
-                            )
-                            if code_buffer and hasattr(
-                                self, "_process_code_interpreter_chunks"
-                            ):
-                                results, code_buffer = (
-                                    self._process_code_interpreter_chunks(
-                                        "", code_buffer
-                                    )
-                                )
-                                for r in results:
-                                    yield r
-                                    assistant_reply += (
-                                        r
-                                        if isinstance(r, str)
-                                        else json.loads(r).get("content", "")
-                                    )
-                            continue
-
-                        if code_mode:
-                            if hasattr(self, "_process_code_interpreter_chunks"):
-                                results, code_buffer = (
-                                    self._process_code_interpreter_chunks(
-                                        seg, code_buffer
-                                    )
-                                )
-                                for r in results:
-                                    yield r
-                                    assistant_reply += (
-                                        r
-                                        if isinstance(r, str)
-                                        else json.loads(r).get("content", "")
-                                    )
-                            else:
-                                yield json.dumps({"type": "hot_code", "content": seg})
-                            continue
-
-                        if not code_buffer:
-                            yield json.dumps({"type": "content", "content": seg})
-
-        except Exception as e:
-            error_msg = f"Hyperbolic client stream error: {str(e)}"
-            logging_utility.error(f"Run {run_id}: {error_msg}", exc_info=True)
-            if hasattr(self, "handle_error"):
-                self.handle_error(
-                    reasoning_content + assistant_reply, thread_id, assistant_id, run_id
-                )
-            yield json.dumps({"type": "error", "content": error_msg})
-            return
-
-        if assistant_reply and hasattr(self, "finalize_conversation"):
-            self.finalize_conversation(
-                reasoning_content + assistant_reply, thread_id, assistant_id, run_id
-            )
-
-        if accumulated_content and hasattr(self, "parse_and_set_function_calls"):
-            function_call = self.parse_and_set_function_calls(
-                accumulated_content, assistant_reply
-            )
-        else:
-            function_call = False
-
-        if function_call:
-            self.run_service.update_run_status(
-                run_id, ValidationInterface.StatusEnum.pending_action
-            )
-
-        if hasattr(self, "run_service") and hasattr(ValidationInterface, "StatusEnum"):
-            if not self.get_function_call_state():
-                self.run_service.update_run_status(
-                    run_id, ValidationInterface.StatusEnum.completed
-                )
-
-        if reasoning_content:
-            logging_utility.info(
-                f"Run {run_id}: Final reasoning content length: {len(reasoning_content)}"
-            )
+        yield from self._stream_completion(
+            open_deltas,
+            thread_id=thread_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            stream_reasoning=stream_reasoning,
+            error_prefix="Hyperbolic client stream error",
+            payload=request_payload,
+            api_key=api_key,
+        )
 
     def process_function_calls(
         self,
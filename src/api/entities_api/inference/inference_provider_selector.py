@@ -1,21 +1,24 @@
 # entities_api/inference/inference_provider_selector.py (Revised)
 
 import threading
-from typing import Any, Type
+from typing import Any, Optional, Type
 
 from projectdavid_common.constants.ai_model_map import MODEL_MAP
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
 from entities_api.inference.azure.azure_handler import AzureHandler
+from entities_api.inference.circuit_breaker import get_circuit_breakers
 from entities_api.inference.deepseek.deep_seek_handler import DeepseekHandler
 from entities_api.inference.google.google_handler import GoogleHandler
 from entities_api.inference.groq.groq_handler import GroqHandler  # Example
+from entities_api.inference.hedging import equivalent_models, platform_api_key
 # --- Import General Handler Classes ---
 from entities_api.inference.hypherbolic.hyperbolic_handler import \
     HyperbolicHandler
 # --- Import Arbiter (Needed by the General Handlers) ---
 from entities_api.inference.inference_arbiter import InferenceArbiter
 from entities_api.inference.local.local_handler import LocalHandler  # Example
+from entities_api.inference.provider_health import get_provider_health
 from entities_api.inference.togeterai.togetherai_handler import \
     TogetherAIHandler  # Example
 
@@ -37,6 +40,35 @@ TOP_LEVEL_ROUTING_MAP: dict[str, Type[Any]] = {
 }
 
 
+class ProviderRoute:
+    """Where a request goes: handler, model names, key and provider."""
+
+    __slots__ = (
+        "handler",
+        "api_model_name",
+        "model_id",
+        "api_key",
+        "provider",
+        "rerouted_from",
+    )
+
+    def __init__(
+        self,
+        handler: Any,
+        api_model_name: str,
+        model_id: str,
+        api_key: Optional[str],
+        provider: Optional[str],
+        rerouted_from: Optional[str] = None,
+    ):
+        self.handler = handler
+        self.api_model_name = api_model_name
+        self.model_id = model_id
+        self.api_key = api_key
+        self.provider = provider
+        self.rerouted_from = rerouted_from
+
+
 class InferenceProviderSelector:
     """
     Selects and INSTANTIATES a general handler class (e.g. GoogleHandler)
@@ -149,3 +181,78 @@ class InferenceProviderSelector:
             f"Handler selected: '{selected_general_class.__name__}' → Model: '{api_model_name}'"
         )
         return provider_instance, api_model_name
+
+    # ------------------------------------------------------------------ #
+    # Health-aware routing
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _provider_of(handler: Any, model_id: str) -> Optional[str]:
+        """Provider name of the concrete handler ``model_id`` dispatches to."""
+        resolve = getattr(handler, "_get_specific_handler_instance", None)
+        if resolve is None:
+            return None
+        try:
+            specific = resolve(model_id)
+        except ValueError:
+            return None
+        return getattr(specific, "provider_name", None)
+
+    def route(self, model_id: str, api_key: Optional[str] = None) -> ProviderRoute:
+        """
+        Like ``select_provider``, but steers clear of providers whose
+        circuit is open: an equivalent model (MODEL_EQUIVALENCE_MAP) on the
+        fastest healthy provider with a platform key is used instead. With
+        no such alternative the request goes to the requested provider.
+        """
+        handler, api_model_name = self.select_provider(model_id)
+        provider = self._provider_of(handler, model_id)
+        if provider is None or get_circuit_breakers().allow(provider):
+            return ProviderRoute(handler, api_model_name, model_id, api_key, provider)
+
+        failover = self._failover(model_id, provider)
+        if failover is not None:
+            logging_utility.warning(
+                "Circuit for %s is open; routing '%s' to '%s' on %s",
+                provider,
+                model_id,
+                failover.model_id,
+                failover.provider,
+            )
+            return failover
+
+        logging_utility.warning(
+            "Circuit for %s is open and no healthy equivalent of '%s' is "
+            "available; routing to it anyway",
+            provider,
+            model_id,
+        )
+        return ProviderRoute(handler, api_model_name, model_id, api_key, provider)
+
+    def _failover(self, model_id: str, provider: str) -> Optional[ProviderRoute]:
+        candidates: dict[str, ProviderRoute] = {}
+        for alternate in equivalent_models(model_id):
+            try:
+                handler, api_model_name = self.select_provider(alternate)
+            except ValueError:
+                continue
+            alternate_provider = self._provider_of(handler, alternate)
+            if alternate_provider in (None, provider) or (
+                alternate_provider in candidates
+            ):
+                continue
+            api_key = platform_api_key(alternate_provider)
+            if api_key:
+                candidates[alternate_provider] = ProviderRoute(
+                    handler,
+                    api_model_name,
+                    alternate,
+                    api_key,
+                    alternate_provider,
+                    rerouted_from=model_id,
+                )
+
+        breakers = get_circuit_breakers()
+        for name in get_provider_health().rank(candidates):
+            if breakers.allow(name):
+                return candidates[name]
+        return None
@@ -0,0 +1,345 @@
+# entities_api/inference/provider_health.py
+
+"""
+Per-provider time-to-first-token (TTFT) statistics.
+
+Every async stream reports how long its provider took to produce the first
+delta (content or reasoning), and whether it failed before producing one.
+The tracker keeps a sliding window of the latest samples per provider and
+turns them into:
+
+* ``hedge_delay(provider)`` - how long to wait for the first token before a
+  hedged request goes to a second provider: the provider's p95 TTFT,
+  clamped to [INFERENCE_HEDGE_MIN_DELAY_MS, INFERENCE_HEDGE_MAX_DELAY_MS].
+  Until INFERENCE_HEDGE_MIN_SAMPLES samples exist, INFERENCE_HEDGE_DELAY_MS
+  is used instead.
+* ``rank(providers)`` - providers ordered by median TTFT, recent failures
+  counting against them, so hedges and failovers go to whoever is fastest
+  right now.
+
+Samples are kept per provider and per ``provider:model``. Outcomes also
+feed the provider's circuit breaker (see circuit_breaker). Only failures
+that say something about the provider count (``is_provider_fault``: 5xx,
+429, timeouts, connection errors); a 401 caused by a caller's own key must
+not open the circuit for every tenant. Streams are measured by wrapping
+their delta iterators in ``timed`` / ``atimed``; the wrappers sit inside
+the concurrency governor, so queueing is not counted.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import (Any, AsyncIterator, Callable, Deque, Dict, Iterable,
+                    Iterator, List, Optional, Tuple)
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+from entities_api.inference.circuit_breaker import (CircuitBreakerBoard,
+                                                    get_circuit_breakers)
+
+logging_utility = LoggingUtility()
+
+DEFAULT_WINDOW = 200
+DEFAULT_HEDGE_DELAY_MS = 800.0
+DEFAULT_MIN_DELAY_MS = 150.0
+DEFAULT_MAX_DELAY_MS = 5000.0
+DEFAULT_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 95.0
+
+Delta = Tuple[str, str]
+
+# Exception classes (and bases) of the provider SDKs and httpx that mean the
+# provider could not be reached or did not answer in time. Matched by name
+# so the SDKs stay optional here.
+_TRANSPORT_ERRORS = frozenset(
+    {
+        "APIConnectionError",
+        "APITimeoutError",
+        "TimeoutException",
+        "TransportError",
+        "ProviderStreamError",
+    }
+)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for status in (
+        getattr(error, "status_code", None),
+        getattr(error, "http_status", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_provider_fault(error: BaseException) -> bool:
+    """
+    Whether ``error`` counts against the provider's health: a 5xx or 429
+    response, a timeout or a connection error. Client errors (400, 401,
+    403, 404, 422, ...) come from the request or the caller's key and do not.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500 or status == 429
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in _TRANSPORT_ERRORS for cls in type(error).__mro__)
+
+
+def percentile(samples: Iterable[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class _ProviderWindow:
+    __slots__ = ("ttft", "outcomes", "streams", "errors", "last_error_at")
+
+    def __init__(self, window: int):
+        self.ttft: Deque[float] = deque(maxlen=window)
+        # True for a first token, False for a failure before one.
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.streams = 0
+        self.errors = 0
+        self.last_error_at: Optional[float] = None
+
+
+class ProviderLatencyTracker:
+    """Sliding-window TTFT and failure statistics per provider."""
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        default_delay: float = DEFAULT_HEDGE_DELAY_MS / 1000,
+        min_delay: float = DEFAULT_MIN_DELAY_MS / 1000,
+        max_delay: float = DEFAULT_MAX_DELAY_MS / 1000,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        breakers: Optional[CircuitBreakerBoard] = None,
+    ):
+        self.window = window
+        self.breakers = breakers
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._providers: Dict[str, _ProviderWindow] = {}
+
+    def _entry(self, provider: str) -> _ProviderWindow:
+        entry = self._providers.get(provider)
+        if entry is None:
+            entry = self._providers[provider] = _ProviderWindow(self.window)
+        return entry
+
+    @staticmethod
+    def _names(provider: str, model: Optional[str]) -> Tuple[str, ...]:
+        return (provider, f"{provider}:{model}") if model else (provider,)
+
+    def record_ttft(
+        self,
+        provider: str,
+        seconds: float,
+        model: Optional[str] = None,
+        censored: bool = False,
+    ) -> None:
+        """
+        Records a first token after ``seconds``. ``censored`` marks a
+        stream abandoned before its first token: it took at least that
+        long, but says nothing about the provider's health.
+        """
+        with self._lock:
+            for name in self._names(provider, model):
+                entry = self._entry(name)
+                entry.ttft.append(seconds)
+                if not censored:
+                    entry.outcomes.append(True)
+                    entry.streams += 1
+        if self.breakers is not None and not censored:
+            self.breakers.record_success(provider)
+
+    def record_error(self, provider: str, model: Optional[str] = None) -> None:
+        with self._lock:
+            for name in self._names(provider, model):
+                entry = self._entry(name)
+                entry.outcomes.append(False)
+                entry.streams += 1
+                entry.errors += 1
+                entry.last_error_at = time.time()
+        if self.breakers is not None:
+            self.breakers.record_failure(provider)
+
+    def _record_failure(
+        self, provider: str, model: Optional[str], error: Exception
+    ) -> None:
+        if is_provider_fault(error):
+            self.record_error(provider, model)
+        else:
+            logging_utility.info(
+                "Not counting %s against %s: %s", type(error).__name__, provider, error
+            )
+
+    def timed(
+        self,
+        provider: str,
+        model: Optional[str],
+        open_deltas: Callable[[], Iterable[Delta]],
+    ) -> Iterator[Delta]:
+        """Streams ``open_deltas()``, recording its TTFT or early failure."""
+        started = time.monotonic()
+        waiting = True
+        try:
+            for delta in open_deltas():
+                if waiting:
+                    waiting = False
+                    self.record_ttft(provider, time.monotonic() - started, model)
+                yield delta
+        except GeneratorExit:
+            if waiting:
+                waiting = False
+                self.record_ttft(
+                    provider, time.monotonic() - started, model, censored=True
+                )
+            raise
+        except Exception as e:
+            if waiting:
+                waiting = False
+                self._record_failure(provider, model, e)
+            raise
+        finally:
+            if waiting:
+                # An empty reply.
+                self.record_ttft(provider, time.monotonic() - started, model)
+
+    async def atimed(
+        self,
+        provider: str,
+        model: Optional[str],
+        open_deltas: Callable[[], AsyncIterator[Delta]],
+    ) -> AsyncIterator[Delta]:
+        """Async ``timed``; a stream cancelled first gives a censored sample."""
+        started = time.monotonic()
+        waiting = True
+        try:
+            async for delta in open_deltas():
+                if waiting:
+                    waiting = False
+                    self.record_ttft(provider, time.monotonic() - started, model)
+                yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            if waiting:
+                waiting = False
+                self.record_ttft(
+                    provider, time.monotonic() - started, model, censored=True
+                )
+            raise
+        except Exception as e:
+            if waiting:
+                waiting = False
+                self._record_failure(provider, model, e)
+            raise
+        finally:
+            if waiting:
+                self.record_ttft(provider, time.monotonic() - started, model)
+
+    def _snapshot(self, provider: str) -> Tuple[List[float], List[bool]]:
+        with self._lock:
+            entry = self._providers.get(provider)
+            if entry is None:
+                return [], []
+            return list(entry.ttft), list(entry.outcomes)
+
+    def ttft_percentile(self, provider: str, q: float) -> Optional[float]:
+        samples, _ = self._snapshot(provider)
+        return percentile(samples, q)
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait for ``provider``'s first token before hedging."""
+        samples, _ = self._snapshot(provider)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        p95 = percentile(samples, HEDGE_PERCENTILE)
+        return min(self.max_delay, max(self.min_delay, p95))
+
+    def _score(self, provider: str) -> float:
+        samples, outcomes = self._snapshot(provider)
+        median = percentile(samples, 50.0)
+        if median is None:
+            median = self.default_delay
+        failure_rate = outcomes.count(False) / len(outcomes) if outcomes else 0.0
+        # A provider failing half its streams looks twice as slow.
+        return median * (1.0 + 2.0 * failure_rate)
+
+    def rank(self, providers: Iterable[str]) -> List[str]:
+        """``providers`` ordered fastest first; ties keep their order."""
+        return sorted(providers, key=self._score)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            names = sorted(self._providers)
+        report: Dict[str, Any] = {}
+        for name in names:
+            samples, outcomes = self._snapshot(name)
+            with self._lock:
+                entry = self._providers[name]
+                streams, errors = entry.streams, entry.errors
+            report[name] = {
+                "streams": streams,
+                "errors": errors,
+                "window_failure_rate": (
+                    round(outcomes.count(False) / len(outcomes), 4)
+                    if outcomes
+                    else None
+                ),
+                "ttft_ms": {
+                    label: _ms(percentile(samples, q))
+                    for label, q in (("p50", 50.0), ("p95", 95.0), ("p99", 99.0))
+                },
+                "hedge_delay_ms": _ms(self.hedge_delay(name)),
+            }
+        return report
+
+
+_tracker: Optional[ProviderLatencyTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_provider_health() -> ProviderLatencyTracker:
+    """Returns the process-wide tracker, creating it on first use."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = ProviderLatencyTracker(
+                    default_delay=float(
+                        os.getenv("INFERENCE_HEDGE_DELAY_MS", DEFAULT_HEDGE_DELAY_MS)
+                    )
+                    / 1000,
+                    min_delay=float(
+                        os.getenv(
+                            "INFERENCE_HEDGE_MIN_DELAY_MS", DEFAULT_MIN_DELAY_MS
+                        )
+                    )
+                    / 1000,
+                    max_delay=float(
+                        os.getenv(
+                            "INFERENCE_HEDGE_MAX_DELAY_MS", DEFAULT_MAX_DELAY_MS
+                        )
+                    )
+                    / 1000,
+                    min_samples=int(
+                        os.getenv("INFERENCE_HEDGE_MIN_SAMPLES", DEFAULT_MIN_SAMPLES)
+                    ),
+                    breakers=get_circuit_breakers(),
+                )
+    return _tracker
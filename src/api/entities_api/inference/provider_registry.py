@@ -0,0 +1,168 @@
+# entities_api/inference/provider_registry.py
+
+"""
+Process-wide registry of inference providers.
+
+The completions endpoint used to build a fresh InferenceArbiter and
+InferenceProviderSelector per request, so no handler instance (and none of
+the SDK clients and tokenizers they hold) ever survived a request. The
+registry keeps one arbiter/selector pair for the lifetime of the app,
+optionally warms the configured models at startup and reports what is warm.
+
+Configure startup warmup with INFERENCE_WARMUP_MODELS, a comma-separated
+list of unified model ids (e.g. "hyperbolic/deepseek-ai/DeepSeek-V3-0324").
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+from entities_api.inference.circuit_breaker import get_circuit_breakers
+from entities_api.inference.client_pool import get_client_pool
+from entities_api.inference.completion_cache import get_completion_cache
+from entities_api.inference.concurrency_governor import \
+    get_concurrency_governor
+from entities_api.inference.inference_arbiter import InferenceArbiter
+from entities_api.inference.inference_provider_selector import (
+    InferenceProviderSelector, ProviderRoute)
+from entities_api.inference.provider_health import get_provider_health
+from entities_api.inference.run_stream_buffer import get_run_stream_buffers
+from entities_api.services.conversation_truncator import ConversationTruncator
+from entities_api.system_message.system_prompt import \
+    get_system_prompt_assembler
+
+logging_utility = LoggingUtility()
+
+
+class ProviderRegistry:
+    """Owns the shared arbiter and selector and tracks handler warmth."""
+
+    def __init__(self):
+        self.arbiter = InferenceArbiter()
+        self.selector = InferenceProviderSelector(self.arbiter)
+        self._warmup_results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.created_at = time.time()
+
+    def select_provider(self, model_id: str) -> tuple[Any, str]:
+        """Same contract as InferenceProviderSelector.select_provider."""
+        return self.selector.select_provider(model_id=model_id)
+
+    def route(self, model_id: str, api_key: Optional[str] = None) -> ProviderRoute:
+        """Health-aware selection; see InferenceProviderSelector.route."""
+        return self.selector.route(model_id, api_key=api_key)
+
+    def resolve_specific_handler(self, model_id: str) -> Any:
+        """
+        Returns the concrete BaseInference handler the general handler would
+        dispatch ``model_id`` to.
+        """
+        general_handler, _ = self.select_provider(model_id)
+        resolve = getattr(general_handler, "_get_specific_handler_instance", None)
+        if resolve is None:
+            return general_handler
+        return resolve(model_id)
+
+    @staticmethod
+    def is_warm(handler: Any) -> bool:
+        """A handler is warm once its truncator (and tokenizer) is loaded."""
+        services = getattr(handler, "_services", None)
+        return bool(services) and ConversationTruncator in services
+
+    def warmup_model(self, model_id: str) -> Dict[str, Any]:
+        """Instantiates the handler for ``model_id`` and loads its tokenizer."""
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"model_id": model_id}
+        try:
+            handler = self.resolve_specific_handler(model_id)
+            result["handler"] = type(handler).__name__
+            if hasattr(handler, "conversation_truncator"):
+                handler.conversation_truncator
+            result["warm"] = self.is_warm(handler)
+            base_url = self.provider_base_url(handler)
+            if base_url:
+                result["tls"] = get_client_pool().warm_endpoint(base_url)
+        except Exception as e:
+            logging_utility.error(
+                "Warmup failed for model %s: %s", model_id, e, exc_info=True
+            )
+            result["warm"] = False
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - started, 3)
+
+        with self._lock:
+            self._warmup_results[model_id] = result
+        logging_utility.info(
+            "Warmup for %s finished in %.3fs (warm=%s)",
+            model_id,
+            result["seconds"],
+            result["warm"],
+        )
+        return result
+
+    @staticmethod
+    def provider_base_url(handler: Any) -> Optional[str]:
+        """The endpoint a handler streams from, when it declares one."""
+        env = getattr(handler, "PROVIDER_BASE_URL_ENV", None)
+        return (os.getenv(env) if env else None) or getattr(
+            handler, "PROVIDER_DEFAULT_BASE_URL", None
+        )
+
+    def warmup(self, model_ids: List[str]) -> List[Dict[str, Any]]:
+        return [self.warmup_model(model_id) for model_id in model_ids]
+
+    def stats(self) -> Dict[str, Any]:
+        """Instance counts and warm/cold state for the admin endpoint."""
+        with self.selector._cache_lock:
+            general = dict(self.selector._general_handler_cache)
+        with self.arbiter._cache_lock:
+            specific = dict(self.arbiter._provider_cache)
+
+        with self._lock:
+            warmup = list(self._warmup_results.values())
+
+        return {
+            "uptime_seconds": round(time.time() - self.created_at, 1),
+            "general_handlers": {
+                "count": len(general),
+                "classes": sorted(general),
+            },
+            "specific_handlers": {
+                "count": len(specific),
+                "instances": [
+                    {"class": name, "warm": self.is_warm(instance)}
+                    for name, instance in sorted(specific.items())
+                ],
+            },
+            "arbiter_cache": self.arbiter.cache_stats,
+            "client_pool": get_client_pool().stats(),
+            "provider_health": get_provider_health().stats(),
+            "completion_cache": get_completion_cache().stats(),
+            "governor": get_concurrency_governor().stats(),
+            "circuits": get_circuit_breakers().stats(),
+            "system_prompts": get_system_prompt_assembler().stats(),
+            "run_streams": get_run_stream_buffers().stats(),
+            "warmup": warmup,
+        }
+
+
+def configured_warmup_models() -> List[str]:
+    raw = os.getenv("INFERENCE_WARMUP_MODELS", "")
+    return [model.strip() for model in raw.split(",") if model.strip()]
+
+
+_registry: Optional[ProviderRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_provider_registry() -> ProviderRegistry:
+    """Returns the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProviderRegistry()
+    return _registry
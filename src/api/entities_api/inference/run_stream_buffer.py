@@ -0,0 +1,221 @@
+# entities_api/inference/run_stream_buffer.py
+
+"""
+Replayable per-run SSE streams.
+
+A run's stream used to live and die with the HTTP connection that started
+it: a client that lost its connection mid-generation could only start a new
+run and pay for the whole generation again.
+
+The completions endpoint now pumps a run's frames into a RunStream, and
+every connection (the original one, and any reconnect through
+``GET /v1/runs/{run_id}/stream?after=<seq>``) follows that stream:
+
+* frames are numbered from 1 and sent with an SSE ``id:`` line, so a
+  client knows where to resume (``after`` or the ``Last-Event-ID``
+  header);
+* each run keeps at most RUN_STREAM_BUFFER_BYTES of frames; the oldest are
+  dropped first, and a resume from before the oldest kept frame is refused;
+* finished streams stay available for RUN_STREAM_BUFFER_TTL_SECONDS, and
+  while all buffers together hold more than RUN_STREAM_BUFFER_TOTAL_BYTES
+  the oldest finished streams are evicted.
+
+When the last follower goes away, generation carries on for
+RUN_STREAM_RESUME_GRACE_SECONDS; if nobody reconnects by then, the run is
+treated as disconnected and the provider stream is stopped.
+
+Streams are followed on the event loop; ``append`` and ``finish`` must be
+called from it as well.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import (Any, AsyncIterator, Deque, Dict, List, Optional,
+                    Tuple)
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+DEFAULT_RUN_BYTES = 1024 * 1024
+DEFAULT_TOTAL_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_GRACE_SECONDS = 30.0
+
+Frame = Tuple[int, str]
+
+
+class ResumeGap(Exception):
+    """The frames a client asked to resume after are no longer buffered."""
+
+
+class RunStream:
+    """The numbered frames of one run, oldest dropped past ``max_bytes``."""
+
+    def __init__(self, run_id: str, max_bytes: int = DEFAULT_RUN_BYTES):
+        self.run_id = run_id
+        self.max_bytes = max_bytes
+        self.frames: Deque[Frame] = deque()
+        self.bytes = 0
+        self.last_seq = 0
+        self.dropped = 0
+        self.finished = False
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.followers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def append(self, frame: str) -> int:
+        self.last_seq += 1
+        self.frames.append((self.last_seq, frame))
+        self.bytes += len(frame)
+        # Keep the newest frame even if it alone is over budget.
+        while self.bytes > self.max_bytes and len(self.frames) > 1:
+            _, dropped = self.frames.popleft()
+            self.bytes -= len(dropped)
+            self.dropped += 1
+        self._notify()
+        return self.last_seq
+
+    def finish(self) -> None:
+        if not self.finished:
+            self.finished = True
+            self.finished_at = time.monotonic()
+            self._notify()
+
+    def frames_after(self, after: int) -> List[Frame]:
+        """Buffered frames numbered above ``after``."""
+        if self.frames and after < self.frames[0][0] - 1:
+            raise ResumeGap(
+                f"Frames {after + 1}..{self.frames[0][0] - 1} of run "
+                f"{self.run_id} are no longer buffered"
+            )
+        if after >= self.last_seq:
+            return []
+        return [frame for frame in self.frames if frame[0] > after]
+
+    async def follow(self, after: int = 0) -> AsyncIterator[Frame]:
+        """Replays frames after ``after``, then yields new ones until finished."""
+        self.followers += 1
+        try:
+            while True:
+                changed = self._changed
+                frames = self.frames_after(after)
+                for frame in frames:
+                    yield frame
+                if frames:
+                    after = frames[-1][0]
+                    continue
+                if self.finished:
+                    return
+                await changed.wait()
+        finally:
+            self.followers -= 1
+
+
+class RunStreamBuffers:
+    """Every buffered run stream in this process."""
+
+    def __init__(
+        self,
+        run_bytes: int = DEFAULT_RUN_BYTES,
+        total_bytes: int = DEFAULT_TOTAL_BYTES,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        grace: float = DEFAULT_GRACE_SECONDS,
+    ):
+        self.run_bytes = run_bytes
+        self.total_bytes = total_bytes
+        self.ttl = ttl
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._streams: "OrderedDict[str, RunStream]" = OrderedDict()
+        self.resumes = 0
+        self.evicted = 0
+
+    def open(self, run_id: str) -> RunStream:
+        """Starts a fresh stream for ``run_id``, replacing any earlier one."""
+        stream = RunStream(run_id, self.run_bytes)
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            self._streams.pop(run_id, None)
+            self._streams[run_id] = stream
+        return stream
+
+    def get(self, run_id: str) -> Optional[RunStream]:
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            return self._streams.get(run_id)
+
+    def resume(self, run_id: str) -> Optional[RunStream]:
+        stream = self.get(run_id)
+        if stream is not None:
+            with self._lock:
+                self.resumes += 1
+        return stream
+
+    def _evict_locked(self, now: float) -> None:
+        for run_id, stream in list(self._streams.items()):
+            if stream.finished and now - stream.finished_at >= self.ttl:
+                del self._streams[run_id]
+                self.evicted += 1
+        total = sum(stream.bytes for stream in self._streams.values())
+        for run_id, stream in list(self._streams.items()):
+            if total <= self.total_bytes:
+                break
+            if stream.finished:
+                total -= stream.bytes
+                del self._streams[run_id]
+                self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            streams = list(self._streams.values())
+            return {
+                "runs": len(streams),
+                "live": sum(1 for stream in streams if not stream.finished),
+                "followers": sum(stream.followers for stream in streams),
+                "bytes": sum(stream.bytes for stream in streams),
+                "run_bytes": self.run_bytes,
+                "total_bytes": self.total_bytes,
+                "ttl_seconds": self.ttl,
+                "grace_seconds": self.grace,
+                "resumes": self.resumes,
+                "evicted": self.evicted,
+            }
+
+
+_buffers: Optional[RunStreamBuffers] = None
+_buffers_lock = threading.Lock()
+
+
+def get_run_stream_buffers() -> RunStreamBuffers:
+    """Returns the process-wide buffers, creating them on first use."""
+    global _buffers
+    if _buffers is None:
+        with _buffers_lock:
+            if _buffers is None:
+                _buffers = RunStreamBuffers(
+                    run_bytes=int(
+                        os.getenv("RUN_STREAM_BUFFER_BYTES", DEFAULT_RUN_BYTES)
+                    ),
+                    total_bytes=int(
+                        os.getenv("RUN_STREAM_BUFFER_TOTAL_BYTES", DEFAULT_TOTAL_BYTES)
+                    ),
+                    ttl=float(
+                        os.getenv("RUN_STREAM_BUFFER_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+                    ),
+                    grace=float(
+                        os.getenv(
+                            "RUN_STREAM_RESUME_GRACE_SECONDS", DEFAULT_GRACE_SECONDS
+                        )
+                    ),
+                )
+    return _buffers
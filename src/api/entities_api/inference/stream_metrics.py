@@ -0,0 +1,440 @@
+# entities_api/inference/stream_metrics.py
+
+"""
+Streaming performance metrics.
+
+Each provider stream is followed by a StreamTimer that records:
+
+* context assembly time  - building the context window (history,
+                           system prompt, truncation) before the request;
+* time to first token    - request start to the first delta;
+* inter-token latency    - gaps between deltas, kept as a histogram;
+* stalls                 - gaps longer than INFERENCE_STALL_SECONDS;
+* tool-call detection    - stream start to the moment the recognizer
+                           accepted a tool call, if there was one;
+* tokens/s               - completion tokens over the time from first
+                           token to the end of the stream;
+* disconnects            - streams stopped because their client went
+                           away: how long the upstream took to close after
+                           the disconnect, and an estimate of the tokens
+                           that were not generated (the mean completed
+                           reply for the provider and model, minus what
+                           had been streamed).
+
+Finished timers are folded into process-wide histograms and counters
+labelled by provider and model, which ``GET /metrics`` renders in the
+Prometheus text format. Each label keeps at most
+INFERENCE_METRICS_MAX_LABEL_VALUES distinct values; later ones are
+reported as ``other``, so a stream of unknown model ids cannot blow up the
+number of series. The per-stream breakdown is also stored on the run (see
+RunService.update_run_usage).
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_STALL_SECONDS = 2.0
+DEFAULT_MAX_LABEL_VALUES = 32
+OVERFLOW_LABEL = "other"
+
+STREAM_COMPLETED = "completed"
+STREAM_CANCELLED = "cancelled"
+STREAM_FAILED = "failed"
+STREAM_DISCONNECTED = "disconnected"
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+INTER_TOKEN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+RATE_BUCKETS = (5.0, 10.0, 20.0, 40.0, 60.0, 80.0, 120.0, 200.0, 400.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., +Inf count, sum]
+        self.series: Dict[LabelValues, List[float]] = {}
+
+    def empty_counts(self) -> List[float]:
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe_locked(self, values: LabelValues, value: float) -> None:
+        counts = self.series.get(values)
+        if counts is None:
+            counts = self.series[values] = self.empty_counts()
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def merge_locked(self, values: LabelValues, other: List[float]) -> None:
+        counts = self.series.get(values)
+        if counts is None:
+            counts = self.series[values] = self.empty_counts()
+        for index, count in enumerate(other):
+            counts[index] += count
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bucket_labels = self.labels + ("le",)
+        for values, counts in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(
+                    bucket_labels, values + (_format_number(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.series: Dict[LabelValues, float] = {}
+
+    def inc_locked(self, values: LabelValues, amount: float = 1) -> None:
+        self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self.series.items()):
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}{labels} {_format_number(total)}")
+        return lines
+
+
+class StreamTimer:
+    """Timings of one provider stream; hand it to StreamMetrics.finish."""
+
+    __slots__ = (
+        "provider",
+        "model",
+        "stall_after",
+        "context_seconds",
+        "started",
+        "ended",
+        "first_token_at",
+        "last_delta_at",
+        "deltas",
+        "stalls",
+        "stall_seconds",
+        "tool_call_at",
+        "disconnected_at",
+        "inter_token",
+    )
+
+    def __init__(
+        self,
+        provider: str,
+        model: Optional[str],
+        context_seconds: Optional[float] = None,
+        stall_after: float = DEFAULT_STALL_SECONDS,
+    ):
+        self.provider = provider
+        self.model = model or "unknown"
+        self.stall_after = stall_after
+        self.context_seconds = context_seconds
+        self.started = time.monotonic()
+        self.ended: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.last_delta_at: Optional[float] = None
+        self.deltas = 0
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.tool_call_at: Optional[float] = None
+        self.disconnected_at: Optional[float] = None
+        # Local histogram, merged once when the stream ends.
+        self.inter_token = [0] * (len(INTER_TOKEN_BUCKETS) + 1) + [0.0]
+
+    def delta(self) -> None:
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            gap = now - self.last_delta_at
+            self.inter_token[bisect.bisect_left(INTER_TOKEN_BUCKETS, gap)] += 1
+            self.inter_token[-1] += gap
+            if gap >= self.stall_after:
+                self.stalls += 1
+                self.stall_seconds += gap
+        self.last_delta_at = now
+        self.deltas += 1
+
+    def stop(self) -> None:
+        """Marks the end of the stream; persistence afterwards is not counted."""
+        if self.ended is None:
+            self.ended = time.monotonic()
+
+    def tool_call_detected(self) -> None:
+        if self.tool_call_at is None:
+            self.tool_call_at = time.monotonic()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def tool_call_delay(self) -> Optional[float]:
+        if self.tool_call_at is None:
+            return None
+        return self.tool_call_at - self.started
+
+    @property
+    def disconnect_stop_delay(self) -> Optional[float]:
+        """Seconds from the client's disconnect to the end of the stream."""
+        if self.disconnected_at is None or self.ended is None:
+            return None
+        return max(0.0, self.ended - self.disconnected_at)
+
+    def breakdown(
+        self, completion_tokens: Optional[int], outcome: str
+    ) -> Dict[str, Any]:
+        """JSON-friendly summary, as stored in ``Run.usage``."""
+        self.stop()
+        ended = self.ended
+        generation = (
+            ended - self.first_token_at if self.first_token_at is not None else None
+        )
+
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "outcome": outcome,
+            "context_assembly_ms": ms(self.context_seconds),
+            "ttft_ms": ms(self.ttft),
+            "generation_ms": ms(generation),
+            "total_ms": ms(ended - self.started),
+            "deltas": self.deltas,
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": (
+                round(completion_tokens / generation, 2)
+                if completion_tokens and generation
+                else None
+            ),
+            "stalls": self.stalls,
+            "stall_ms": ms(self.stall_seconds),
+            "tool_call_detection_ms": ms(self.tool_call_delay),
+            "disconnect_stop_ms": ms(self.disconnect_stop_delay),
+        }
+
+
+class StreamMetrics:
+    """Process-wide streaming histograms and counters."""
+
+    def __init__(
+        self,
+        stall_after: float = DEFAULT_STALL_SECONDS,
+        max_label_values: int = DEFAULT_MAX_LABEL_VALUES,
+    ):
+        self.stall_after = stall_after
+        self.max_label_values = max_label_values
+        self._lock = threading.Lock()
+        self._label_values: Dict[str, set] = {}
+        # label values -> [tokens, streams] of completed streams
+        self._completed_replies: Dict[LabelValues, List[int]] = {}
+
+        labels = ("provider", "model")
+        self.streams = _Counter(
+            "entities_inference_streams_total",
+            "Provider streams by outcome.",
+            labels + ("outcome",),
+        )
+        self.context_assembly = _Histogram(
+            "entities_inference_context_assembly_seconds",
+            "Time spent building the context window before the request.",
+            labels,
+            LATENCY_BUCKETS,
+        )
+        self.ttft = _Histogram(
+            "entities_inference_ttft_seconds",
+            "Time from request to the first streamed delta.",
+            labels,
+            LATENCY_BUCKETS,
+        )
+        self.inter_token = _Histogram(
+            "entities_inference_inter_token_seconds",
+            "Gaps between consecutive streamed deltas.",
+            labels,
+            INTER_TOKEN_BUCKETS,
+        )
+        self.tokens_per_second = _Histogram(
+            "entities_inference_tokens_per_second",
+            "Completion tokens per second after the first token.",
+            labels,
+            RATE_BUCKETS,
+        )
+        self.tool_call_detection = _Histogram(
+            "entities_inference_tool_call_detection_seconds",
+            "Time from request to recognition of a tool call.",
+            labels,
+            LATENCY_BUCKETS,
+        )
+        self.stalls = _Counter(
+            "entities_inference_stalls_total",
+            "Gaps between deltas longer than the stall threshold.",
+            labels,
+        )
+        self.completion_tokens = _Counter(
+            "entities_inference_completion_tokens_total",
+            "Completion tokens streamed.",
+            labels,
+        )
+        self.disconnect_stop = _Histogram(
+            "entities_inference_disconnect_stop_seconds",
+            "Time from a client disconnect to the upstream stream closing.",
+            labels,
+            INTER_TOKEN_BUCKETS,
+        )
+        self.tokens_avoided = _Counter(
+            "entities_inference_disconnect_tokens_avoided_total",
+            "Estimated completion tokens not generated after client disconnects.",
+            labels,
+        )
+        self._families = (
+            self.streams,
+            self.context_assembly,
+            self.ttft,
+            self.inter_token,
+            self.tokens_per_second,
+            self.tool_call_detection,
+            self.stalls,
+            self.completion_tokens,
+            self.disconnect_stop,
+            self.tokens_avoided,
+        )
+
+    def timer(
+        self,
+        provider: str,
+        model: Optional[str],
+        context_seconds: Optional[float] = None,
+    ) -> StreamTimer:
+        return StreamTimer(provider, model, context_seconds, self.stall_after)
+
+    def _bounded_locked(self, label: str, value: str) -> str:
+        seen = self._label_values.setdefault(label, set())
+        if value in seen:
+            return value
+        if len(seen) >= self.max_label_values:
+            return OVERFLOW_LABEL
+        seen.add(value)
+        return value
+
+    def finish(
+        self,
+        timer: StreamTimer,
+        completion_tokens: Optional[int] = None,
+        outcome: str = STREAM_COMPLETED,
+    ) -> Dict[str, Any]:
+        """Folds a finished stream into the metrics; returns its breakdown."""
+        breakdown = timer.breakdown(completion_tokens, outcome)
+        with self._lock:
+            values = (
+                self._bounded_locked("provider", timer.provider),
+                self._bounded_locked("model", timer.model),
+            )
+            self.streams.inc_locked(values + (outcome,))
+            if timer.context_seconds is not None:
+                self.context_assembly.observe_locked(values, timer.context_seconds)
+            if timer.ttft is not None:
+                self.ttft.observe_locked(values, timer.ttft)
+            if timer.deltas > 1:
+                self.inter_token.merge_locked(values, timer.inter_token)
+            if breakdown["tokens_per_second"] is not None:
+                self.tokens_per_second.observe_locked(
+                    values, breakdown["tokens_per_second"]
+                )
+            if timer.tool_call_delay is not None:
+                self.tool_call_detection.observe_locked(values, timer.tool_call_delay)
+            if timer.stalls:
+                self.stalls.inc_locked(values, timer.stalls)
+            if completion_tokens:
+                self.completion_tokens.inc_locked(values, completion_tokens)
+            if outcome == STREAM_COMPLETED and completion_tokens is not None:
+                replies = self._completed_replies.setdefault(values, [0, 0])
+                replies[0] += completion_tokens
+                replies[1] += 1
+            elif outcome == STREAM_DISCONNECTED:
+                breakdown["tokens_avoided"] = self._tokens_avoided_locked(
+                    values, completion_tokens or 0
+                )
+                if breakdown["tokens_avoided"]:
+                    self.tokens_avoided.inc_locked(
+                        values, breakdown["tokens_avoided"]
+                    )
+                if timer.disconnect_stop_delay is not None:
+                    self.disconnect_stop.observe_locked(
+                        values, timer.disconnect_stop_delay
+                    )
+        return breakdown
+
+    def _tokens_avoided_locked(self, values: LabelValues, streamed: int) -> int:
+        """Mean completed reply length minus what was streamed; 0 if unknown."""
+        tokens, streams = self._completed_replies.get(values, (0, 0))
+        if not streams:
+            return 0
+        return max(0, round(tokens / streams) - streamed)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines: List[str] = []
+            for family in self._families:
+                lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+_metrics: Optional[StreamMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_stream_metrics() -> StreamMetrics:
+    """Returns the process-wide metrics, creating them on first use."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = StreamMetrics(
+                    stall_after=float(
+                        os.getenv("INFERENCE_STALL_SECONDS", DEFAULT_STALL_SECONDS)
+                    ),
+                    max_label_values=int(
+                        os.getenv(
+                            "INFERENCE_METRICS_MAX_LABEL_VALUES",
+                            DEFAULT_MAX_LABEL_VALUES,
+                        )
+                    ),
+                )
+    return _metrics
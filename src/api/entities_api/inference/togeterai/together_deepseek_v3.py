@@ -4,7 +4,6 @@ from abc import ABC
 from typing import Any, Generator, Optional
 
 from dotenv import load_dotenv
-from projectdavid_common import ValidationInterface
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
 from entities_api.inference.base_inference import BaseInference
@@ -15,6 +14,11 @@ logging_utility = LoggingUtility()
 
 class TogetherDeepSeekV3Inference(BaseInference, ABC):
 
+    ASYNC_PROVIDER = "TogetherAI"
+    PROVIDER_BASE_URL_ENV = "TOGETHER_BASE_URL"
+    PROVIDER_DEFAULT_BASE_URL = "https://api.together.xyz/v1"
+    PROVIDER_API_KEY_ENV = "TOGETHER_API_KEY"
+
     def setup_services(self):
         logging_utility.debug(
             "TogetherDeepSeekV3Inference specific setup completed (if any)."
@@ -103,163 +107,18 @@ class TogetherDeepSeekV3Inference(BaseInference, ABC):
             )
             return
 
-        assistant_reply = ""
-        accumulated_content = ""
-        reasoning_content = ""
-        in_reasoning = False
-        code_mode = False
-        code_buffer = ""
-
-        try:
-            response = client_to_use.chat.completions.create(**request_payload)
-
-            for token in response:
-                if self.check_cancellation_flag():
-                    logging_utility.warning(f"Run {run_id} cancelled mid-stream")
-                    yield json.dumps({"type": "error", "content": "Run cancelled"})
-                    break
-
-                if not token.choices or not token.choices[0]:
-                    continue
-
-                delta = token.choices[0].delta
-                delta_reasoning = getattr(delta, "reasoning_content", "")
-                delta_content = getattr(delta, "content", "")
-
-                if delta_reasoning and stream_reasoning:
-                    reasoning_content += delta_reasoning
-                    yield json.dumps({"type": "reasoning", "content": delta_reasoning})
-
-                if not delta_content:
-                    continue
-
-                segments = (
-                    self.REASONING_PATTERN.split(delta_content)
-                    if hasattr(self, "REASONING_PATTERN")
-                    else [delta_content]
-                )
-                for seg in segments:
-                    if not seg:
-                        continue
-
-                    if seg == "<think>":
-                        in_reasoning = True
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-                    elif seg == "</think>":
-                        in_reasoning = False
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                        continue
-
-                    if in_reasoning:
-                        reasoning_content += seg
-                        if stream_reasoning:
-                            yield json.dumps({"type": "reasoning", "content": seg})
-                    else:
-                        assistant_reply += seg
-                        accumulated_content += seg
-
-                        partial_match = (
-                            self.parse_code_interpreter_partial(accumulated_content)
-                            if hasattr(self, "parse_code_interpreter_partial")
-                            else None
-                        )
-
-                        if not code_mode and partial_match:
-                            full_match = partial_match.get("full_match")
-                            if full_match:
-                                match_index = accumulated_content.find(full_match)
-                                if match_index != -1:
-                                    accumulated_content = accumulated_content[
-                                        match_index + len(full_match) :
-                                    ]
-
-                            code_mode = True
-                            code_buffer = partial_match.get("code", "")
-                            self.code_mode = True
-                            yield json.dumps(
-                                {"type": "hot_code", "content": "```python\n"}
-                            )
-
-                            if code_buffer and hasattr(
-                                self, "_process_code_interpreter_chunks"
-                            ):
-                                results, code_buffer = (
-                                    self._process_code_interpreter_chunks(
-                                        "", code_buffer
-                                    )
-                                )
-                                for r in results:
-                                    yield r
-                                    assistant_reply += (
-                                        r
-                                        if isinstance(r, str)
-                                        else json.loads(r).get("content", "")
-                                    )
-                            continue
-
-                        if code_mode:
-                            if hasattr(self, "_process_code_interpreter_chunks"):
-                                results, code_buffer = (
-                                    self._process_code_interpreter_chunks(
-                                        seg, code_buffer
-                                    )
-                                )
-                                for r in results:
-                                    yield r
-                                    assistant_reply += (
-                                        r
-                                        if isinstance(r, str)
-                                        else json.loads(r).get("content", "")
-                                    )
-                            else:
-                                yield json.dumps({"type": "hot_code", "content": seg})
-                            continue
-
-                        if not code_buffer:
-                            yield json.dumps({"type": "content", "content": seg})
-
-        except Exception as e:
-            error_msg = f"TogetherAI SDK error (using {key_source_log} key): {str(e)}"
-            logging_utility.error(f"Run {run_id}: {error_msg}", exc_info=True)
-            if hasattr(self, "handle_error"):
-                self.handle_error(
-                    reasoning_content + assistant_reply, thread_id, assistant_id, run_id
-                )
-            yield json.dumps({"type": "error", "content": error_msg})
-            return
-
-        if assistant_reply and hasattr(self, "finalize_conversation"):
-            self.finalize_conversation(
-                reasoning_content + assistant_reply, thread_id, assistant_id, run_id
-            )
-
-        if accumulated_content and hasattr(self, "parse_and_set_function_calls"):
-            function_call = self.parse_and_set_function_calls(
-                accumulated_content, assistant_reply
-            )
-        else:
-            function_call = False
-
-        if function_call:
-            self.run_service.update_run_status(
-                run_id, ValidationInterface.StatusEnum.pending_action
-            )
-
-        if hasattr(self, "run_service") and hasattr(ValidationInterface, "StatusEnum"):
-            if not self.get_function_call_state():
-                self.run_service.update_run_status(
-                    run_id, ValidationInterface.StatusEnum.completed
-                )
-
-        if reasoning_content:
-            logging_utility.info(
-                f"Run {run_id}: Final reasoning content length: {len(reasoning_content)}"
-            )
+        yield from self._stream_completion(
+            lambda: self._iter_openai_deltas(
+                client_to_use.chat.completions.create(**request_payload)
+            ),
+            thread_id=thread_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            stream_reasoning=stream_reasoning,
+            error_prefix=f"TogetherAI SDK error (using {key_source_log} key)",
+            payload=request_payload,
+            api_key=api_key,
+        )
 
     def process_function_calls(
         self,
@@ -1,5 +1,5 @@
 # entities_api/inference/togetherai/togetherai_handler.py
-from typing import Any, Generator, Optional, Type
+from typing import Any, AsyncGenerator, Generator, Optional, Type
 
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
@@ -8,6 +8,7 @@ from entities_api.inference.togeterai.together_deepseek_R1 import \
     TogetherDeepSeekR1Inference
 from entities_api.inference.togeterai.together_deepseek_v3 import \
     TogetherDeepSeekV3Inference
+from entities_api.utils.async_to_sync import iterate_sync_in_thread
 
 logging_utility = LoggingUtility()
 
@@ -122,6 +123,39 @@ class TogetherAIHandler:
             **kwargs,
         )
 
+    async def aprocess_conversation(
+        self,
+        thread_id,
+        message_id,
+        run_id,
+        assistant_id,
+        model,
+        stream_reasoning=False,
+        api_key: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Native asyncio dispatch. Handlers without an async stream are driven
+        from a worker thread instead.
+        """
+        handler = self._get_specific_handler_instance(model)
+        call_kwargs = dict(
+            thread_id=thread_id,
+            message_id=message_id,
+            run_id=run_id,
+            assistant_id=assistant_id,
+            model=model,
+            stream_reasoning=stream_reasoning,
+            api_key=api_key,
+            **kwargs,
+        )
+        if getattr(handler, "supports_async_stream", False):
+            chunks = handler.aprocess_conversation(**call_kwargs)
+        else:
+            chunks = iterate_sync_in_thread(handler.process_conversation(**call_kwargs))
+        async for chunk in chunks:
+            yield chunk
+
     def stream(
         self,
         thread_id: str,
@@ -0,0 +1,263 @@
+"""
+Incremental recognition of JSON tool calls in streamed assistant replies.
+
+Tool calls used to be found only after the stream ended, by re-parsing the
+whole reply with ``ensure_valid_json`` and several regex passes. The
+ToolCallRecognizer consumes visible content deltas as they arrive: it tracks
+brace depth and string state over the significant characters only, parses a
+JSON object exactly once when it closes, and validates it against the
+assistant's tool schemas. A valid call is reported through ``on_tool_call``
+immediately, so callers can start creating the action while the provider is
+still draining the stream.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+STATE_PENDING = "pending"  # nothing visible yet
+STATE_CANDIDATE = "candidate"  # reply opens like a tool call
+STATE_PLAIN_TEXT = "plain_text"  # reply opens with prose (calls may still be embedded)
+STATE_TOOL_CALL = "tool_call"  # at least one valid call recognised
+
+_SIGNIFICANT = re.compile(r"""[{}"'\\]""")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+_CANDIDATE_HEAD = re.compile(r"(?:```(?:json)?\s*)?[{\[]")
+
+# Upper bound for a single buffered JSON object; larger spans are abandoned.
+MAX_CANDIDATE_CHARS = 256 * 1024
+
+
+def _loads_lenient(candidate: str) -> Any:
+    """
+    Parses a closed JSON object, tolerating single quotes and trailing
+    commas the same way ``BaseInference.ensure_valid_json`` does.
+    """
+    try:
+        return json.loads(candidate, strict=False)
+    except ValueError:
+        pass
+
+    fixed = candidate
+    if "'" in fixed and '"' not in fixed.replace("\\'", ""):
+        fixed = fixed.replace("'", '"')
+    fixed = _TRAILING_COMMA.sub(r"\1", fixed)
+    try:
+        return json.loads(fixed, strict=False)
+    except ValueError:
+        return None
+
+
+def normalize_tool_call(candidate: Any) -> Optional[Dict[str, Any]]:
+    """
+    Returns ``{"name": str, "arguments": dict}`` for a structurally valid
+    call, decoding string-encoded arguments, or None.
+    """
+    if not isinstance(candidate, dict):
+        return None
+    name = candidate.get("name")
+    arguments = candidate.get("arguments")
+    if isinstance(arguments, str):
+        arguments = _loads_lenient(arguments)
+    if not isinstance(name, str) or not name.strip() or not isinstance(arguments, dict):
+        return None
+    if any(not isinstance(key, str) for key in arguments):
+        return None
+    if arguments is candidate["arguments"]:
+        return candidate
+    return {**candidate, "arguments": arguments}
+
+
+class ToolCallRecognizer:
+    """
+    Streaming recognizer for ``{"name": ..., "arguments": {...}}`` tool calls.
+
+    A reply may carry several calls, as a JSON array or as consecutive
+    objects; each valid one is appended to ``tool_calls`` in order.
+
+    Args:
+        tool_schemas: The assistant's tools as returned by
+            ``ToolService.list_tools(restructure=True)``. When given, calls
+            must name one of these tools and supply its required arguments.
+        always_allowed: Tool names accepted even if absent from the schemas
+            (platform tools).
+        on_tool_call: Invoked once per valid call as soon as it closes.
+    """
+
+    def __init__(
+        self,
+        tool_schemas: Optional[Iterable[Dict[str, Any]]] = None,
+        always_allowed: Iterable[str] = (),
+        on_tool_call: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self._schemas = {
+            tool.get("name"): tool for tool in (tool_schemas or []) if tool.get("name")
+        }
+        self._always_allowed = set(always_allowed)
+        self._on_tool_call = on_tool_call
+
+        self.state = STATE_PENDING
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.rejected: List[Dict[str, Any]] = []
+
+        self._chars_seen = 0
+        self._detected_at: Optional[int] = None
+
+        self._depth = 0
+        self._quote: Optional[str] = None
+        self._object_quote: Optional[str] = None
+        self._skip_carry = 0
+        self._parts: List[str] = []
+        self._buffered = 0
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    @property
+    def tool_call(self) -> Optional[Dict[str, Any]]:
+        """The first valid call recognised so far."""
+        return self.tool_calls[0] if self.tool_calls else None
+
+    @property
+    def detected_at(self) -> Optional[int]:
+        """Visible character offset at which the first call closed."""
+        return self._detected_at
+
+    @property
+    def is_candidate(self) -> bool:
+        return self.state in (STATE_CANDIDATE, STATE_TOOL_CALL)
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        text = text.translate(_SMART_QUOTES)
+        if self.state == STATE_PENDING:
+            self._decide_head(text)
+
+        length = len(text)
+        skip_until = self._skip_carry
+        self._skip_carry = 0
+        obj_start = 0 if self._depth else -1
+
+        for match in _SIGNIFICANT.finditer(text):
+            i = match.start()
+            if i < skip_until:
+                continue
+            ch = text[i]
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._quote = None
+                    self._object_quote = None
+                    self._parts = []
+                    self._buffered = 0
+                    obj_start = i
+                continue
+
+            if self._quote is not None:
+                if ch == "\\":
+                    skip_until = i + 2
+                elif ch == self._quote:
+                    self._quote = None
+                continue
+
+            if ch in "\"'":
+                if self._object_quote is None:
+                    self._object_quote = ch
+                if ch == self._object_quote:
+                    self._quote = ch
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[obj_start : i + 1])
+                    candidate = "".join(self._parts)
+                    self._parts = []
+                    self._consider(candidate, self._chars_seen + i + 1)
+                    obj_start = -1
+
+        if skip_until > length:
+            self._skip_carry = skip_until - length
+        if self._depth and obj_start != -1:
+            self._parts.append(text[obj_start:])
+            self._buffered += length - obj_start
+            if self._buffered > MAX_CANDIDATE_CHARS:
+                self._abandon()
+        self._chars_seen += length
+
+    def finish(self, full_text: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Ends the stream and returns the first valid call, if any.
+
+        ``full_text`` lets the recognizer handle a reply that is itself a
+        JSON string wrapping the call (``"{\\"name\\": ...}"``), the only
+        case that cannot be recognised incrementally.
+        """
+        if not self.tool_calls and full_text:
+            stripped = full_text.strip()
+            if stripped.startswith('"'):
+                inner = _loads_lenient(stripped)
+                if isinstance(inner, str):
+                    nested = ToolCallRecognizer(
+                        tool_schemas=self._schemas.values(),
+                        always_allowed=self._always_allowed,
+                    )
+                    nested.feed(inner)
+                    for call in nested.tool_calls:
+                        self._accept(call, self._chars_seen)
+        return self.tool_call
+
+    def validate(self, call: Dict[str, Any]) -> bool:
+        """Checks a structurally valid call against the tool schemas."""
+        if not self._schemas:
+            return True
+        schema = self._schemas.get(call["name"])
+        if schema is None:
+            return call["name"] in self._always_allowed
+        parameters = schema.get("parameters") or {}
+        required = parameters.get("required") or []
+        return all(param in call["arguments"] for param in required)
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _decide_head(self, text: str) -> None:
+        head = text.lstrip()
+        if not head:
+            return
+        if head[0] in "{[`":
+            # A fence alone is not enough to decide; wait for what follows.
+            if head.startswith("```") and not _CANDIDATE_HEAD.match(head):
+                if len(head) < 8:
+                    return
+                self.state = STATE_PLAIN_TEXT
+                return
+            self.state = STATE_CANDIDATE
+        else:
+            self.state = STATE_PLAIN_TEXT
+
+    def _abandon(self) -> None:
+        self._depth = 0
+        self._quote = None
+        self._parts = []
+        self._buffered = 0
+
+    def _consider(self, candidate: str, offset: int) -> None:
+        call = normalize_tool_call(_loads_lenient(candidate))
+        if call is None:
+            return
+        self._accept(call, offset)
+
+    def _accept(self, call: Dict[str, Any], offset: int) -> None:
+        if not self.validate(call):
+            self.rejected.append(call)
+            return
+        self.tool_calls.append(call)
+        if self._detected_at is None:
+            self._detected_at = offset
+        self.state = STATE_TOOL_CALL
+        if self._on_tool_call is not None:
+            self._on_tool_call(call)
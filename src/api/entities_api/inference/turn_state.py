@@ -0,0 +1,52 @@
+# entities_api/inference/turn_state.py
+
+"""
+Per-run tool-call state of a provider handler.
+
+Handlers are shared by every run in the process (see provider_registry), so
+the tool calls parsed from one run's reply must not live on the handler: a
+later run would execute them again, and concurrent runs would overwrite
+each other's calls.
+
+The state of the turn being processed lives in a TurnState held by a
+context variable. Each stream starts a fresh one (``begin_turn``), and
+every step of the same run sees it: the rest of a sync conversation runs in
+the same thread, and async conversations hand their context to the threads
+they start (``asyncio.to_thread``, ``start_thread_producer``). Runs in other
+threads or tasks have their own context and never see it.
+"""
+
+import contextvars
+from typing import Any, Dict, List, Optional
+
+
+class TurnState:
+    """Tool calls of the latest turn of one run."""
+
+    __slots__ = ("function_call", "tool_calls", "tool_response")
+
+    def __init__(self):
+        self.function_call: Optional[Dict[str, Any]] = None
+        # Every call of the turn; function_call is the first of them.
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.tool_response: Any = None
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnState]] = contextvars.ContextVar(
+    "inference_turn", default=None
+)
+
+
+def begin_turn() -> TurnState:
+    """Starts a fresh turn in the current context and returns it."""
+    turn = TurnState()
+    _current_turn.set(turn)
+    return turn
+
+
+def current_turn() -> TurnState:
+    """The current context's turn, started on first use."""
+    turn = _current_turn.get()
+    if turn is None:
+        turn = begin_turn()
+    return turn
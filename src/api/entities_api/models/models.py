@@ -264,6 +264,37 @@ class Message(Base):
     sender_id = Column(String(64), nullable=True)
 
 
+class MessageReasoning(Base):
+    """
+    Reasoning trace of an assistant message (the ``<think>`` segments),
+    kept out of the message content so it is not sent back as context.
+    """
+
+    __tablename__ = "message_reasoning"
+
+    message_id = Column(
+        String(64),
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    content = Column(Text(length=4294967295), nullable=False)
+    created_at = Column(Integer, nullable=False)
+
+
+class MessageTokenCount(Base):
+    """Token count of a message's content, per tokenizer, stored on write."""
+
+    __tablename__ = "message_token_counts"
+
+    message_id = Column(
+        String(64),
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    tokenizer = Column(String(128), primary_key=True)
+    token_count = Column(Integer, nullable=False)
+
+
 class Run(Base):
     __tablename__ = "runs"
 
@@ -299,6 +330,35 @@ class Run(Base):
     actions = relationship("Action", back_populates="run")
 
 
+class RunQueueItem(Base):
+    """A run queued for, or leased by, a background run worker."""
+
+    __tablename__ = "run_queue"
+
+    run_id = Column(String(64), ForeignKey("runs.id"), primary_key=True)
+    state = Column(String(16), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(128), nullable=True)
+    enqueued_at = Column(Integer, nullable=False, default=lambda: int(time.time()))
+    claimed_at = Column(Integer, nullable=True)
+    heartbeat_at = Column(Integer, nullable=True)
+    finished_at = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (Index("idx_run_queue_state_enqueued", "state", "enqueued_at"),)
+
+
+class RunChunk(Base):
+    """One numbered SSE frame of a queued run's output."""
+
+    __tablename__ = "run_chunks"
+
+    run_id = Column(String(64), ForeignKey("runs.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    frame = Column(Text, nullable=False)
+    created_at = Column(Integer, nullable=False, default=lambda: int(time.time()))
+
+
 class Assistant(Base):
     __tablename__ = "assistants"
 
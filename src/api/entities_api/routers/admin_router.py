@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 
 # Import API dependencies
 from ..dependencies import get_api_key, get_db
+from ..inference.provider_registry import get_provider_registry
 # Import DB Models required for this router
 from ..models.models import ApiKey as ApiKeyModel
 from ..models.models import User as UserModel
@@ -116,6 +117,54 @@ def admin_create_api_key_for_user(
         )
 
 
+@admin_router.get(
+    "/inference/providers",
+    summary="Admin: Inference Provider Registry",
+    description="Shows cached inference handler instances and their warm/cold state.",
+)
+def admin_inference_providers(
+    db: Session = Depends(get_db),
+    auth_key: ApiKeyModel = Depends(get_api_key),
+):
+    """
+    Admin Only: Reports the process-wide provider registry.
+
+    - **Output**: General/specific handler instance counts, warm state per
+      handler, arbiter cache statistics, startup warmup results, client
+      pool, per-provider TTFT, completion cache, the concurrency
+      governor (in-flight streams, queue depth and queue wait times),
+      circuit breakers, compiled system prompt prefixes and resumable
+      run stream buffers.
+    """
+    logging_utility.info(
+        f"Admin request received from user {auth_key.user_id} for inference provider stats."
+    )
+
+    requesting_user = (
+        db.query(UserModel).filter(UserModel.id == auth_key.user_id).first()
+    )
+    if not requesting_user or not requesting_user.is_admin:
+        logging_utility.warning(
+            f"Authorization Failed: User {auth_key.user_id} attempted admin operation without admin rights."
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required for this operation.",
+        )
+
+    try:
+        return get_provider_registry().stats()
+    except Exception as e:
+        logging_utility.error(
+            f"Unexpected error collecting inference provider stats: {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to collect inference provider stats.",
+        )
+
+
 # --- Add other Admin-specific endpoints below if needed ---
 # For example: Admin list all users, Admin delete any user, Admin update any user's details etc.
 # Make sure to include similar authentication and admin authorization checks.
@@ -1,83 +1,113 @@
 import asyncio
 import json
+import os
 import time
-from typing import Any, AsyncGenerator
+from typing import Optional, Set
 
-from fastapi import APIRouter, HTTPException
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query,
+                     WebSocket, WebSocketDisconnect)
 from fastapi.responses import StreamingResponse
 from projectdavid_common import ValidationInterface
 from projectdavid_common.utilities.logging_service import LoggingUtility
 
-from entities_api.inference.inference_arbiter import InferenceArbiter
-from entities_api.inference.inference_provider_selector import \
-    InferenceProviderSelector
+from entities_api.dependencies import get_api_key
+from entities_api.inference.provider_registry import get_provider_registry
+from entities_api.inference.run_stream_buffer import (ResumeGap, RunStream,
+                                                      get_run_stream_buffers)
+from entities_api.models.models import ApiKey as ApiKeyModel
+from entities_api.services.cancellation_registry import \
+    get_cancellation_registry
+from entities_api.services.run_queue import (TERMINAL_STATES, get_run_queue,
+                                             queued_execution)
+from entities_api.services.service_gateway import get_service_gateway
+from entities_api.utils.stream_bridge import (ChunkBridge, SSECoalescer,
+                                              pump_async_producer, sse_frames,
+                                              start_thread_producer)
 
 router = APIRouter()
 logging_utility = LoggingUtility()
 
+# Adjacent deltas are coalesced into one SSE frame until either budget is hit.
+SSE_FRAME_BYTES = int(os.getenv("SSE_FRAME_BYTES", "16384"))
+SSE_FRAME_LATENCY = float(os.getenv("SSE_FRAME_LATENCY_MS", "15")) / 1000
+# How often followers of a queued run poll its chunk log.
+RUN_CHUNK_POLL = float(os.getenv("RUN_CHUNK_POLL_MS", "100")) / 1000
 
-async def run_sync_generator_in_thread(
-    sync_gen_func, *args, **kwargs
-) -> AsyncGenerator[Any, None]:
-    loop = asyncio.get_running_loop()
-    queue = asyncio.Queue(maxsize=10)
-    finished_sentinel = object()
+SSE_HEADERS = {
+    "X-Stream-Init": "true",
+    "Cache-Control": "no-cache, no-transform",
+    "Connection": "keep-alive",
+    "Content-Encoding": "none",
+}
 
-    def run_generator():
-        try:
-            sync_iterator = sync_gen_func(*args, **kwargs)
-            for item in sync_iterator:
-                future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
-                future.result()
-        except Exception as e:
-            logging_utility.error(f"Error in sync generator thread: {e}", exc_info=True)
-            future = asyncio.run_coroutine_threadsafe(queue.put(e), loop)
-            try:
-                future.result()
-            except Exception as put_err:
-                logging_utility.error(f"Error putting exception onto queue: {put_err}")
-        finally:
-            future = asyncio.run_coroutine_threadsafe(
-                queue.put(finished_sentinel), loop
-            )
-            try:
-                future.result()
-            except Exception as put_err:
-                logging_utility.error(f"Error putting sentinel onto queue: {put_err}")
 
-    thread_task = loop.run_in_executor(None, run_generator)
+def _abandon_if_unfollowed(stream: RunStream) -> None:
+    if stream.followers or stream.finished or stream.task is None:
+        return
+    logging_utility.info(
+        "Nobody resumed run %s within %.1fs; stopping generation",
+        stream.run_id,
+        get_run_stream_buffers().grace,
+    )
+    stream.task.cancel()
+
 
+async def _follow(stream: RunStream, after: int = 0):
+    """
+    ``stream``'s frames after ``after`` as SSE, each with its ``id:``.
+    When the last follower leaves an unfinished stream, generation is
+    stopped unless someone resumes within the grace period.
+    """
+    frames = stream.follow(after)
+    completed = False
     try:
-        while True:
-            item = await queue.get()
-            if item is finished_sentinel:
-                break
-            elif isinstance(item, Exception):
-                raise item
-            else:
-                yield item
-            queue.task_done()
+        async for seq, frame in frames:
+            yield f"id: {seq}\n{frame}"
+        completed = True
+    except ResumeGap as e:
+        completed = True
+        logging_utility.warning("Follower of run %s fell behind: %s", stream.run_id, e)
+        yield "data: " + json.dumps(
+            {"type": "error", "error": "resume_gap", "message": str(e)}
+        ) + "\n\n"
     finally:
-        if not thread_task.done():
-            thread_task.cancel()
-        try:
-            await asyncio.wait_for(thread_task, timeout=5.0)
-        except asyncio.TimeoutError:
-            logging_utility.warning(
-                "Timeout waiting for sync generator thread to finish."
+        await frames.aclose()
+        if not completed and not stream.finished:
+            asyncio.get_running_loop().call_later(
+                get_run_stream_buffers().grace, _abandon_if_unfollowed, stream
             )
-        except asyncio.CancelledError:
-            logging_utility.debug("Sync generator thread task cancelled.")
+    yield "data: [DONE]\n\n"
 
 
-@router.post(
-    "/completions",
-    summary="Asynchronous completions streaming endpoint (New Architecture)",
-    response_description="A stream of JSON-formatted completions chunks",
-)
-async def completions(
-    stream_request: ValidationInterface.StreamRequest,
-):
+async def _follow_chunk_log(run_id: str, after: int = 0):
+    """A queued run's frames from its chunk log, until a worker finishes it."""
+    queue = get_run_queue()
+    while True:
+        frames = await asyncio.to_thread(queue.frames_after, run_id, after)
+        if not frames:
+            state = await asyncio.to_thread(queue.state, run_id)
+            if state is None or state in TERMINAL_STATES:
+                # Frames written just before the worker finished the run.
+                frames = await asyncio.to_thread(queue.frames_after, run_id, after)
+                if not frames:
+                    break
+            else:
+                await asyncio.sleep(RUN_CHUNK_POLL)
+                continue
+        for seq, frame in frames:
+            yield f"id: {seq}\n{frame}"
+        after = frames[-1][0]
+    yield "data: [DONE]\n\n"
+
+
+def _queued(run_id: Optional[str]) -> bool:
+    return bool(run_id) and queued_execution() and (
+        get_run_queue().state(run_id) is not None
+    )
+
+
+def _route_for(stream_request: ValidationInterface.StreamRequest):
+    """The provider route for ``stream_request``; HTTPException if none."""
     log_payload = stream_request.dict()
     if "api_key" in log_payload and log_payload["api_key"]:
         log_payload["api_key"] = "****"  # Sanitize
@@ -87,17 +117,17 @@ async def completions(
         log_payload,
     )
 
-    arbiter = InferenceArbiter()
-    selector = InferenceProviderSelector(arbiter)
+    registry = get_provider_registry()
 
     try:
-        general_handler_instance, api_model_name = selector.select_provider(
-            model_id=stream_request.model
-        )
+        # Healthy providers only: a model whose provider has an open circuit
+        # may be served by an equivalent model on another provider.
+        route = registry.route(stream_request.model, api_key=stream_request.api_key)
         logging_utility.info(
-            "General handler selected: %s (for API model: %s)",
-            type(general_handler_instance).__name__,
-            api_model_name,
+            "General handler selected: %s (for API model: %s%s)",
+            type(route.handler).__name__,
+            route.api_model_name,
+            f", rerouted from {route.rerouted_from}" if route.rerouted_from else "",
         )
     except ValueError as ve:
         logging_utility.error("Provider selection error: %s", str(ve), exc_info=True)
@@ -110,12 +140,120 @@ async def completions(
         raise HTTPException(
             status_code=500, detail="Internal server error during provider setup."
         )
+    return route
 
-    async def stream_generator():
-        idx = 0
-        start_time = time.time()
-        run_id = stream_request.run_id
 
+async def _pump(stream: RunStream, stream_request, route) -> None:
+    """Runs the handler and feeds its frames into the run's stream."""
+    general_handler_instance = route.handler
+    run_id = stream_request.run_id
+    start_time = time.time()
+    bridge = ChunkBridge()
+    coalescer = SSECoalescer(max_bytes=SSE_FRAME_BYTES)
+    producer_task = None
+    finished = False
+
+    try:
+        conversation_args = {
+            "thread_id": stream_request.thread_id,
+            "message_id": stream_request.message_id,
+            "run_id": run_id,
+            "assistant_id": stream_request.assistant_id,
+            "model": route.model_id,
+            "stream_reasoning": False,
+            "api_key": route.api_key,  # DO NOT VALIDATE — USER-PROVIDED
+        }
+
+        # Async-capable handlers stream on the event loop; the others
+        # run their blocking generator in a producer thread. Either way
+        # chunks reach us in batches through the bridge.
+        if hasattr(general_handler_instance, "aprocess_conversation"):
+            producer_task = asyncio.create_task(
+                pump_async_producer(
+                    bridge,
+                    general_handler_instance.aprocess_conversation(
+                        **conversation_args
+                    ),
+                )
+            )
+        else:
+            start_thread_producer(
+                bridge,
+                general_handler_instance.process_conversation,
+                **conversation_args,
+            )
+
+        async for frame in sse_frames(
+            bridge, max_latency=SSE_FRAME_LATENCY, coalescer=coalescer
+        ):
+            stream.append(frame)
+        finished = True
+
+    except Exception as e:
+        finished = True
+        error = {
+            "type": "error",
+            "error": "stream_failure",
+            "message": "An internal error occurred during stream generation.",
+        }
+        stream.append("data: " + json.dumps(error) + "\n\n")
+        logging_utility.error(
+            "Stream generator error in run %s: %s", run_id, str(e), exc_info=True
+        )
+    finally:
+        if not finished and run_id:
+            # Cancelled because the client went away and did not come
+            # back within the grace period. Tell the handler before
+            # releasing the bridge, so it closes the provider stream
+            # and records the run as abandoned rather than failed.
+            get_cancellation_registry().disconnect(run_id)
+        bridge.cancel()
+        if producer_task is not None and not producer_task.done():
+            producer_task.cancel()
+        elapsed = time.time() - start_time
+        logging_utility.info(
+            "Stream processing finished for run_id: %s. Chunks: %d, frames: %d. "
+            "Duration: %.2f s",
+            run_id,
+            coalescer.chunks_in,
+            coalescer.frames_out,
+            elapsed,
+        )
+        stream.finish()
+
+
+def _start_run(stream_request, route) -> RunStream:
+    """Starts generation for ``stream_request`` in a task feeding a RunStream."""
+    run_id = stream_request.run_id
+    buffers = get_run_stream_buffers()
+    stream = buffers.open(run_id) if run_id else RunStream("")
+    stream.task = asyncio.create_task(_pump(stream, stream_request, route))
+    return stream
+
+
+@router.post(
+    "/completions",
+    summary="Asynchronous completions streaming endpoint (New Architecture)",
+    response_description="A stream of JSON-formatted completions chunks",
+)
+async def completions(
+    stream_request: ValidationInterface.StreamRequest,
+):
+    if await asyncio.to_thread(_queued, stream_request.run_id):
+        # A background worker executes this run; stream its output.
+        async def follow_queued_run():
+            yield "data: " + json.dumps({"status": "handshake"}) + "\n\n"
+            async for frame in _follow_chunk_log(stream_request.run_id):
+                yield frame
+
+        return StreamingResponse(
+            follow_queued_run(), media_type="text/event-stream", headers=SSE_HEADERS
+        )
+
+    route = _route_for(stream_request)
+    run_id = stream_request.run_id
+
+    async def stream_generator():
         logging_utility.info(
             "Starting stream_generator for model: %s, run_id: %s",
             stream_request.model,
@@ -123,82 +261,18 @@ async def completions(
         )
 
         yield "data: " + json.dumps({"status": "handshake"}) + "\n\n"
-        await asyncio.sleep(0.01)
         yield "data: " + json.dumps({"status": "initializing"}) + "\n\n"
-        await asyncio.sleep(0.01)
 
-        try:
-            sync_gen_args = {
-                "thread_id": stream_request.thread_id,
-                "message_id": stream_request.message_id,
-                "run_id": run_id,
-                "assistant_id": stream_request.assistant_id,
-                "model": stream_request.model,
-                "stream_reasoning": False,
-                "api_key": stream_request.api_key,  # DO NOT VALIDATE — USER-PROVIDED
-            }
-
-            async for chunk in run_sync_generator_in_thread(
-                general_handler_instance.process_conversation, **sync_gen_args
-            ):
-                idx += 1
-                if chunk is None:
-                    continue
-
-                if isinstance(chunk, str):
-                    try:
-                        if chunk.strip().startswith(("{", "[")):
-                            chunk_data = json.loads(chunk)
-                        else:
-                            chunk_data = {"type": "content", "content": chunk}
-                    except json.JSONDecodeError:
-                        chunk_data = {"type": "content", "content": chunk}
-                elif isinstance(chunk, dict):
-                    chunk_data = chunk
-                else:
-                    logging_utility.warning(
-                        f"Skipping unknown chunk type: {type(chunk)}"
-                    )
-                    continue
-
-                chunk_data.setdefault("type", "content")
-                if "content" not in chunk_data and chunk_data.get("type") != "error":
-                    chunk_data["content"] = ""
-
-                yield "data: " + json.dumps(chunk_data) + "\n\n"
-                await asyncio.sleep(0.01)
-
-        except Exception as e:
-            yield "data: " + json.dumps(
-                {
-                    "type": "error",
-                    "error": "stream_failure",
-                    "message": "An internal error occurred during stream generation.",
-                }
-            ) + "\n\n"
-            logging_utility.error(
-                "Stream generator error in run %s: %s", run_id, str(e), exc_info=True
-            )
-        finally:
-            elapsed = time.time() - start_time
-            logging_utility.info(
-                "Stream processing finished for run_id: %s. Chunks yielded: %d. Duration: %.2f s",
-                run_id,
-                idx,
-                elapsed,
-            )
-            yield "data: [DONE]\n\n"
+        # Generation runs in its own task and outlives this connection, so
+        # a client that drops can resume through GET /runs/{run_id}/stream.
+        async for frame in _follow(_start_run(stream_request, route)):
+            yield frame
 
     try:
         return StreamingResponse(
             stream_generator(),
             media_type="text/event-stream",
-            headers={
-                "X-Stream-Init": "true",
-                "Cache-Control": "no-cache, no-transform",
-                "Connection": "keep-alive",
-                "Content-Encoding": "none",
-            },
+            headers=SSE_HEADERS,
         )
     except Exception as e:
         logging_utility.error(
@@ -208,3 +282,206 @@ async def completions(
             exc_info=True,
         )
         raise HTTPException(status_code=500, detail="Stream initialization failed")
+
+
+@router.get(
+    "/runs/{run_id}/stream",
+    summary="Resume a run's stream",
+    response_description="The run's SSE frames after the given sequence number",
+)
+async def resume_run_stream(
+    run_id: str,
+    after: Optional[int] = Query(
+        None, ge=0, description="Sequence number of the last frame received"
+    ),
+    last_event_id: Optional[str] = Header(None),
+    auth_key: ApiKeyModel = Depends(get_api_key),
+):
+    """
+    Replays the buffered frames of ``run_id`` after ``after`` (or the
+    ``Last-Event-ID`` header), then follows the live stream until the run's
+    generation finishes. Runs executed by background workers are followed
+    through their chunk log.
+    """
+    if after is None:
+        after = int(last_event_id) if (last_event_id or "").isdigit() else 0
+    stream = get_run_stream_buffers().resume(run_id)
+    if stream is None:
+        if await asyncio.to_thread(_queued, run_id):
+            return StreamingResponse(
+                _follow_chunk_log(run_id, after),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+        raise HTTPException(status_code=404, detail="No buffered stream for run")
+    try:
+        stream.frames_after(after)
+    except ResumeGap as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    logging_utility.info(
+        "[%s] Resuming run %s after frame %d (last frame %d, finished=%s)",
+        auth_key.user_id,
+        run_id,
+        after,
+        stream.last_seq,
+        stream.finished,
+    )
+    return StreamingResponse(
+        _follow(stream, after), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+def _frame_data(frame: str) -> str:
+    """The ``data:`` payload of one SSE frame."""
+    start = frame.index("data: ") + len("data: ")
+    return frame[start:].rstrip("\n")
+
+
+def _submit_tool_output(stream_request, action_id: str, content: str) -> None:
+    """Records a tool output sent over a socket, as the REST endpoints do."""
+    gateway = get_service_gateway()
+    gateway.messages.submit_tool_output(
+        thread_id=stream_request.thread_id,
+        content=content,
+        assistant_id=stream_request.assistant_id,
+        tool_id=action_id,
+    )
+    gateway.actions.update_action(action_id=action_id, status="completed")
+
+
+async def _receive_tool_outputs(
+    websocket: WebSocket, stream_request, announced: Set[str]
+) -> None:
+    """
+    Answers the actions announced on ``websocket`` with the client's
+    outputs. Returns when the client goes away.
+    """
+    while True:
+        try:
+            message = await websocket.receive_json()
+        except WebSocketDisconnect:
+            return
+        except ValueError:
+            await websocket.send_json(
+                {"type": "error", "error": "invalid_message", "message": "Not JSON"}
+            )
+            continue
+
+        kind = message.get("type") if isinstance(message, dict) else None
+        if kind != "tool_output":
+            await websocket.send_json(
+                {
+                    "type": "error",
+                    "error": "invalid_message",
+                    "message": f"Unknown message type: {kind}",
+                }
+            )
+            continue
+
+        action_id = message.get("action_id")
+        if action_id not in announced:
+            await websocket.send_json(
+                {
+                    "type": "error",
+                    "error": "unknown_action",
+                    "message": f"No pending action {action_id} on this run",
+                }
+            )
+            continue
+
+        content = message.get("content", "")
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        try:
+            await asyncio.to_thread(
+                _submit_tool_output, stream_request, action_id, content
+            )
+        except Exception as e:
+            logging_utility.error(
+                "Run %s: tool output for action %s not recorded: %s",
+                stream_request.run_id,
+                action_id,
+                e,
+            )
+            await websocket.send_json(
+                {
+                    "type": "error",
+                    "error": "tool_output_failed",
+                    "action_id": action_id,
+                    "message": "The tool output could not be recorded.",
+                }
+            )
+            continue
+        announced.discard(action_id)
+
+
+@router.websocket("/ws/completions")
+async def completions_socket(websocket: WebSocket):
+    """
+    Bidirectional completions. The first message is the StreamRequest; the
+    server then sends the events of ``/completions``, one JSON text message
+    each, ending with ``[DONE]``. ``action_required`` events hand a
+    client-side tool call to the client, which answers on the same socket
+    with ``{"type": "tool_output", "action_id": ..., "content": ...}``;
+    generation carries on as soon as the output is recorded.
+    """
+    await websocket.accept()
+    try:
+        stream_request = ValidationInterface.StreamRequest(
+            **json.loads(await websocket.receive_text())
+        )
+    except WebSocketDisconnect:
+        return
+    except (json.JSONDecodeError, TypeError, ValueError) as e:
+        await websocket.send_json(
+            {"type": "error", "error": "invalid_request", "message": str(e)}
+        )
+        await websocket.close(code=1003)
+        return
+
+    if await asyncio.to_thread(_queued, stream_request.run_id):
+        frames = _follow_chunk_log(stream_request.run_id)
+    else:
+        try:
+            route = _route_for(stream_request)
+        except HTTPException as e:
+            await websocket.send_json(
+                {"type": "error", "error": "provider_selection", "message": e.detail}
+            )
+            await websocket.close(code=1011)
+            return
+        frames = _follow(_start_run(stream_request, route))
+
+    announced: Set[str] = set()
+
+    async def send_frames():
+        await websocket.send_json({"status": "handshake"})
+        async for frame in frames:
+            data = _frame_data(frame)
+            if '"action_required"' in data:
+                event = json.loads(data)
+                if event.get("type") == "action_required":
+                    announced.add(event["action_id"])
+            await websocket.send_text(data)
+        await websocket.close()
+
+    sender = asyncio.create_task(send_frames())
+    receiver = asyncio.create_task(
+        _receive_tool_outputs(websocket, stream_request, announced)
+    )
+    try:
+        # Either the run's frames run out, or the client goes away; a run
+        # left behind keeps going for the resume grace period (see _follow).
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sender, receiver):
+            task.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+        await frames.aclose()
+    if sender.done() and not sender.cancelled() and sender.exception():
+        logging_utility.info(
+            "Socket for run %s closed early: %s",
+            stream_request.run_id,
+            sender.exception(),
+        )
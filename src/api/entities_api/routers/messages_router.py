@@ -83,6 +83,30 @@ def get_message(
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
 
+@router.get("/messages/{message_id}/reasoning", response_model=Dict[str, Any])
+def get_message_reasoning(
+    message_id: str,
+    db: Session = Depends(get_db),
+    auth_key: ApiKeyModel = Depends(get_api_key),
+):
+    logging_utility.info(
+        f"[{auth_key.user_id}] Retrieving reasoning of message ID: {message_id}"
+    )
+    message_service = MessageService(db)
+    try:
+        return message_service.retrieve_reasoning(message_id)
+    except HTTPException as e:
+        logging_utility.error(
+            f"HTTP error retrieving reasoning of message {message_id}: {str(e)}"
+        )
+        raise e
+    except Exception as e:
+        logging_utility.error(
+            f"Unexpected error retrieving reasoning of message {message_id}: {str(e)}"
+        )
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+
 @router.get(
     "/threads/{thread_id}/messages",
     response_model=List[ValidationInterface.MessageRead],
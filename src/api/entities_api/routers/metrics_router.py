@@ -0,0 +1,23 @@
+# src/api/entities_api/routers/metrics_router.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..inference.stream_metrics import get_stream_metrics
+
+# Served at the root (GET /metrics), where Prometheus scrapes by default.
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """
+    Streaming performance metrics in the Prometheus text format: TTFT,
+    inter-token latency, tokens/s, stalls, tool-call detection delay and
+    context assembly time per provider and model.
+    """
+    return PlainTextResponse(
+        get_stream_metrics().render(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,255 @@
+"""
+Event-driven wait for client-side tool results.
+
+When a run hands a tool call to the consumer, inference used to poll
+``retrieve_run`` once a second until the run left ``action_required``.
+With many runs parked on client tools that is a steady stream of requests
+against our own API for no work.
+
+Instead, ``_process_tool_calls`` registers the action here and blocks on an
+event. The services that record the outcome wake it directly:
+
+* MessageService.submit_tool_output  -> ``notify_tool_output`` (carries the
+  output, so the next generation can start without re-reading it)
+* ActionService.update_action_status -> ``notify_action``
+* RunService status changes          -> ``notify_run``
+
+Outcomes recorded by another process (another API worker, or an HTTP
+gateway deployment) are picked up by a slow fallback poll every
+ACTION_WAIT_POLL_INTERVAL seconds. Waits give up after ACTION_WAIT_TIMEOUT
+seconds, or at the action's own ``expires_at`` if that comes first.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+OUTCOME_TOOL_OUTPUT = "tool_output"
+OUTCOME_COMPLETED = "completed"
+OUTCOME_FAILED = "failed"
+OUTCOME_RUN_STATUS = "run_status"
+OUTCOME_CANCELLED = "cancelled"
+OUTCOME_EXPIRED = "expired"
+
+# Action statuses that end a wait; "processing" only means the client
+# picked the action up.
+TERMINAL_ACTION_STATUSES = ("completed", "failed", "cancelled", "expired")
+WAITING_RUN_STATUS = "action_required"
+
+DEFAULT_WAIT_TIMEOUT = 600.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+class ActionWaitResult:
+    """How a wait ended, plus the tool output when one was submitted."""
+
+    __slots__ = ("action_id", "outcome", "status", "output", "waited")
+
+    def __init__(
+        self,
+        action_id: str,
+        outcome: str,
+        status: Optional[str] = None,
+        output: Any = None,
+    ):
+        self.action_id = action_id
+        self.outcome = outcome
+        self.status = status
+        self.output = output
+        self.waited = 0.0
+
+    @property
+    def resumable(self) -> bool:
+        """True when the run should carry on with the next generation."""
+        return self.outcome in (
+            OUTCOME_TOOL_OUTPUT,
+            OUTCOME_COMPLETED,
+            OUTCOME_FAILED,
+            OUTCOME_RUN_STATUS,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"ActionWaitResult(action_id={self.action_id!r}, "
+            f"outcome={self.outcome!r}, status={self.status!r})"
+        )
+
+
+class _PendingAction:
+    __slots__ = ("action_id", "run_id", "event", "result")
+
+    def __init__(self, action_id: str, run_id: Optional[str]):
+        self.action_id = action_id
+        self.run_id = run_id
+        self.event = threading.Event()
+        self.result: Optional[ActionWaitResult] = None
+
+
+class ActionWaiter:
+    """Process-wide table of actions that a run is blocked on."""
+
+    def __init__(
+        self,
+        default_timeout: float = DEFAULT_WAIT_TIMEOUT,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.default_timeout = default_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingAction] = {}
+        self._by_run: Dict[str, Set[str]] = {}
+
+    # ------------------------------------------------------------------ #
+    # Waiter side
+    # ------------------------------------------------------------------ #
+    def register(self, action_id: str, run_id: Optional[str] = None) -> None:
+        """
+        Registers interest in ``action_id``. Call before the run is set to
+        ``action_required`` so a fast client cannot answer unobserved.
+        """
+        with self._lock:
+            if action_id in self._pending:
+                return
+            self._pending[action_id] = _PendingAction(action_id, run_id)
+            if run_id is not None:
+                self._by_run.setdefault(run_id, set()).add(action_id)
+
+    def unregister(self, action_id: str) -> None:
+        with self._lock:
+            pending = self._pending.pop(action_id, None)
+            if pending is None or pending.run_id is None:
+                return
+            run_actions = self._by_run.get(pending.run_id)
+            if run_actions is not None:
+                run_actions.discard(action_id)
+                if not run_actions:
+                    del self._by_run[pending.run_id]
+
+    def wait(
+        self,
+        action_id: str,
+        timeout: Optional[float] = None,
+        poll: Optional[Callable[[str], Optional[ActionWaitResult]]] = None,
+    ) -> ActionWaitResult:
+        """
+        Blocks until the action is resolved or ``timeout`` elapses. ``poll``
+        is consulted every ``poll_interval`` seconds for outcomes recorded
+        by other processes. The action is unregistered on return.
+        """
+        with self._lock:
+            pending = self._pending.get(action_id)
+        if pending is None:
+            self.register(action_id)
+            with self._lock:
+                pending = self._pending[action_id]
+
+        timeout = self.default_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + max(0.0, timeout)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    result = ActionWaitResult(action_id, OUTCOME_EXPIRED)
+                    break
+                if pending.event.wait(min(remaining, self.poll_interval)):
+                    result = pending.result
+                    break
+                if poll is not None:
+                    try:
+                        result = poll(action_id)
+                    except Exception as e:
+                        logging_utility.warning(
+                            "Fallback poll for action %s failed: %s", action_id, e
+                        )
+                        result = None
+                    if result is not None:
+                        break
+        finally:
+            self.unregister(action_id)
+
+        result.waited = time.monotonic() - started
+        return result
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    # ------------------------------------------------------------------ #
+    # Producer side (called by the services after their commit)
+    # ------------------------------------------------------------------ #
+    def _resolve(self, action_id: str, result: ActionWaitResult) -> bool:
+        with self._lock:
+            pending = self._pending.get(action_id)
+            if pending is None or pending.result is not None:
+                return False
+            pending.result = result
+        pending.event.set()
+        return True
+
+    def notify_tool_output(self, action_id: Optional[str], content: Any) -> None:
+        if not action_id:
+            return
+        result = ActionWaitResult(
+            action_id, OUTCOME_TOOL_OUTPUT, status="completed", output=content
+        )
+        if self._resolve(action_id, result):
+            logging_utility.debug("Tool output received for action %s", action_id)
+
+    def notify_action(self, action_id: str, status: Any, result: Any = None) -> None:
+        status = getattr(status, "value", status)
+        if status not in TERMINAL_ACTION_STATUSES:
+            return
+        outcome = {
+            "completed": OUTCOME_COMPLETED,
+            "failed": OUTCOME_FAILED,
+            "cancelled": OUTCOME_CANCELLED,
+            "expired": OUTCOME_EXPIRED,
+        }[status]
+        result = ActionWaitResult(action_id, outcome, status=status, output=result)
+        self._resolve(action_id, result)
+
+    def notify_run(self, run_id: str, status: Any) -> None:
+        status = getattr(status, "value", status)
+        if status == WAITING_RUN_STATUS:
+            return
+        with self._lock:
+            action_ids = list(self._by_run.get(run_id, ()))
+        if not action_ids:
+            return
+        outcome = OUTCOME_RUN_STATUS
+        if status in ("cancelling", "cancelled"):
+            outcome = OUTCOME_CANCELLED
+        elif status == "expired":
+            outcome = OUTCOME_EXPIRED
+        for action_id in action_ids:
+            result = ActionWaitResult(action_id, outcome, status=status)
+            self._resolve(action_id, result)
+
+
+_waiter: Optional[ActionWaiter] = None
+_waiter_lock = threading.Lock()
+
+
+def get_action_waiter() -> ActionWaiter:
+    """Returns the process-wide waiter, creating it on first use."""
+    global _waiter
+    if _waiter is None:
+        with _waiter_lock:
+            if _waiter is None:
+                _waiter = ActionWaiter(
+                    default_timeout=float(
+                        os.getenv("ACTION_WAIT_TIMEOUT", str(DEFAULT_WAIT_TIMEOUT))
+                    ),
+                    poll_interval=float(
+                        os.getenv(
+                            "ACTION_WAIT_POLL_INTERVAL", str(DEFAULT_POLL_INTERVAL)
+                        )
+                    ),
+                )
+    return _waiter
@@ -2,17 +2,15 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException
-from projectdavid import Entity
 from projectdavid_common import UtilsInterface, ValidationInterface
 from projectdavid_common.utilities.logging_service import LoggingUtility
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from entities_api.models.models import Action, Run, Tool
+from entities_api.services.action_waiter import get_action_waiter
 from entities_api.utils.conversion_utils import datetime_to_iso
 
-client = Entity()
-
 validator = ValidationInterface()
 
 
@@ -151,14 +149,15 @@ class ActionService:
                     status_code=404, detail=f"Action {action_id} not found"
                 )
 
-            # we indirectly fetch the tool name by id which is already available on another end point
-            tool = client.tool_service.get_tool_by_id(tool_id=action.tool_id)
+            # Resolve the tool name from the same session rather than
+            # looping back through the tools endpoint.
+            tool = self.db.query(Tool).filter(Tool.id == action.tool_id).first()
 
             return validator.ActionRead(
                 id=action.id,
                 run_id=action.run_id,
                 tool_id=action.tool_id,
-                tool_name=tool.name,
+                tool_name=tool.name if tool else None,
                 triggered_at=datetime_to_iso(
                     action.triggered_at
                 ),  # Use conversion utility
@@ -201,6 +200,8 @@ class ActionService:
             self.db.commit()
             self.db.refresh(action)
 
+            get_action_waiter().notify_action(action.id, action.status, action.result)
+
             # Return the updated ActionRead object
             return validator.ActionRead(
                 id=action.id,
@@ -2,7 +2,6 @@ import time
 from typing import List
 
 from fastapi import HTTPException
-from projectdavid import Entity
 from projectdavid_common import UtilsInterface, ValidationInterface
 from sqlalchemy.orm import Session
 
@@ -17,7 +16,6 @@ validator = ValidationInterface()
 class AssistantService:
     def __init__(self, db: Session):
         self.db = db
-        self.client = Entity()
 
     def create_assistant(
         self, assistant: validator.AssistantCreate
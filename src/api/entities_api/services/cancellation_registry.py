@@ -0,0 +1,233 @@
+"""
+In-process run cancellation registry.
+
+Streams used to start one daemon thread per run that asked the event
+handler about cancellation once a second. Instead, inference registers the
+runs it is streaming here and ``check_cancellation_flag(run_id)`` is a set
+lookup. ``RunService.cancel_run`` signals the registry directly, so a
+cancel handled by the same process propagates immediately.
+
+Cancels issued by another process (another API worker, or a split
+deployment) arrive through a pluggable backend. The database backend runs
+one shared poller thread for the whole process that checks all watched runs
+in a single query, and only while something is being watched.
+
+Select the backend with CANCELLATION_BACKEND=database|local. The default is
+``database``: with more than one API or run worker a cancel usually lands in
+a different process than the stream, and the local backend would never see
+it. ``local`` suits single-process deployments only.
+
+The completions endpoint also signals ``disconnect(run_id)`` when its SSE
+client goes away. That stops the stream exactly like a cancel, but stays in
+this process (the producer is local) and is remembered separately, so the
+stream can record the run as abandoned rather than cancelled by the user.
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Set
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+BACKEND_LOCAL = "local"
+BACKEND_DATABASE = "database"
+
+CANCELLED_STATUSES = ("cancelling", "cancelled")
+
+# Cancels for runs that are not (yet) watched are remembered for a while so
+# a stream that starts right after the cancel still sees it.
+RECENT_CANCEL_LIMIT = 4096
+
+
+class CancellationBackend(ABC):
+    """
+    Cross-process transport for cancel signals.
+
+    ``start`` receives a callback to invoke for every run cancelled
+    elsewhere; ``publish`` announces a cancel made in this process.
+    """
+
+    @abstractmethod
+    def start(
+        self,
+        on_cancelled: Callable[[str], None],
+        watched: Callable[[], Iterable[str]],
+    ) -> None: ...
+
+    def publish(self, run_id: str) -> None:
+        """Backends that share state through the run row need not publish."""
+
+    def notify_watch(self) -> None:
+        """Called when a run starts being watched."""
+
+    def stop(self) -> None:
+        pass
+
+
+class LocalCancellationBackend(CancellationBackend):
+    """Single-process deployments: cancels only come from this process."""
+
+    def start(self, on_cancelled, watched) -> None:
+        pass
+
+
+class DatabaseCancellationBackend(CancellationBackend):
+    """
+    Picks up cancels written to the runs table by other processes. One
+    thread polls every ``interval`` seconds with a single ``IN`` query over
+    the watched runs, and sleeps while nothing is watched.
+    """
+
+    def __init__(self, interval: float = 0.05, session_factory=None):
+        self.interval = interval
+        self._session_factory = session_factory
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def start(self, on_cancelled, watched) -> None:
+        if self._session_factory is None:
+            from entities_api.db.database import SessionLocal
+
+            self._session_factory = SessionLocal
+
+        self._on_cancelled = on_cancelled
+        self._watched = watched
+        self._thread = threading.Thread(
+            target=self._run, name="cancellation-poller", daemon=True
+        )
+        self._thread.start()
+
+    def notify_watch(self) -> None:
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _poll(self, run_ids) -> Set[str]:
+        from entities_api.models.models import Run
+
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(Run.id, Run.status)
+                .filter(Run.id.in_(list(run_ids)))
+                .all()
+            )
+        finally:
+            db.close()
+        return {
+            run_id
+            for run_id, status in rows
+            if getattr(status, "value", status) in CANCELLED_STATUSES
+        }
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            run_ids = list(self._watched())
+            if not run_ids:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                for run_id in self._poll(run_ids):
+                    self._on_cancelled(run_id)
+            except Exception as e:
+                logging_utility.error("Cancellation poll failed: %s", e)
+            time.sleep(self.interval)
+
+
+class CancellationRegistry:
+    """Tracks watched runs and the runs cancelled among them."""
+
+    def __init__(self, backend: Optional[CancellationBackend] = None):
+        self._lock = threading.Lock()
+        self._watched: Set[str] = set()
+        self._cancelled: "OrderedDict[str, float]" = OrderedDict()
+        self._disconnected: "OrderedDict[str, float]" = OrderedDict()
+        self.backend = backend or LocalCancellationBackend()
+        self.backend.start(self._mark_cancelled, self.watched_runs)
+
+    def watched_runs(self):
+        """Watched runs that have not been seen cancelled yet."""
+        with self._lock:
+            return tuple(r for r in self._watched if r not in self._cancelled)
+
+    def watch(self, run_id: str) -> None:
+        """Registers a run that is about to stream."""
+        with self._lock:
+            self._watched.add(run_id)
+        self.backend.notify_watch()
+
+    def unwatch(self, run_id: str) -> None:
+        with self._lock:
+            self._watched.discard(run_id)
+
+    def cancel(self, run_id: str) -> None:
+        """Signals a cancel made in this process and publishes it."""
+        self._mark_cancelled(run_id)
+        try:
+            self.backend.publish(run_id)
+        except Exception as e:
+            logging_utility.error("Failed to publish cancel for run %s: %s", run_id, e)
+
+    def _mark_cancelled(self, run_id: str) -> None:
+        with self._lock:
+            if run_id in self._cancelled:
+                return
+            self._cancelled[run_id] = time.time()
+            while len(self._cancelled) > RECENT_CANCEL_LIMIT:
+                self._cancelled.popitem(last=False)
+            watched = run_id in self._watched
+        if watched:
+            logging_utility.info(f"Cancellation signalled for run {run_id}")
+
+    def is_cancelled(self, run_id: str) -> bool:
+        return run_id in self._cancelled
+
+    def disconnect(self, run_id: str) -> None:
+        """Signals that the client reading ``run_id``'s stream went away."""
+        with self._lock:
+            if run_id in self._disconnected:
+                return
+            self._disconnected[run_id] = time.monotonic()
+            while len(self._disconnected) > RECENT_CANCEL_LIMIT:
+                self._disconnected.popitem(last=False)
+        logging_utility.info(f"Client disconnected from run {run_id}")
+        self._mark_cancelled(run_id)
+
+    def disconnected_at(self, run_id: str) -> Optional[float]:
+        """``time.monotonic()`` of the client's disconnect, if it went away."""
+        return self._disconnected.get(run_id)
+
+
+def build_cancellation_backend(name: Optional[str] = None) -> CancellationBackend:
+    name = (name or os.getenv("CANCELLATION_BACKEND", BACKEND_DATABASE)).lower()
+    if name == BACKEND_LOCAL:
+        return LocalCancellationBackend()
+    if name != BACKEND_DATABASE:
+        logging_utility.warning(
+            "Unknown CANCELLATION_BACKEND '%s', falling back to database.", name
+        )
+    interval = float(os.getenv("CANCELLATION_POLL_INTERVAL_MS", "50")) / 1000
+    return DatabaseCancellationBackend(interval=interval)
+
+
+_registry: Optional[CancellationRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_cancellation_registry() -> CancellationRegistry:
+    """Returns the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CancellationRegistry(build_cancellation_backend())
+    return _registry
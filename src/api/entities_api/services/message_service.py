@@ -1,17 +1,27 @@
 import json
+import re
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from fastapi import HTTPException
 from projectdavid_common import UtilsInterface, ValidationInterface
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from entities_api.models.models import Message, Thread
+from entities_api.models.models import (Message, MessageReasoning,
+                                        MessageTokenCount, Thread)
+from entities_api.services.action_waiter import get_action_waiter
 from entities_api.services.logging_service import LoggingUtility
+from entities_api.services.tokenizer_registry import (get_tokenizer_registry,
+                                                      persisted_tokenizers)
+from entities_api.services.truncation_strategies import PIN_KEY
 
 validator = ValidationInterface()
 logging_utility = LoggingUtility()
 
+# Reasoning stored inline by earlier releases, ahead of the reply.
+_LEADING_REASONING = re.compile(r"^\s*(?:<think>.*?</think>\s*)+", re.DOTALL)
+
 
 class MessageService:
     def __init__(self, db: Session):
@@ -23,6 +33,35 @@ class MessageService:
             f"Initialized MessageService with database session. Source: {__file__}"
         )
 
+    def _add_token_counts(self, db_message: Message) -> None:
+        """
+        Stores the message's token count for each persisted tokenizer that
+        this process has already loaded, in the same transaction as the
+        message. Counts are taken on the stripped content, as context
+        assembly sees it. Tokenizers are never loaded here (a first load
+        may download from the Hub); missing counts are computed when the
+        context is truncated.
+        """
+        content = (db_message.content or "").strip()
+        registry = get_tokenizer_registry()
+        for tokenizer in persisted_tokenizers():
+            if not registry.is_loaded(tokenizer):
+                continue
+            try:
+                token_count = registry.count(tokenizer, content)
+            except Exception as e:
+                logging_utility.warning(
+                    f"Could not count tokens with {tokenizer}: {e}. Source: {__file__}"
+                )
+                continue
+            self.db.add(
+                MessageTokenCount(
+                    message_id=db_message.id,
+                    tokenizer=tokenizer,
+                    token_count=token_count,
+                )
+            )
+
     def create_message(self, message: validator.MessageCreate) -> validator.MessageRead:
         """
         Create a new message in the database.
@@ -60,6 +99,7 @@ class MessageService:
 
         try:
             self.db.add(db_message)
+            self._add_token_counts(db_message)
             self.db.commit()
             self.db.refresh(db_message)
             logging_utility.info(
@@ -181,10 +221,12 @@ class MessageService:
         assistant_id: str,
         sender_id: str,
         is_last_chunk: bool = False,
+        reasoning: Optional[str] = None,
     ) -> ValidationInterface.MessageRead:
         """
         Save a message chunk from the assistant, with support for streaming and dynamic roles.
-        Returns the saved message as a Pydantic object.
+        Returns the saved message as a Pydantic object. ``reasoning`` (given
+        with the last chunk) is stored beside the message, not in its content.
         """
         logging_utility.info(
             f"Saving assistant message chunk for thread_id={thread_id}, sender_id={sender_id}, assistant_id={assistant_id}, role={role}, is_last_chunk={is_last_chunk}."
@@ -229,6 +271,15 @@ class MessageService:
 
         try:
             self.db.add(db_message)
+            self._add_token_counts(db_message)
+            if reasoning:
+                self.db.add(
+                    MessageReasoning(
+                        message_id=db_message.id,
+                        content=reasoning,
+                        created_at=db_message.created_at,
+                    )
+                )
             self.db.commit()
             self.db.refresh(db_message)  # Refresh to get the updated object
             logging_utility.info(f"Message saved successfully: id={db_message.id}.")
@@ -280,25 +331,115 @@ class MessageService:
             {"role": "system", "content": "Be as kind, intelligent, and helpful"}
         ]
 
-        for db_message in db_messages:
-            if db_message.role == "tool" and db_message.tool_id:
-                formatted_messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": db_message.tool_id,
-                        "content": db_message.content,
-                    }
-                )
-            else:
-                formatted_messages.append(
-                    {"role": db_message.role, "content": db_message.content}
-                )
+        formatted_messages.extend(
+            self._format_message(db_message) for db_message in db_messages
+        )
 
         logging_utility.info(
             f"Retrieved {len(formatted_messages)} formatted messages for thread_id={thread_id}. Source: {__file__}"
         )
         return formatted_messages
 
+    @staticmethod
+    def _format_message(db_message: Message) -> Dict[str, Any]:
+        if db_message.role == "tool" and db_message.tool_id:
+            return {
+                "role": "tool",
+                "tool_call_id": db_message.tool_id,
+                "content": db_message.content,
+            }
+        content = db_message.content or ""
+        if db_message.role == "assistant" and content.lstrip().startswith("<think>"):
+            # Older replies carry their reasoning inline; keep it out of
+            # the context like the reasoning stored separately.
+            content = _LEADING_REASONING.sub("", content, count=1)
+        formatted = {"role": db_message.role, "content": content}
+        if MessageService._is_pinned(db_message):
+            formatted[PIN_KEY] = True
+        return formatted
+
+    @staticmethod
+    def _is_pinned(db_message: Message) -> bool:
+        """True if the message was created with ``{"pinned": true}`` meta data."""
+        try:
+            meta_data = json.loads(db_message.meta_data or "{}")
+        except (TypeError, ValueError):
+            return False
+        return isinstance(meta_data, dict) and bool(meta_data.get(PIN_KEY))
+
+    def retrieve_reasoning(self, message_id: str) -> Dict[str, Any]:
+        """
+        The reasoning trace stored for a message (None when there is none).
+        """
+        db_message = self.db.query(Message).filter(Message.id == message_id).first()
+        if not db_message:
+            raise HTTPException(status_code=404, detail="Message not found")
+
+        db_reasoning = (
+            self.db.query(MessageReasoning)
+            .filter(MessageReasoning.message_id == message_id)
+            .first()
+        )
+        return {
+            "message_id": message_id,
+            "reasoning": db_reasoning.content if db_reasoning else None,
+        }
+
+    def list_formatted_messages_since(
+        self,
+        thread_id: str,
+        after_created_at: Optional[int] = None,
+        exclude_ids: Iterable[str] = (),
+        tokenizer: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Formatted messages created at or after ``after_created_at`` (all of
+        them when None), minus ``exclude_ids``, together with the thread's
+        total message count. Each message also carries its ``id`` and
+        ``created_at`` so callers can resume from the last one seen, and,
+        with ``tokenizer``, its stored ``token_count`` (None if missing).
+
+        Used by the per-thread context cache to fetch only the new tail.
+        """
+        if tokenizer is None:
+            query = self.db.query(Message)
+        else:
+            query = self.db.query(Message, MessageTokenCount.token_count).outerjoin(
+                MessageTokenCount,
+                (MessageTokenCount.message_id == Message.id)
+                & (MessageTokenCount.tokenizer == tokenizer),
+            )
+        query = query.filter(Message.thread_id == thread_id)
+        if after_created_at is None:
+            db_thread = self.db.query(Thread).filter(Thread.id == thread_id).first()
+            if not db_thread:
+                raise HTTPException(status_code=404, detail="Thread not found")
+        else:
+            query = query.filter(Message.created_at >= after_created_at)
+
+        exclude_ids = set(exclude_ids)
+        messages = []
+        rows = query.order_by(Message.created_at.asc()).all()
+        if tokenizer is None:
+            rows = [(db_message, None) for db_message in rows]
+
+        for db_message, token_count in rows:
+            if db_message.id in exclude_ids:
+                continue
+            formatted = self._format_message(db_message)
+            formatted["id"] = db_message.id
+            formatted["created_at"] = db_message.created_at
+            if tokenizer is not None:
+                formatted["token_count"] = token_count
+            messages.append(formatted)
+
+        total = (
+            self.db.query(func.count(Message.id))
+            .filter(Message.thread_id == thread_id)
+            .scalar()
+        )
+        return messages, total
+
     def submit_tool_output(
         self, message: validator.MessageCreate
     ) -> ValidationInterface.MessageRead:
@@ -339,6 +480,7 @@ class MessageService:
 
         try:
             self.db.add(db_message)
+            self._add_token_counts(db_message)
             self.db.commit()
             self.db.refresh(db_message)
             logging_utility.info(
@@ -351,6 +493,9 @@ class MessageService:
             )
             raise HTTPException(status_code=500, detail="Failed to create message")
 
+        # A run blocked on this tool call resumes with the output in hand.
+        get_action_waiter().notify_tool_output(db_message.tool_id, db_message.content)
+
         return ValidationInterface.MessageRead(
             id=db_message.id,
             assistant_id=db_message.assistant_id,
@@ -0,0 +1,481 @@
+"""
+Durable run queue and chunk log for background run workers.
+
+With RUN_EXECUTION=queue, ``POST /runs`` enqueues the new run instead of
+waiting for a client to drive it through ``/completions``. Worker processes
+(see entities_api.workers.run_worker) claim queued runs, execute the
+handler's ``process_conversation`` and append the resulting SSE frames to a
+per-run chunk log, which ``GET /v1/runs/{run_id}/stream`` follows. Runs
+therefore survive API restarts and proxy timeouts, and generation capacity
+scales with the number of workers rather than API processes.
+
+A claimed run is leased: its worker heartbeats every few seconds, and a run
+whose lease (RUN_WORKER_LEASE_SECONDS) runs out - the worker died or was
+restarted - is queued again, up to RUN_QUEUE_MAX_ATTEMPTS claims. Only runs
+whose lost attempt wrote nothing to the chunk log are retried: once output
+was streamed, the attempt may also have stored messages and actions, and a
+rerun from scratch would duplicate them, so such runs are failed instead.
+
+Backends (RUN_QUEUE_BACKEND=database|local):
+
+* database - the ``run_queue`` and ``run_chunks`` tables; claims use
+  ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of workers can
+  poll the same queue;
+* local    - an in-memory stand-in for single-process development. The API
+  process runs the workers itself and nothing survives a restart.
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+EXECUTION_INLINE = "inline"
+EXECUTION_QUEUE = "queue"
+
+BACKEND_DATABASE = "database"
+BACKEND_LOCAL = "local"
+
+QUEUED = "queued"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+TERMINAL_STATES = (DONE, FAILED)
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+Frame = Tuple[int, str]
+
+
+class QueuedRun:
+    """A run claimed by a worker; ``attempts`` counts this claim."""
+
+    __slots__ = ("run_id", "attempts")
+
+    def __init__(self, run_id: str, attempts: int):
+        self.run_id = run_id
+        self.attempts = attempts
+
+
+class RunQueue(ABC):
+    """Queue of runs for background workers, plus their chunk logs."""
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def enqueue(self, run_id: str) -> None: ...
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[QueuedRun]:
+        """Leases the oldest queued run to ``worker_id``; None if idle."""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, run_ids: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def finish(self, run_id: str, error: Optional[str] = None) -> None: ...
+
+    @abstractmethod
+    def requeue_expired(self, lease: float) -> List[str]:
+        """
+        Queues again the claimed runs whose last heartbeat is older than
+        ``lease`` seconds. Runs out of attempts, and runs that already have
+        frames in their chunk log, are failed instead.
+        """
+
+    @abstractmethod
+    def state(self, run_id: str) -> Optional[str]:
+        """The run's queue state, or None if it was never queued."""
+
+    @abstractmethod
+    def append_frames(self, run_id: str, frames: List[Frame]) -> None: ...
+
+    @abstractmethod
+    def frames_after(self, run_id: str, after: int, limit: int = 500) -> List[Frame]:
+        ...
+
+    @abstractmethod
+    def last_seq(self, run_id: str) -> int: ...
+
+    @abstractmethod
+    def prune(self, older_than: float) -> int:
+        """Drops the chunk logs of runs finished more than ``older_than`` s ago."""
+
+
+class DatabaseRunQueue(RunQueue):
+    """The ``run_queue`` and ``run_chunks`` tables."""
+
+    def __init__(self, session_factory=None, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        super().__init__(max_attempts)
+        self._session_factory = session_factory
+
+    def _session(self):
+        if self._session_factory is None:
+            from entities_api.db.database import SessionLocal
+
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def enqueue(self, run_id: str) -> None:
+        from entities_api.models.models import RunQueueItem
+
+        db = self._session()
+        try:
+            db.merge(
+                RunQueueItem(
+                    run_id=run_id,
+                    state=QUEUED,
+                    attempts=0,
+                    enqueued_at=int(time.time()),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def claim(self, worker_id: str) -> Optional[QueuedRun]:
+        from entities_api.models.models import RunQueueItem
+
+        db = self._session()
+        try:
+            item = (
+                db.query(RunQueueItem)
+                .filter(RunQueueItem.state == QUEUED)
+                .order_by(RunQueueItem.enqueued_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if item is None:
+                db.rollback()
+                return None
+            now = int(time.time())
+            item.state = CLAIMED
+            item.worker_id = worker_id
+            item.attempts += 1
+            item.claimed_at = now
+            item.heartbeat_at = now
+            db.commit()
+            return QueuedRun(item.run_id, item.attempts)
+        finally:
+            db.close()
+
+    def heartbeat(self, worker_id: str, run_ids: Iterable[str]) -> None:
+        from entities_api.models.models import RunQueueItem
+
+        run_ids = list(run_ids)
+        if not run_ids:
+            return
+        db = self._session()
+        try:
+            db.query(RunQueueItem).filter(
+                RunQueueItem.run_id.in_(run_ids),
+                RunQueueItem.worker_id == worker_id,
+                RunQueueItem.state == CLAIMED,
+            ).update(
+                {RunQueueItem.heartbeat_at: int(time.time())},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def finish(self, run_id: str, error: Optional[str] = None) -> None:
+        from entities_api.models.models import RunQueueItem
+
+        db = self._session()
+        try:
+            db.query(RunQueueItem).filter(RunQueueItem.run_id == run_id).update(
+                {
+                    RunQueueItem.state: FAILED if error else DONE,
+                    RunQueueItem.finished_at: int(time.time()),
+                    RunQueueItem.last_error: error,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def requeue_expired(self, lease: float) -> List[str]:
+        from entities_api.models.models import RunChunk, RunQueueItem
+
+        cutoff = int(time.time() - lease)
+        db = self._session()
+        try:
+            expired = (
+                db.query(RunQueueItem)
+                .filter(
+                    RunQueueItem.state == CLAIMED,
+                    RunQueueItem.heartbeat_at < cutoff,
+                )
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            started = set()
+            if expired:
+                rows = (
+                    db.query(RunChunk.run_id)
+                    .filter(RunChunk.run_id.in_([item.run_id for item in expired]))
+                    .distinct()
+                )
+                started = {run_id for (run_id,) in rows}
+            for item in expired:
+                if item.run_id in started:
+                    item.state = FAILED
+                    item.finished_at = int(time.time())
+                    item.last_error = (
+                        f"Worker {item.worker_id} lost the run after it "
+                        "produced output; not retried"
+                    )
+                elif item.attempts >= self.max_attempts:
+                    item.state = FAILED
+                    item.finished_at = int(time.time())
+                    item.last_error = (
+                        f"Worker {item.worker_id} lost the run "
+                        f"after {item.attempts} attempts"
+                    )
+                else:
+                    item.state = QUEUED
+                    item.worker_id = None
+            db.commit()
+            return [item.run_id for item in expired]
+        finally:
+            db.close()
+
+    def state(self, run_id: str) -> Optional[str]:
+        from entities_api.models.models import RunQueueItem
+
+        db = self._session()
+        try:
+            row = (
+                db.query(RunQueueItem.state)
+                .filter(RunQueueItem.run_id == run_id)
+                .first()
+            )
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    def append_frames(self, run_id: str, frames: List[Frame]) -> None:
+        from entities_api.models.models import RunChunk
+
+        if not frames:
+            return
+        now = int(time.time())
+        db = self._session()
+        try:
+            db.add_all(
+                RunChunk(run_id=run_id, seq=seq, frame=frame, created_at=now)
+                for seq, frame in frames
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def frames_after(self, run_id: str, after: int, limit: int = 500) -> List[Frame]:
+        from entities_api.models.models import RunChunk
+
+        db = self._session()
+        try:
+            rows = (
+                db.query(RunChunk.seq, RunChunk.frame)
+                .filter(RunChunk.run_id == run_id, RunChunk.seq > after)
+                .order_by(RunChunk.seq)
+                .limit(limit)
+                .all()
+            )
+            return [(seq, frame) for seq, frame in rows]
+        finally:
+            db.close()
+
+    def last_seq(self, run_id: str) -> int:
+        from sqlalchemy import func
+
+        from entities_api.models.models import RunChunk
+
+        db = self._session()
+        try:
+            value = (
+                db.query(func.max(RunChunk.seq))
+                .filter(RunChunk.run_id == run_id)
+                .scalar()
+            )
+            return value or 0
+        finally:
+            db.close()
+
+    def prune(self, older_than: float) -> int:
+        from entities_api.models.models import RunChunk, RunQueueItem
+
+        cutoff = int(time.time() - older_than)
+        db = self._session()
+        try:
+            finished = [
+                run_id
+                for (run_id,) in db.query(RunQueueItem.run_id).filter(
+                    RunQueueItem.state.in_(TERMINAL_STATES),
+                    RunQueueItem.finished_at < cutoff,
+                )
+            ]
+            if not finished:
+                return 0
+            db.query(RunChunk).filter(RunChunk.run_id.in_(finished)).delete(
+                synchronize_session=False
+            )
+            db.query(RunQueueItem).filter(
+                RunQueueItem.run_id.in_(finished)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return len(finished)
+        finally:
+            db.close()
+
+
+class _LocalItem:
+    __slots__ = ("state", "attempts", "worker_id", "heartbeat_at", "finished_at")
+
+    def __init__(self):
+        self.state = QUEUED
+        self.attempts = 0
+        self.worker_id: Optional[str] = None
+        self.heartbeat_at = 0.0
+        self.finished_at: Optional[float] = None
+
+
+class LocalRunQueue(RunQueue):
+    """In-memory stand-in for single-process development."""
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        super().__init__(max_attempts)
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, _LocalItem]" = OrderedDict()
+        self._queued: Deque[str] = deque()
+        self._frames: Dict[str, List[Frame]] = {}
+
+    def enqueue(self, run_id: str) -> None:
+        with self._lock:
+            self._items[run_id] = _LocalItem()
+            self._queued.append(run_id)
+
+    def claim(self, worker_id: str) -> Optional[QueuedRun]:
+        with self._lock:
+            while self._queued:
+                run_id = self._queued.popleft()
+                item = self._items.get(run_id)
+                if item is None or item.state != QUEUED:
+                    continue
+                item.state = CLAIMED
+                item.worker_id = worker_id
+                item.attempts += 1
+                item.heartbeat_at = time.time()
+                return QueuedRun(run_id, item.attempts)
+        return None
+
+    def heartbeat(self, worker_id: str, run_ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            for run_id in run_ids:
+                item = self._items.get(run_id)
+                if item is not None and item.worker_id == worker_id:
+                    item.heartbeat_at = now
+
+    def finish(self, run_id: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            item = self._items.get(run_id)
+            if item is not None:
+                item.state = FAILED if error else DONE
+                item.finished_at = time.time()
+
+    def requeue_expired(self, lease: float) -> List[str]:
+        cutoff = time.time() - lease
+        expired = []
+        with self._lock:
+            for run_id, item in self._items.items():
+                if item.state != CLAIMED or item.heartbeat_at >= cutoff:
+                    continue
+                expired.append(run_id)
+                if self._frames.get(run_id) or item.attempts >= self.max_attempts:
+                    item.state = FAILED
+                    item.finished_at = time.time()
+                else:
+                    item.state = QUEUED
+                    item.worker_id = None
+                    self._queued.append(run_id)
+        return expired
+
+    def state(self, run_id: str) -> Optional[str]:
+        item = self._items.get(run_id)
+        return item.state if item is not None else None
+
+    def append_frames(self, run_id: str, frames: List[Frame]) -> None:
+        with self._lock:
+            self._frames.setdefault(run_id, []).extend(frames)
+
+    def frames_after(self, run_id: str, after: int, limit: int = 500) -> List[Frame]:
+        with self._lock:
+            frames = self._frames.get(run_id, [])
+            return [frame for frame in frames if frame[0] > after][:limit]
+
+    def last_seq(self, run_id: str) -> int:
+        with self._lock:
+            frames = self._frames.get(run_id)
+            return frames[-1][0] if frames else 0
+
+    def prune(self, older_than: float) -> int:
+        cutoff = time.time() - older_than
+        with self._lock:
+            finished = [
+                run_id
+                for run_id, item in self._items.items()
+                if item.finished_at is not None and item.finished_at < cutoff
+            ]
+            for run_id in finished:
+                del self._items[run_id]
+                self._frames.pop(run_id, None)
+        return len(finished)
+
+
+def queued_execution() -> bool:
+    """Whether ``POST /runs`` hands runs to background workers."""
+    mode = os.getenv("RUN_EXECUTION", EXECUTION_INLINE).strip().lower()
+    if mode not in (EXECUTION_INLINE, EXECUTION_QUEUE):
+        logging_utility.warning(
+            "Unknown RUN_EXECUTION '%s', falling back to '%s'.",
+            mode,
+            EXECUTION_INLINE,
+        )
+        return False
+    return mode == EXECUTION_QUEUE
+
+
+def build_run_queue(name: Optional[str] = None) -> RunQueue:
+    name = (name or os.getenv("RUN_QUEUE_BACKEND", BACKEND_DATABASE)).lower()
+    max_attempts = int(os.getenv("RUN_QUEUE_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+    if name == BACKEND_LOCAL:
+        return LocalRunQueue(max_attempts=max_attempts)
+    if name != BACKEND_DATABASE:
+        logging_utility.warning(
+            "Unknown RUN_QUEUE_BACKEND '%s', falling back to database.", name
+        )
+    return DatabaseRunQueue(max_attempts=max_attempts)
+
+
+_queue: Optional[RunQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_run_queue() -> RunQueue:
+    """Returns the process-wide run queue, creating it on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = build_run_queue()
+    return _queue
@@ -8,6 +8,10 @@ from pydantic import parse_obj_as
 from sqlalchemy.orm import Session
 
 from entities_api.models.models import Run, StatusEnum
+from entities_api.services.action_waiter import get_action_waiter
+from entities_api.services.cancellation_registry import (
+    CANCELLED_STATUSES, get_cancellation_registry)
+from entities_api.services.run_queue import get_run_queue, queued_execution
 
 validator = ValidationInterface()
 
@@ -52,6 +56,9 @@ class RunService:
         self.db.add(run)
         self.db.commit()
         self.db.refresh(run)
+
+        if queued_execution():
+            get_run_queue().enqueue(run.id)
         return run
 
     def update_run_status(self, run_id: str, new_status: str):
@@ -67,6 +74,30 @@ class RunService:
 
         self.db.commit()
         self.db.refresh(run)
+
+        if getattr(run.status, "value", run.status) in CANCELLED_STATUSES:
+            get_cancellation_registry().cancel(run_id)
+        get_action_waiter().notify_run(run_id, run.status)
+        return run
+
+    def update_run_usage(self, run_id: str, stream_usage: dict):
+        """
+        Appends one provider stream's timing breakdown to ``Run.usage`` and
+        adds its completion tokens to the run's total.
+        """
+        run = self.db.query(Run).filter(Run.id == run_id).first()
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+
+        usage = dict(run.usage or {})
+        usage["streams"] = list(usage.get("streams") or []) + [stream_usage]
+        usage["completion_tokens"] = (usage.get("completion_tokens") or 0) + (
+            stream_usage.get("completion_tokens") or 0
+        )
+        # A new dict, so SQLAlchemy sees the JSON column change.
+        run.usage = usage
+        self.db.commit()
+        self.db.refresh(run)
         return run
 
     def get_run(self, run_id):
@@ -148,6 +179,11 @@ class RunService:
             self.db.refresh(run)
             self.logger.info("Run ID %s successfully cancelled", run_id)
 
+            # Streams in this process stop on their next delta; other
+            # processes learn about it through the registry's backend.
+            get_cancellation_registry().cancel(run_id)
+            get_action_waiter().notify_run(run_id, run.status)
+
             return run
 
         except Exception as e:
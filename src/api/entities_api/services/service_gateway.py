@@ -0,0 +1,317 @@
+"""
+Gateway to the platform services used by the inference layer.
+
+Inference handlers run inside the API process, so by default they call the
+Message/Run/Action/Assistant/Tool services directly on a pooled database
+session instead of looping back through our own HTTP API with the
+projectdavid SDK. The SDK-backed gateway is kept as a fallback for
+deployments where inference runs in a separate process from the database.
+
+Select the implementation with SERVICE_GATEWAY_MODE=inprocess|http.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from projectdavid_common import ValidationInterface
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+validator = ValidationInterface()
+
+GATEWAY_MODE_IN_PROCESS = "inprocess"
+GATEWAY_MODE_HTTP = "http"
+
+
+class _InProcessFacade:
+    """Base for facades that open one short-lived pooled session per call."""
+
+    def __init__(self, session_factory: Callable[[], Any]):
+        self._session_factory = session_factory
+
+    @contextmanager
+    def _session(self):
+        db = self._session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+class InProcessMessages(_InProcessFacade):
+    """Mirrors the subset of MessagesClient used by inference."""
+
+    def create_message(
+        self,
+        thread_id: str,
+        content: str,
+        assistant_id: str,
+        role: str = "user",
+        meta_data: Optional[Dict[str, Any]] = None,
+        sender_id: Optional[str] = None,
+    ) -> validator.MessageRead:
+        from entities_api.services.message_service import MessageService
+
+        message = validator.MessageCreate(
+            thread_id=thread_id,
+            content=content,
+            assistant_id=assistant_id,
+            role=role,
+            meta_data=meta_data or {},
+            sender_id=sender_id,
+        )
+        with self._session() as db:
+            return MessageService(db).create_message(message)
+
+    def submit_tool_output(
+        self,
+        thread_id: str,
+        content: str,
+        assistant_id: str,
+        tool_id: str,
+        role: str = "tool",
+        sender_id: Optional[str] = None,
+    ) -> validator.MessageRead:
+        from entities_api.services.message_service import MessageService
+
+        message = validator.MessageCreate(
+            thread_id=thread_id,
+            content=content,
+            assistant_id=assistant_id,
+            role=role,
+            tool_id=tool_id,
+            meta_data={},
+            sender_id=sender_id,
+        )
+        with self._session() as db:
+            return MessageService(db).submit_tool_output(message)
+
+    def save_assistant_message_chunk(
+        self,
+        thread_id: str,
+        content: str,
+        role: str,
+        assistant_id: str,
+        sender_id: str,
+        is_last_chunk: bool = False,
+        reasoning: Optional[str] = None,
+    ) -> Optional[validator.MessageRead]:
+        from entities_api.services.message_service import MessageService
+
+        with self._session() as db:
+            return MessageService(db).save_assistant_message_chunk(
+                thread_id=thread_id,
+                content=content,
+                role=role,
+                assistant_id=assistant_id,
+                sender_id=sender_id,
+                is_last_chunk=is_last_chunk,
+                reasoning=reasoning,
+            )
+
+    def retrieve_message(self, message_id: str) -> validator.MessageRead:
+        from entities_api.services.message_service import MessageService
+
+        with self._session() as db:
+            return MessageService(db).retrieve_message(message_id)
+
+    def get_formatted_messages(
+        self, thread_id: str, system_message: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the formatted thread history. When a system_message is given
+        it replaces the service's default system message, matching the SDK.
+        """
+        from entities_api.services.message_service import MessageService
+
+        with self._session() as db:
+            formatted_messages = MessageService(db).list_messages_for_thread(thread_id)
+
+        if system_message is not None:
+            system_entry = {"role": "system", "content": system_message}
+            if formatted_messages and formatted_messages[0].get("role") == "system":
+                formatted_messages[0] = system_entry
+            else:
+                formatted_messages.insert(0, system_entry)
+        return formatted_messages
+
+    def get_formatted_messages_since(
+        self,
+        thread_id: str,
+        after_created_at: Optional[int] = None,
+        exclude_ids: Iterable[str] = (),
+        tokenizer: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """The new tail of a thread plus its message count (no SDK twin)."""
+        from entities_api.services.message_service import MessageService
+
+        with self._session() as db:
+            return MessageService(db).list_formatted_messages_since(
+                thread_id,
+                after_created_at=after_created_at,
+                exclude_ids=exclude_ids,
+                tokenizer=tokenizer,
+            )
+
+
+class InProcessRuns(_InProcessFacade):
+    """Mirrors the subset of RunsClient used by inference."""
+
+    def update_run_status(self, run_id: str, new_status: Any):
+        from entities_api.services.runs import RunService
+
+        status = getattr(new_status, "value", new_status)
+        with self._session() as db:
+            return RunService(db).update_run_status(run_id, status)
+
+    def update_run_usage(self, run_id: str, stream_usage: Dict[str, Any]):
+        from entities_api.services.runs import RunService
+
+        with self._session() as db:
+            return RunService(db).update_run_usage(run_id, stream_usage)
+
+    def retrieve_run(self, run_id: str):
+        from entities_api.services.runs import RunService
+
+        with self._session() as db:
+            return RunService(db).get_run(run_id)
+
+
+class InProcessActions(_InProcessFacade):
+    """Mirrors the subset of ActionsClient used by inference."""
+
+    def create_action(
+        self,
+        tool_name: str,
+        run_id: str,
+        function_args: Optional[Dict[str, Any]] = None,
+        expires_at: Optional[Any] = None,
+        status: str = "pending",
+    ) -> validator.ActionRead:
+        from entities_api.services.actions_service import ActionService
+
+        action_data = validator.ActionCreate(
+            tool_name=tool_name,
+            run_id=run_id,
+            function_args=function_args or {},
+            expires_at=expires_at,
+            status=status,
+        )
+        with self._session() as db:
+            return ActionService(db).create_action(action_data)
+
+    def update_action(
+        self, action_id: str, status: str, result: Optional[Dict[str, Any]] = None
+    ) -> validator.ActionRead:
+        from entities_api.services.actions_service import ActionService
+
+        action_update = validator.ActionUpdate(status=status, result=result)
+        with self._session() as db:
+            return ActionService(db).update_action_status(action_id, action_update)
+
+    def get_action(self, action_id: str) -> validator.ActionRead:
+        from entities_api.services.actions_service import ActionService
+
+        with self._session() as db:
+            return ActionService(db).get_action(action_id)
+
+
+class InProcessAssistants(_InProcessFacade):
+    """Mirrors the subset of AssistantsClient used by inference."""
+
+    def retrieve_assistant(self, assistant_id: str) -> validator.AssistantRead:
+        from entities_api.services.assistants_service import AssistantService
+
+        with self._session() as db:
+            return AssistantService(db).retrieve_assistant(assistant_id)
+
+
+class InProcessTools(_InProcessFacade):
+    """Mirrors the subset of ToolsClient used by inference."""
+
+    def list_tools(
+        self, assistant_id: Optional[str] = None, restructure: bool = False
+    ) -> List[dict]:
+        from entities_api.services.tools import ToolService
+
+        with self._session() as db:
+            return ToolService(db).list_tools(
+                assistant_id=assistant_id, restructure=restructure
+            )
+
+
+class InProcessServiceGateway:
+    """
+    Calls the platform services directly on sessions drawn from the shared
+    SQLAlchemy connection pool.
+    """
+
+    mode = GATEWAY_MODE_IN_PROCESS
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None):
+        if session_factory is None:
+            from entities_api.db.database import SessionLocal
+
+            session_factory = SessionLocal
+
+        self.messages = InProcessMessages(session_factory)
+        self.runs = InProcessRuns(session_factory)
+        self.actions = InProcessActions(session_factory)
+        self.assistants = InProcessAssistants(session_factory)
+        self.tools = InProcessTools(session_factory)
+
+
+class HttpServiceGateway:
+    """
+    Fallback that reaches the same services over HTTP with the projectdavid
+    SDK clients. Exposes the same attribute names as the in-process gateway.
+    """
+
+    mode = GATEWAY_MODE_HTTP
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        from projectdavid.clients.actions_client import ActionsClient
+        from projectdavid.clients.assistants_client import AssistantsClient
+        from projectdavid.clients.messages_client import MessagesClient
+        from projectdavid.clients.runs import RunsClient
+        from projectdavid.clients.tools_client import ToolsClient
+
+        base_url = base_url or os.getenv("BASE_URL")
+        api_key = api_key or os.getenv("ADMIN_API_KEY")
+
+        self.messages = MessagesClient(base_url, api_key)
+        self.runs = RunsClient(base_url, api_key)
+        self.actions = ActionsClient(base_url, api_key)
+        self.assistants = AssistantsClient(base_url, api_key)
+        self.tools = ToolsClient(base_url, api_key)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def build_service_gateway(mode: Optional[str] = None):
+    """Creates a gateway for the requested (or configured) mode."""
+    mode = (mode or os.getenv("SERVICE_GATEWAY_MODE", GATEWAY_MODE_IN_PROCESS)).lower()
+    if mode == GATEWAY_MODE_HTTP:
+        logging_utility.info("Using HTTP service gateway for inference.")
+        return HttpServiceGateway()
+    if mode != GATEWAY_MODE_IN_PROCESS:
+        logging_utility.warning(
+            "Unknown SERVICE_GATEWAY_MODE '%s', falling back to in-process.", mode
+        )
+    logging_utility.info("Using in-process service gateway for inference.")
+    return InProcessServiceGateway()
+
+
+def get_service_gateway():
+    """Returns the process-wide service gateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = build_service_gateway()
+    return _gateway
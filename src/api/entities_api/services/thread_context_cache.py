@@ -0,0 +1,197 @@
+"""
+Per-thread cache of the conversation history used to build context windows.
+
+``_set_up_context_window`` used to pull the whole thread on every turn,
+re-normalise every message and re-tokenise all of them for truncation, so
+the cost of a turn grew with the length of the thread.
+
+The cache keeps, per thread, the normalised messages seen so far and their
+token counts per tokenizer. Counts stored with the messages (see
+MessageTokenCount) are used as loaded; only messages without a stored count
+are tokenised, in one batch. Each refresh asks only for messages created at
+or after the newest cached one, and checks the thread's total message
+count. A count that does not add up (messages deleted, or inserted out of
+order by another process) triggers a full reload. Local deletes call
+``invalidate(thread_id)``.
+
+The number of cached threads is bounded by THREAD_CONTEXT_CACHE_SIZE (LRU).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Set,
+                    Tuple)
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+DEFAULT_CACHE_SIZE = 1024
+
+# loader(after_created_at, exclude_ids) -> (messages, total_message_count).
+# Messages carry "id" and "created_at" next to the formatted fields, and may
+# carry a stored "token_count" for the tokenizer the history is built for.
+Loader = Callable[[Optional[int], Iterable[str]], Tuple[List[Dict[str, Any]], int]]
+Normalizer = Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+
+class _ThreadContext:
+    __slots__ = ("lock", "messages", "last_created_at", "last_ids", "token_counts")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages: Optional[List[Dict[str, Any]]] = None
+        self.last_created_at: Optional[int] = None
+        # Ids sharing the newest created_at; the tail query is inclusive.
+        self.last_ids: Set[str] = set()
+        # Per tokenizer; None marks a message not counted yet.
+        self.token_counts: Dict[str, List[Optional[int]]] = {}
+
+    def reset(self) -> None:
+        self.messages = []
+        self.last_created_at = None
+        self.last_ids = set()
+        self.token_counts = {}
+
+    def append(
+        self,
+        rows: List[Dict[str, Any]],
+        normalize: Normalizer,
+        tokenizer_key: Optional[str],
+    ) -> None:
+        stored = []
+        for row in rows:
+            created_at = row.pop("created_at")
+            message_id = row.pop("id")
+            stored.append(row.pop("token_count", None))
+            if self.last_created_at is None or created_at > self.last_created_at:
+                self.last_created_at = created_at
+                self.last_ids = set()
+            if created_at == self.last_created_at:
+                self.last_ids.add(message_id)
+
+        if tokenizer_key is not None:
+            counts = self.token_counts.setdefault(tokenizer_key, [])
+            if len(counts) == len(self.messages):
+                counts.extend(stored)
+        self.messages.extend(normalize(rows))
+
+
+class ThreadContextCache:
+    """Bounded LRU of per-thread conversation histories."""
+
+    def __init__(self, max_threads: int = DEFAULT_CACHE_SIZE):
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._threads: "OrderedDict[str, _ThreadContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.appended = 0
+        self.tokenised = 0
+
+    def _entry(self, thread_id: str) -> _ThreadContext:
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                entry = self._threads[thread_id] = _ThreadContext()
+                while len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+            else:
+                self._threads.move_to_end(thread_id)
+            return entry
+
+    def _refresh(
+        self,
+        thread_id: str,
+        entry: _ThreadContext,
+        load: Loader,
+        normalize: Normalizer,
+        tokenizer_key: Optional[str],
+    ) -> None:
+        if entry.messages is not None:
+            rows, total = load(entry.last_created_at, entry.last_ids)
+            if len(entry.messages) + len(rows) == total:
+                entry.append(rows, normalize, tokenizer_key)
+                self.hits += 1
+                self.appended += len(rows)
+                return
+            logging_utility.debug(
+                "Context cache for thread %s is stale; reloading.", thread_id
+            )
+
+        self.misses += 1
+        entry.reset()
+        rows, _ = load(None, ())
+        entry.append(rows, normalize, tokenizer_key)
+
+    def history(
+        self,
+        thread_id: str,
+        load: Loader,
+        normalize: Normalizer,
+        count_tokens: Optional[Callable[[List[str]], List[int]]] = None,
+        tokenizer_key: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[List[int]]]:
+        """
+        Returns the thread's normalised messages (fresh copies the caller
+        may mutate) and, with ``count_tokens`` (a batch counter), their
+        token counts for ``tokenizer_key``. Only messages not seen before
+        are loaded and normalised, and only those without a stored count
+        are tokenised.
+        """
+        entry = self._entry(thread_id)
+        with entry.lock:
+            try:
+                self._refresh(thread_id, entry, load, normalize, tokenizer_key)
+            except Exception:
+                entry.messages = None
+                raise
+
+            counts = None
+            if count_tokens is not None:
+                counts = entry.token_counts.setdefault(tokenizer_key, [])
+                counts.extend([None] * (len(entry.messages) - len(counts)))
+                missing = [i for i, count in enumerate(counts) if count is None]
+                if missing:
+                    texts = [entry.messages[i].get("content", "") for i in missing]
+                    for i, count in zip(missing, count_tokens(texts)):
+                        counts[i] = count
+                    self.tokenised += len(missing)
+                counts = list(counts)
+
+            return [dict(message) for message in entry.messages], counts
+
+    def invalidate(self, thread_id: str) -> None:
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            threads = len(self._threads)
+        return {
+            "threads": threads,
+            "max_threads": self.max_threads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "appended_messages": self.appended,
+            "tokenised_messages": self.tokenised,
+        }
+
+
+_cache: Optional[ThreadContextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_thread_context_cache() -> ThreadContextCache:
+    """Returns the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ThreadContextCache(
+                    max_threads=int(
+                        os.getenv("THREAD_CONTEXT_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+                    )
+                )
+    return _cache
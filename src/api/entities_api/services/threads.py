@@ -5,9 +5,13 @@ from typing import Any, Dict, List
 from fastapi import HTTPException
 from projectdavid_common import UtilsInterface, ValidationInterface
 from projectdavid_common.utilities.logging_service import LoggingUtility
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from entities_api.models.models import Message, Thread, User
+from entities_api.models.models import (Message, MessageReasoning,
+                                        MessageTokenCount, Thread, User)
+from entities_api.services.thread_context_cache import \
+    get_thread_context_cache
 
 logging_utility = LoggingUtility()
 validator = ValidationInterface()
@@ -49,10 +53,18 @@ class ThreadService:
 
     def delete_thread(self, thread_id: str) -> bool:
         db_thread = self._get_thread_or_404(thread_id)
+        message_ids = select(Message.id).where(Message.thread_id == thread_id)
+        self.db.query(MessageTokenCount).filter(
+            MessageTokenCount.message_id.in_(message_ids)
+        ).delete(synchronize_session=False)
+        self.db.query(MessageReasoning).filter(
+            MessageReasoning.message_id.in_(message_ids)
+        ).delete(synchronize_session=False)
         self.db.query(Message).filter(Message.thread_id == thread_id).delete()
         db_thread.participants = []
         self.db.delete(db_thread)
         self.db.commit()
+        get_thread_context_cache().invalidate(thread_id)
 
         return True
 
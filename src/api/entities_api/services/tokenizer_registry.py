@@ -0,0 +1,130 @@
+"""
+Process-wide registry of Hugging Face tokenizers.
+
+Each tokenizer is loaded once per process and shared by truncation, the
+message write path (persisted token counts) and the utility helpers. The
+write path only counts with tokenizers that are already loaded, so a write
+never waits on a load or a download.
+Tokenizers are read from TOKENIZER_CACHE_DIR first, without touching the
+Hub; the API image pre-populates that directory at build time:
+
+    python -m entities_api.services.tokenizer_registry <model> [<model> ...]
+
+Set TOKENIZER_OFFLINE=1 to never download at runtime.
+"""
+
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+# Tokenizer used by BaseInference's truncator unless a handler overrides it.
+DEFAULT_TOKENIZER_MODEL = "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B"
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class TokenizerRegistry:
+    """Loads tokenizers once and counts tokens, singly or in batches."""
+
+    def __init__(self, cache_dir: Optional[str] = None, offline: bool = False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self._tokenizers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, model_name: str) -> Any:
+        """Returns the tokenizer for ``model_name``, loading it on first use."""
+        tokenizer = self._tokenizers.get(model_name)
+        if tokenizer is not None:
+            return tokenizer
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+        with load_lock:
+            tokenizer = self._tokenizers.get(model_name)
+            if tokenizer is None:
+                tokenizer = self._tokenizers[model_name] = self._load(model_name)
+        return tokenizer
+
+    def _load(self, model_name: str) -> Any:
+        from transformers import AutoTokenizer
+
+        try:
+            return AutoTokenizer.from_pretrained(
+                model_name, cache_dir=self.cache_dir, local_files_only=True
+            )
+        except OSError:
+            if self.offline:
+                raise
+        logging_utility.warning(
+            "Tokenizer %s is not in the local cache; downloading from the Hub.",
+            model_name,
+        )
+        return AutoTokenizer.from_pretrained(model_name, cache_dir=self.cache_dir)
+
+    def count(self, model_name: str, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        return len(self.get(model_name).encode(text, add_special_tokens=False))
+
+    def count_batch(self, model_name: str, texts: Sequence[Optional[str]]) -> List[int]:
+        """Counts many texts with one batched tokenizer call."""
+        counts = [0] * len(texts)
+        indexed = [(i, text) for i, text in enumerate(texts) if text]
+        if not indexed:
+            return counts
+        encoded = self.get(model_name)(
+            [text for _, text in indexed], add_special_tokens=False
+        )["input_ids"]
+        for (i, _), ids in zip(indexed, encoded):
+            counts[i] = len(ids)
+        return counts
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._tokenizers
+
+    @property
+    def loaded(self) -> List[str]:
+        return sorted(self._tokenizers)
+
+
+def persisted_tokenizers() -> List[str]:
+    """
+    Tokenizers whose counts are stored with the messages written while
+    they are loaded.
+    """
+    raw = os.getenv("TOKEN_COUNT_TOKENIZERS", DEFAULT_TOKENIZER_MODEL)
+    return [name.strip() for name in raw.split(",") if name.strip()]
+
+
+_registry: Optional[TokenizerRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_tokenizer_registry() -> TokenizerRegistry:
+    """Returns the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TokenizerRegistry(
+                    cache_dir=os.getenv("TOKENIZER_CACHE_DIR") or None,
+                    offline=_env_flag("TOKENIZER_OFFLINE"),
+                )
+    return _registry
+
+
+if __name__ == "__main__":
+    # Build-time download into TOKENIZER_CACHE_DIR.
+    registry = TokenizerRegistry(cache_dir=os.getenv("TOKENIZER_CACHE_DIR") or None)
+    for name in sys.argv[1:] or persisted_tokenizers():
+        registry.get(name)
+        print(f"Cached tokenizer {name}")
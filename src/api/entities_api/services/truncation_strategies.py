@@ -0,0 +1,198 @@
+"""
+Truncation strategies for the context window.
+
+A strategy decides which messages of a conversation survive when the total
+token count exceeds the budget. Every strategy splits the conversation into
+pinned messages (always kept) and candidates, then keeps the longest tail
+of candidates that fits into what the pinned messages leave over. The cut
+point is found with prefix sums and a binary search, so planning is one
+linear pass however many messages are dropped, and the kept indices come
+out already in conversation order.
+
+Strategies (TRUNCATION_STRATEGY):
+
+* ``sliding_window``   - system messages are pinned; oldest turns go first.
+* ``keep_first_n``     - also pins the first TRUNCATION_KEEP_FIRST_N turns
+                         (the task statement usually lives there).
+* ``tool_output_aware`` - never starts the kept tail with tool outputs whose
+                         calling assistant turn was cut.
+* ``pinned``           - also keeps messages flagged ``"pinned": True``.
+
+Messages are flagged from their meta data (``{"pinned": true}``) when the
+history is formatted; the flag is dropped again before the context goes to
+the provider (``strip_pins``).
+"""
+
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+Message = Dict[str, Any]
+
+PIN_KEY = "pinned"
+
+
+class TruncationStrategy(ABC):
+    """Chooses the messages to keep within a token budget."""
+
+    name = "base"
+
+    @abstractmethod
+    def is_pinned(self, index: int, message: Message, candidate_rank: int) -> bool:
+        """
+        True if the message must be kept. ``candidate_rank`` counts the
+        non-system messages before this one.
+        """
+
+    def adjust_cut(self, messages: Sequence[Message], candidates: List[int], cut: int):
+        """Hook to move the cut point (an index into ``candidates``) forward."""
+        return cut
+
+    def plan(
+        self,
+        messages: Sequence[Message],
+        token_counts: Sequence[int],
+        budget: float,
+    ) -> List[int]:
+        """Returns the indices of the messages to keep, in order."""
+        pinned: List[int] = []
+        candidates: List[int] = []
+        rank = 0
+        for index, message in enumerate(messages):
+            if message.get("role") != "system":
+                is_pinned = self.is_pinned(index, message, rank)
+                rank += 1
+            else:
+                is_pinned = True
+            (pinned if is_pinned else candidates).append(index)
+
+        pinned_tokens = sum(token_counts[i] for i in pinned)
+        remaining = budget - pinned_tokens
+
+        # prefix[k] = tokens of the first k candidates; keeping candidates
+        # [cut:] costs total - prefix[cut], so the cut is the first k with
+        # prefix[k] >= total - remaining.
+        prefix = [0, *accumulate(token_counts[i] for i in candidates)]
+        total = prefix[-1]
+        cut = bisect_left(prefix, total - remaining) if remaining < total else 0
+        cut = self.adjust_cut(messages, candidates, min(cut, len(candidates)))
+
+        kept = set(pinned)
+        kept.update(candidates[cut:])
+        return [index for index in range(len(messages)) if index in kept]
+
+
+class SlidingWindowStrategy(TruncationStrategy):
+    name = "sliding_window"
+
+    def is_pinned(self, index, message, candidate_rank):
+        return False
+
+
+class KeepFirstNStrategy(TruncationStrategy):
+    name = "keep_first_n"
+
+    def __init__(self, first_n: int = 1):
+        self.first_n = first_n
+
+    def is_pinned(self, index, message, candidate_rank):
+        return candidate_rank < self.first_n
+
+
+class ToolOutputAwareStrategy(SlidingWindowStrategy):
+    name = "tool_output_aware"
+
+    def adjust_cut(self, messages, candidates, cut):
+        # A tool output is meaningless without the turn that called it.
+        while cut < len(candidates):
+            if messages[candidates[cut]].get("role") != "tool":
+                break
+            cut += 1
+        return cut
+
+
+class PinnedMessageStrategy(TruncationStrategy):
+    name = "pinned"
+
+    def __init__(self, pin_key: str = PIN_KEY):
+        self.pin_key = pin_key
+
+    def is_pinned(self, index, message, candidate_rank):
+        return bool(message.get(self.pin_key))
+
+
+TRUNCATION_STRATEGIES = {
+    cls.name: cls
+    for cls in (
+        SlidingWindowStrategy,
+        KeepFirstNStrategy,
+        ToolOutputAwareStrategy,
+        PinnedMessageStrategy,
+    )
+}
+
+
+def build_truncation_strategy(name: Optional[str] = None) -> TruncationStrategy:
+    """Builds the named (or configured) strategy."""
+    name = (name or os.getenv("TRUNCATION_STRATEGY", "sliding_window")).lower()
+    strategy_class = TRUNCATION_STRATEGIES.get(name)
+    if strategy_class is None:
+        logging_utility.warning(
+            "Unknown TRUNCATION_STRATEGY '%s', falling back to sliding_window.", name
+        )
+        strategy_class = SlidingWindowStrategy
+    if strategy_class is KeepFirstNStrategy:
+        return KeepFirstNStrategy(int(os.getenv("TRUNCATION_KEEP_FIRST_N", "1")))
+    return strategy_class()
+
+
+def _join_run(run: List[Message]) -> Message:
+    if len(run) == 1:
+        return run[0]
+    content = "\n".join(f"{message.get('content', '')}" for message in run)
+    return {**run[0], "content": content}
+
+
+def merge_consecutive_messages(messages: Sequence[Message]) -> List[Message]:
+    """
+    Merges runs of same-role messages by joining their content with a
+    newline. Returns new dicts for merged runs; inputs are not modified.
+    """
+    merged: List[Message] = []
+    run: List[Message] = []
+    for message in messages:
+        if run and message.get("role") != run[0].get("role"):
+            merged.append(_join_run(run))
+            run = []
+        run.append(message)
+    if run:
+        merged.append(_join_run(run))
+    return merged
+
+
+def strip_pins(messages: Sequence[Message]) -> List[Message]:
+    """Drops the pin flag; flagged messages are copied, the rest kept as is."""
+    return [
+        {k: v for k, v in message.items() if k != PIN_KEY}
+        if PIN_KEY in message
+        else message
+        for message in messages
+    ]
+
+
+def apply_truncation(
+    messages: Sequence[Message],
+    token_counts: Sequence[int],
+    budget: float,
+    strategy: TruncationStrategy,
+) -> List[Message]:
+    """Keeps what ``strategy`` selects when over ``budget``, then merges roles."""
+    if sum(token_counts) > budget:
+        messages = [messages[i] for i in strategy.plan(messages, token_counts, budget)]
+    return merge_consecutive_messages(messages)
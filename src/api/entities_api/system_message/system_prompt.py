@@ -0,0 +1,204 @@
+"""
+Stable system prompt assembly.
+
+Providers that cache prompt prefixes (DeepSeek, Together, ...) bill cached
+input tokens at a discount and start streaming sooner, but only when a
+prompt starts with the exact bytes of an earlier one. The system message
+used to be ``"tools:" + str(tools) + instructions + <time to the second>``:
+the timestamp changed every second and the Python repr of the tools
+followed the database's ordering, so no two turns shared a prefix.
+
+The system message is now built in two parts:
+
+* a static prefix - the tools as canonical JSON (sorted by name, sorted
+  keys, no whitespace) followed by the assistant's instructions (the
+  ``assemble_instructions`` output stored on the assistant). It is compiled
+  once per assistant config version and carries a ``prefix_hash`` that is
+  logged with every turn, so prefix cache hit rates can be matched to
+  config changes;
+* a volatile suffix - today's date, at SYSTEM_PROMPT_CLOCK granularity
+  (``day`` by default, ``hour`` or ``minute``).
+
+Compiled prefixes are kept for up to SYSTEM_PROMPT_CACHE_SIZE assistants
+(LRU).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from entities_api.services.logging_service import LoggingUtility
+
+logging_utility = LoggingUtility()
+
+DEFAULT_CACHE_SIZE = 1024
+
+CLOCK_FORMATS = {
+    "day": "%Y-%m-%d",
+    "hour": "%Y-%m-%d %H:00",
+    "minute": "%Y-%m-%d %H:%M",
+}
+DEFAULT_CLOCK = "day"
+
+
+def canonical_tools(tools: Optional[List[Dict[str, Any]]]) -> str:
+    """Tools as canonical JSON; identical tool sets give identical bytes."""
+    ordered = sorted(tools or [], key=lambda tool: str(tool.get("name", "")))
+    return json.dumps(
+        ordered,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+class SystemPrompt:
+    """An assembled system message and the identity of its static prefix."""
+
+    __slots__ = ("prefix", "prefix_hash", "suffix")
+
+    def __init__(self, prefix: str, prefix_hash: str, suffix: str):
+        self.prefix = prefix
+        self.prefix_hash = prefix_hash
+        self.suffix = suffix
+
+    @property
+    def content(self) -> str:
+        return self.prefix + self.suffix
+
+    @property
+    def version(self) -> str:
+        """Short form of ``prefix_hash`` for logs."""
+        return self.prefix_hash[:12]
+
+
+class _Compiled:
+    __slots__ = ("source", "prefix", "prefix_hash")
+
+    def __init__(self, source: Tuple[str, str], prefix: str, prefix_hash: str):
+        self.source = source
+        self.prefix = prefix
+        self.prefix_hash = prefix_hash
+
+
+class SystemPromptAssembler:
+    """Builds system messages, reusing each assistant's compiled prefix."""
+
+    def __init__(
+        self,
+        clock: str = DEFAULT_CLOCK,
+        max_entries: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.clock_format = CLOCK_FORMATS[clock]
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._compiled: "OrderedDict[str, _Compiled]" = OrderedDict()
+        self.hits = 0
+        self.compiles = 0
+
+    @staticmethod
+    def compile_prefix(
+        instructions: Optional[str], tools: Optional[List[Dict[str, Any]]]
+    ) -> Tuple[str, str]:
+        """Returns the static prefix and its sha256."""
+        prefix = f"tools:{canonical_tools(tools)}\n{instructions or ''}\n"
+        return prefix, hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def _prefix(
+        self,
+        assistant_id: str,
+        instructions: Optional[str],
+        tools: Optional[List[Dict[str, Any]]],
+    ) -> _Compiled:
+        # The raw config identifies the version; comparing it is far cheaper
+        # than re-serialising and hashing the tools.
+        source = (instructions or "", repr(tools))
+        with self._lock:
+            compiled = self._compiled.get(assistant_id)
+            if compiled is not None and compiled.source == source:
+                self._compiled.move_to_end(assistant_id)
+                self.hits += 1
+                return compiled
+
+        prefix, prefix_hash = self.compile_prefix(instructions, tools)
+        compiled = _Compiled(source, prefix, prefix_hash)
+        with self._lock:
+            self._compiled[assistant_id] = compiled
+            self._compiled.move_to_end(assistant_id)
+            while len(self._compiled) > self.max_entries:
+                self._compiled.popitem(last=False)
+            self.compiles += 1
+        logging_utility.info(
+            "Compiled system prompt prefix %s for assistant %s (%d chars)",
+            prefix_hash[:12],
+            assistant_id,
+            len(prefix),
+        )
+        return compiled
+
+    def suffix(self, now: Optional[datetime] = None) -> str:
+        """The volatile tail: the date at the configured granularity."""
+        return f"Today's date: {(now or datetime.now()).strftime(self.clock_format)}"
+
+    def build(
+        self,
+        assistant_id: str,
+        instructions: Optional[str],
+        tools: Optional[List[Dict[str, Any]]],
+        now: Optional[datetime] = None,
+    ) -> SystemPrompt:
+        compiled = self._prefix(assistant_id, instructions, tools)
+        return SystemPrompt(compiled.prefix, compiled.prefix_hash, self.suffix(now))
+
+    def invalidate(self, assistant_id: str) -> None:
+        with self._lock:
+            self._compiled.pop(assistant_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "assistants": len(self._compiled),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "compiles": self.compiles,
+                "prefixes": {
+                    assistant_id: compiled.prefix_hash[:12]
+                    for assistant_id, compiled in self._compiled.items()
+                },
+            }
+
+
+def configured_clock() -> str:
+    clock = os.getenv("SYSTEM_PROMPT_CLOCK", DEFAULT_CLOCK).strip().lower()
+    if clock not in CLOCK_FORMATS:
+        logging_utility.warning(
+            "Unknown SYSTEM_PROMPT_CLOCK '%s', falling back to '%s'.",
+            clock,
+            DEFAULT_CLOCK,
+        )
+        return DEFAULT_CLOCK
+    return clock
+
+
+_assembler: Optional[SystemPromptAssembler] = None
+_assembler_lock = threading.Lock()
+
+
+def get_system_prompt_assembler() -> SystemPromptAssembler:
+    """Returns the process-wide assembler, creating it on first use."""
+    global _assembler
+    if _assembler is None:
+        with _assembler_lock:
+            if _assembler is None:
+                _assembler = SystemPromptAssembler(
+                    clock=configured_clock(),
+                    max_entries=int(
+                        os.getenv("SYSTEM_PROMPT_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+                    ),
+                )
+    return _assembler
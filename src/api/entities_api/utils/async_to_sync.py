@@ -1,5 +1,9 @@
 import asyncio
-from typing import AsyncGenerator, Generator
+from typing import AsyncGenerator, Generator, Iterator, TypeVar
+
+from entities_api.utils.stream_bridge import ChunkBridge, start_thread_producer
+
+T = TypeVar("T")
 
 
 def async_to_sync_stream(agen: AsyncGenerator[str, None]) -> Generator[str, None, None]:
@@ -19,3 +23,28 @@ def async_to_sync_stream(agen: AsyncGenerator[str, None]) -> Generator[str, None
         pass
     finally:
         loop.close()
+
+
+async def iterate_sync_in_thread(iterator: Iterator[T]) -> AsyncGenerator[T, None]:
+    """
+    Drives a blocking iterator from async code, so blocking steps (DB
+    writes, tool polling) never stall the loop. One producer thread runs the
+    iterator for its whole life and hands items over through a ChunkBridge:
+    the loop pays one wake-up per batch, not a thread-pool hop per item.
+
+    When the consumer stops early (cancelled, or the client went away), the
+    producer closes the iterator in its own thread, so a wrapped generator
+    runs its GeneratorExit cleanup (e.g. closing the provider stream) now
+    rather than at garbage collection.
+    """
+    bridge = ChunkBridge()
+    start_thread_producer(bridge, iter, iterator)
+    try:
+        while True:
+            batch = await bridge.get_batch()
+            if batch is None:
+                break
+            for item in batch:
+                yield item
+    finally:
+        bridge.cancel()
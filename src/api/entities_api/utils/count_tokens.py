@@ -1,4 +1,4 @@
-from transformers import AutoTokenizer
+from entities_api.services.tokenizer_registry import get_tokenizer_registry
 
 
 def count_tokens(input_string: str, tokenizer_name: str = "gpt2") -> int:
@@ -16,14 +16,8 @@ def count_tokens(input_string: str, tokenizer_name: str = "gpt2") -> int:
         Exception: If the tokenizer fails to load or tokenize the input.
     """
     try:
-        # Dynamically load the tokenizer from Hugging Face's model hub
-        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
-
-        # Tokenize the input string
-        tokens = tokenizer.encode(input_string, add_special_tokens=False)
-
-        # Return the number of tokens
-        return len(tokens)
+        # The tokenizer is loaded once per process and then shared
+        return get_tokenizer_registry().count(tokenizer_name, input_string)
     except Exception as e:
         raise Exception(
             f"Failed to load or use the tokenizer '{tokenizer_name}': {str(e)}"
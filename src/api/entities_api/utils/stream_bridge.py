@@ -0,0 +1,370 @@
+"""
+Batched chunk hand-off and SSE frame coalescing for streaming endpoints.
+
+The completions endpoint used to pay a fixed cost per token: one
+``run_coroutine_threadsafe(...).result()`` round trip from the handler
+thread, a ``json.loads``/``json.dumps`` pair and an ``asyncio.sleep(0.01)``,
+which capped a stream at roughly 100 chunks/s.
+
+* ChunkBridge collects chunks from a producer (a handler thread or an async
+  generator on the loop) in a deque. The consumer drains everything that
+  has arrived in one wake-up, so the hand-off cost is paid per batch.
+* SSECoalescer merges adjacent ``content`` / ``reasoning`` / ``hot_code``
+  deltas into a single SSE frame. StreamChunk objects are encoded here,
+  exactly once; canonical ``{"type": ..., "content": ...}`` JSON strings
+  from older handlers are merged on their escaped text, without decoding.
+* sse_frames() flushes on a byte budget or a latency budget, whichever
+  comes first.
+"""
+
+import asyncio
+import contextvars
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import (Any, AsyncIterator, Callable, Iterable, List, Optional,
+                    Tuple)
+
+from projectdavid_common.utilities.logging_service import LoggingUtility
+
+from entities_api.utils.stream_chunk import (StreamChunk,
+                                             encode_json_string_body)
+
+logging_utility = LoggingUtility()
+
+COALESCED_TYPES = ("content", "reasoning", "hot_code")
+
+DEFAULT_MAX_PENDING = 1024
+DEFAULT_FRAME_BYTES = 16 * 1024
+DEFAULT_FRAME_LATENCY = 0.015
+
+_CANONICAL_PREFIXES = {
+    kind: f'{{"type": "{kind}", "content": "' for kind in COALESCED_TYPES
+}
+_JSON_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.DOTALL)
+
+
+class BridgeClosed(Exception):
+    """Raised to a producer once the consumer has gone away."""
+
+
+class ChunkBridge:
+    """
+    Single-consumer hand-off between a producer and the event loop.
+
+    Producers call ``put`` from any thread (blocking when ``max_pending``
+    items are queued) and ``close`` when done. The consumer awaits
+    ``get_batch``. The loop is only woken when the consumer is actually
+    waiting, so a fast producer costs one wake-up per batch, not per chunk.
+    """
+
+    def __init__(
+        self,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self._loop = loop or asyncio.get_running_loop()
+        self._max_pending = max_pending
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._data = asyncio.Event()
+        self._waiting = False
+        self._closed = False
+        self._cancelled = False
+        self._error: Optional[BaseException] = None
+
+    # ------------------------------------------------------------------ #
+    # Producer side
+    # ------------------------------------------------------------------ #
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _wake(self) -> None:
+        if self._on_loop_thread():
+            self._data.set()
+        else:
+            self._loop.call_soon_threadsafe(self._data.set)
+
+    def put(self, item: Any) -> None:
+        on_loop = self._on_loop_thread()
+        with self._lock:
+            if not on_loop:
+                while len(self._items) >= self._max_pending and not self._cancelled:
+                    self._space.wait()
+            if self._cancelled:
+                raise BridgeClosed()
+            self._items.append(item)
+            wake, self._waiting = self._waiting, False
+        if wake:
+            self._wake()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._error = error
+            self._waiting = False
+            if self._cancelled:
+                # The consumer is gone, and its loop may be closed already.
+                return
+        self._wake()
+
+    @property
+    def pending(self) -> int:
+        return len(self._items)
+
+    # ------------------------------------------------------------------ #
+    # Consumer side
+    # ------------------------------------------------------------------ #
+    async def get_batch(self, timeout: Optional[float] = None) -> Optional[List[Any]]:
+        """
+        Returns every queued item, waiting up to ``timeout`` for the first.
+        Returns ``[]`` on timeout and None once the producer has closed and
+        the queue is drained; re-raises the producer's error at that point.
+        """
+        while True:
+            with self._lock:
+                if self._items:
+                    batch = list(self._items)
+                    self._items.clear()
+                    self._space.notify_all()
+                    return batch
+                if self._closed:
+                    if self._error is not None:
+                        raise self._error
+                    return None
+                self._waiting = True
+                self._data.clear()
+
+            try:
+                if timeout is None:
+                    await self._data.wait()
+                else:
+                    await asyncio.wait_for(self._data.wait(), timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._waiting = False
+                if not self._items and not self._closed:
+                    return []
+
+    def cancel(self) -> None:
+        """Called by the consumer when it stops reading (e.g. disconnect)."""
+        with self._lock:
+            self._cancelled = True
+            self._items.clear()
+            self._space.notify_all()
+
+
+def start_thread_producer(
+    bridge: ChunkBridge,
+    sync_gen_func: Callable[..., Iterable[Any]],
+    *args,
+    **kwargs,
+) -> threading.Thread:
+    """
+    Runs a blocking generator in a daemon thread, feeding the bridge. The
+    thread runs in a copy of the caller's context, as ``asyncio.to_thread``
+    does.
+    """
+
+    def run():
+        iterator = None
+        try:
+            iterator = iter(sync_gen_func(*args, **kwargs))
+            for item in iterator:
+                bridge.put(item)
+        except BridgeClosed:
+            logging_utility.debug("Stream consumer went away; stopping producer.")
+        except Exception as e:
+            logging_utility.error(f"Error in sync generator thread: {e}", exc_info=True)
+            bridge.close(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            bridge.close()
+
+    thread = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(run,),
+        name="stream-producer",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+async def pump_async_producer(bridge: ChunkBridge, chunks: AsyncIterator[Any]) -> None:
+    """Feeds an async generator into the bridge (run as a task)."""
+    try:
+        async for item in chunks:
+            bridge.put(item)
+            if bridge.pending >= bridge._max_pending:
+                await asyncio.sleep(0)
+    except BridgeClosed:
+        pass
+    except Exception as e:
+        logging_utility.error(f"Error in async stream producer: {e}", exc_info=True)
+        bridge.close(e)
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        bridge.close()
+
+
+# ---------------------------------------------------------------------- #
+# SSE coalescing
+# ---------------------------------------------------------------------- #
+def _split_chunk(chunk: Any) -> Tuple[Optional[str], str]:
+    """
+    Returns ``(kind, escaped_body)`` for a coalescable delta, or
+    ``(None, json_text)`` for a chunk that must be sent as its own frame.
+    Returns ``(None, "")`` for chunks that should be dropped.
+    """
+    if isinstance(chunk, StreamChunk):
+        if (
+            chunk.type in COALESCED_TYPES
+            and not chunk.extra
+            and isinstance(chunk.content, str)
+        ):
+            return chunk.type, encode_json_string_body(chunk.content)
+        return None, chunk.encode()
+
+    if isinstance(chunk, str):
+        if chunk.startswith('{"type": "'):
+            for kind, prefix in _CANONICAL_PREFIXES.items():
+                if chunk.startswith(prefix) and chunk.endswith('"}'):
+                    body = chunk[len(prefix) : -2]
+                    if _JSON_STRING_BODY.fullmatch(body):
+                        return kind, body
+                    break
+        stripped = chunk.strip()
+        if stripped.startswith(("{", "[")):
+            try:
+                chunk = json.loads(stripped)
+            except json.JSONDecodeError:
+                return "content", json.dumps(chunk)[1:-1]
+        else:
+            return "content", json.dumps(chunk)[1:-1]
+
+    if not isinstance(chunk, dict):
+        if chunk is not None:
+            logging_utility.warning(f"Skipping unknown chunk type: {type(chunk)}")
+        return None, ""
+
+    chunk.setdefault("type", "content")
+    if "content" not in chunk and chunk.get("type") != "error":
+        chunk["content"] = ""
+
+    content = chunk.get("content")
+    coalescable = chunk["type"] in COALESCED_TYPES and len(chunk) == 2
+    if coalescable and isinstance(content, str):
+        return chunk["type"], json.dumps(content)[1:-1]
+    return None, json.dumps(chunk)
+
+
+class SSECoalescer:
+    """
+    Merges adjacent same-type deltas into SSE frames.
+
+    ``add`` returns frames that are complete (type change or byte budget
+    reached); ``flush`` returns whatever is still pending.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_FRAME_BYTES):
+        self.max_bytes = max_bytes
+        self.chunks_in = 0
+        self.frames_out = 0
+        self._kind: Optional[str] = None
+        self._parts: List[str] = []
+        self._size = 0
+        self.pending_since: Optional[float] = None
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._parts)
+
+    def add(self, chunk: Any) -> List[str]:
+        self.chunks_in += 1
+        kind, body = _split_chunk(chunk)
+        frames: List[str] = []
+
+        if kind is None:
+            if not body:
+                return frames
+            frames.extend(self.flush())
+            frames.append(f"data: {body}\n\n")
+            self.frames_out += 1
+            return frames
+
+        if self._parts and kind != self._kind:
+            frames.extend(self.flush())
+        if not self._parts:
+            self._kind = kind
+            self.pending_since = time.monotonic()
+        self._parts.append(body)
+        self._size += len(body)
+        if self._size >= self.max_bytes:
+            frames.extend(self.flush())
+        return frames
+
+    def flush(self) -> List[str]:
+        if not self._parts:
+            return []
+        body = "".join(self._parts)
+        frame = f'data: {_CANONICAL_PREFIXES[self._kind]}{body}"}}\n\n'
+        self._parts = []
+        self._size = 0
+        self.pending_since = None
+        self.frames_out += 1
+        return [frame]
+
+
+async def sse_frames(
+    bridge: ChunkBridge,
+    max_bytes: int = DEFAULT_FRAME_BYTES,
+    max_latency: float = DEFAULT_FRAME_LATENCY,
+    coalescer: Optional[SSECoalescer] = None,
+) -> AsyncIterator[str]:
+    """
+    Drains ``bridge`` into coalesced SSE frames. A pending delta waits at
+    most ``max_latency`` seconds for company; the first delta of a stream is
+    sent immediately so time-to-first-token is unaffected.
+    """
+    coalescer = coalescer or SSECoalescer(max_bytes=max_bytes)
+    first = True
+
+    while True:
+        timeout = None
+        if coalescer.has_pending:
+            age = time.monotonic() - coalescer.pending_since
+            timeout = max(0.0, max_latency - age)
+
+        batch = await bridge.get_batch(timeout)
+        if batch is None:
+            break
+
+        for chunk in batch:
+            for frame in coalescer.add(chunk):
+                yield frame
+            if first and coalescer.has_pending:
+                first = False
+                for frame in coalescer.flush():
+                    yield frame
+
+        if coalescer.has_pending and (
+            not batch or time.monotonic() - coalescer.pending_since >= max_latency
+        ):
+            for frame in coalescer.flush():
+                yield frame
+
+    for frame in coalescer.flush():
+        yield frame
@@ -0,0 +1,120 @@
+"""
+Typed stream chunks, serialised once at the SSE boundary.
+
+Handlers used to yield ``json.dumps`` strings. Every layer that needed to
+look at a chunk (``stream_function_call_output``, the SSE coalescer)
+parsed it again and re-encoded it, which cost several JSON round trips per
+token. A StreamChunk carries ``type``, ``content`` and any ``extra``
+fields unserialised from the handler, through the chunk bridge, to the
+router, where ``encode`` produces the same ``{"type": ..., "content":
+..., **extra}`` object as before. Encoding uses orjson when it is
+installed and the standard library otherwise.
+
+Layers that still produce JSON strings or dicts keep working: ``as_chunk``
+turns either form into a StreamChunk.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+try:  # Optional fast path; the output is the same JSON either way.
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+if ORJSON_AVAILABLE:
+
+    def encode_json(value: Any) -> str:
+        return orjson.dumps(value, default=str).decode("utf-8")
+
+else:
+
+    def encode_json(value: Any) -> str:
+        return json.dumps(value, default=str)
+
+
+def encode_json_string_body(text: str) -> str:
+    """``text`` as the inside of a JSON string literal (quotes stripped)."""
+    return encode_json(text)[1:-1]
+
+
+class StreamChunk:
+    """One event of a stream: ``{"type": ..., "content": ..., **extra}``."""
+
+    __slots__ = ("type", "content", "extra")
+
+    def __init__(
+        self,
+        type: str,
+        content: Any = "",
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.type = type
+        self.content = content
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, event: Dict[str, Any]) -> "StreamChunk":
+        if len(event) <= 2 and "type" in event:
+            return cls(event["type"], event.get("content", ""))
+        extra = {
+            key: value for key, value in event.items() if key not in ("type", "content")
+        }
+        return cls(
+            event.get("type", "content"), event.get("content", ""), extra or None
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style read access, for code written against parsed chunks."""
+        if key == "type":
+            return self.type
+        if key == "content":
+            return self.content
+        return (self.extra or {}).get(key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        event = {"type": self.type, "content": self.content}
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+    def encode(self) -> str:
+        return encode_json(self.to_dict())
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, StreamChunk):
+            return NotImplemented
+        return (self.type, self.content, self.extra) == (
+            other.type,
+            other.content,
+            other.extra,
+        )
+
+    def __repr__(self) -> str:
+        return f"StreamChunk({self.type!r}, {self.content!r}, {self.extra!r})"
+
+
+def as_chunk(item: Any) -> Optional[StreamChunk]:
+    """
+    A StreamChunk for a chunk in any supported form (StreamChunk, event
+    dict or JSON text); plain text becomes a ``content`` chunk. Returns
+    None for anything else.
+    """
+    if isinstance(item, StreamChunk):
+        return item
+    if isinstance(item, dict):
+        return StreamChunk.from_dict(item)
+    if isinstance(item, str):
+        stripped = item.strip()
+        if stripped.startswith("{"):
+            try:
+                parsed = json.loads(stripped)
+            except json.JSONDecodeError:
+                return StreamChunk("content", item)
+            if isinstance(parsed, dict):
+                return StreamChunk.from_dict(parsed)
+        return StreamChunk("content", item)
+    return None
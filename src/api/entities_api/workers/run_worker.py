@@ -0,0 +1,436 @@
+"""
+Background run workers.
+
+Run with ``python -m entities_api.workers.run_worker``. The process starts
+RUN_WORKER_PROCESSES worker processes; each runs RUN_WORKER_CONCURRENCY
+threads that claim runs from the run queue (see services.run_queue), drive
+the provider handler's ``process_conversation`` and publish its chunks,
+coalesced into SSE frames, to the run's chunk log. Clients follow the log
+through ``GET /v1/runs/{run_id}/stream`` or ``POST /completions``.
+
+Every RUN_WORKER_HEARTBEAT_SECONDS each process renews the lease of the
+runs it holds, queues again the runs of workers that stopped heartbeating
+and prunes the chunk logs of runs finished more than
+RUN_CHUNK_RETENTION_SECONDS ago. Frames are written at most every
+RUN_WORKER_FLUSH_MS (the first one immediately).
+
+Workers read cancels from the database (the default CANCELLATION_BACKEND)
+and share the API's configuration otherwise. Runs stream with the platform
+key of the provider they are routed to (HYPERBOLIC_API_KEY,
+TOGETHER_API_KEY, DEEPSEEK_API_KEY); a run whose provider has no key
+configured fails.
+"""
+
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from entities_api.inference.hedging import platform_api_key
+from entities_api.inference.provider_registry import get_provider_registry
+from entities_api.services.logging_service import LoggingUtility
+from entities_api.services.run_queue import (FAILED, QueuedRun, RunQueue,
+                                             get_run_queue, queued_execution)
+from entities_api.utils.stream_bridge import SSECoalescer
+
+logging_utility = LoggingUtility()
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_POLL_SECONDS = 0.5
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_HEARTBEAT_SECONDS = 10.0
+DEFAULT_FLUSH_MS = 50.0
+DEFAULT_RETENTION_SECONDS = 3600.0
+
+STOPPED_RUN_STATUSES = ("cancelling", "cancelled", "completed", "failed")
+
+
+def _frame(event: Dict[str, Any]) -> str:
+    return "data: " + json.dumps(event) + "\n\n"
+
+
+class ChunkLogPublisher:
+    """
+    Coalesces one run's chunks into SSE frames and appends them, numbered,
+    to its chunk log. Thread-safe: the worker's flusher thread calls
+    ``flush_if_stale`` while the run's thread calls ``add``.
+    """
+
+    def __init__(
+        self,
+        queue: RunQueue,
+        run_id: str,
+        first_seq: int = 0,
+        flush_interval: float = DEFAULT_FLUSH_MS / 1000,
+        prelude: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        # Written ahead of the first frame, not on its own: a chunk log with
+        # frames marks a run that must not be retried (see requeue_expired).
+        self.prelude = prelude
+        self.coalescer = SSECoalescer()
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._seq = first_seq
+        self._written_at: Optional[float] = None
+
+    def add(self, chunk: Any) -> None:
+        with self._lock:
+            self._pending.extend(self.coalescer.add(chunk))
+            if self._written_at is None:
+                # The first frame goes out at once.
+                self._pending.extend(self.coalescer.flush())
+            self._flush_locked(force=self._written_at is None)
+
+    def append(self, frame: str) -> None:
+        with self._lock:
+            self._pending.extend(self.coalescer.flush())
+            self._pending.append(frame)
+            self._flush_locked(force=True)
+
+    def flush_if_stale(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked(force=True)
+
+    def _flush_locked(self, force: bool = False) -> None:
+        now = time.monotonic()
+        stale = (
+            self._written_at is None or now - self._written_at >= self.flush_interval
+        )
+        if not (force or stale):
+            return
+        self._pending.extend(self.coalescer.flush())
+        if not self._pending:
+            return
+        if self.prelude is not None:
+            self._pending.insert(0, self.prelude)
+            self.prelude = None
+        frames = []
+        for frame in self._pending:
+            self._seq += 1
+            frames.append((self._seq, frame))
+        self.queue.append_frames(self.run_id, frames)
+        self._pending = []
+        self._written_at = now
+
+
+class RunWorker:
+    """Claims queued runs and executes them on a pool of threads."""
+
+    def __init__(
+        self,
+        queue: RunQueue,
+        worker_id: Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        poll_interval: float = DEFAULT_POLL_SECONDS,
+        lease: float = DEFAULT_LEASE_SECONDS,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_SECONDS,
+        flush_interval: float = DEFAULT_FLUSH_MS / 1000,
+        retention: float = DEFAULT_RETENTION_SECONDS,
+    ):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.heartbeat_interval = heartbeat_interval
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._active: Dict[str, ChunkLogPublisher] = {}
+        self._threads: List[threading.Thread] = []
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        targets = [self._claim_loop] * self.concurrency + [
+            self._flush_loop,
+            self._maintenance_loop,
+        ]
+        for index, target in enumerate(targets):
+            thread = threading.Thread(
+                target=target, name=f"run-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logging_utility.info(
+            "Run worker %s started with %d threads", self.worker_id, self.concurrency
+        )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops claiming runs and waits for the running ones to finish."""
+        self.stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # ------------------------------------------------------------------ #
+    # Loops
+    # ------------------------------------------------------------------ #
+    def _claim_loop(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                queued = self.queue.claim(self.worker_id)
+            except Exception as e:
+                logging_utility.error(
+                    "Run worker %s: claim failed: %s", self.worker_id, e
+                )
+                queued = None
+            if queued is None:
+                self.stopping.wait(self.poll_interval)
+                continue
+            self.execute(queued)
+
+    def _flush_loop(self) -> None:
+        while not self.stopping.wait(self.flush_interval):
+            with self._lock:
+                publishers = list(self._active.values())
+            for publisher in publishers:
+                try:
+                    publisher.flush_if_stale()
+                except Exception as e:
+                    logging_utility.error(
+                        "Run %s: chunk log write failed: %s", publisher.run_id, e
+                    )
+
+    def _maintenance_loop(self) -> None:
+        # After ``stop`` this keeps renewing leases until the running runs
+        # finish, so they are not handed to another worker meanwhile.
+        while True:
+            if self.stopping.is_set():
+                time.sleep(self.heartbeat_interval)
+            else:
+                self.stopping.wait(self.heartbeat_interval)
+            with self._lock:
+                run_ids = list(self._active)
+            stopping = self.stopping.is_set()
+            if stopping and not run_ids:
+                return
+            try:
+                self.queue.heartbeat(self.worker_id, run_ids)
+                if stopping:
+                    continue
+                for run_id in self.queue.requeue_expired(self.lease):
+                    self._on_lease_expired(run_id)
+                self.queue.prune(self.retention)
+            except Exception as e:
+                logging_utility.error(
+                    "Run worker %s: maintenance failed: %s", self.worker_id, e
+                )
+
+    def _on_lease_expired(self, run_id: str) -> None:
+        if self.queue.state(run_id) == FAILED:
+            logging_utility.error(
+                "Run %s: worker lease expired and the run cannot be retried; "
+                "marking failed",
+                run_id,
+            )
+            self._gateway().runs.update_run_status(run_id, "failed")
+            self.queue.append_frames(
+                run_id,
+                [
+                    (
+                        self.queue.last_seq(run_id) + 1,
+                        _frame(
+                            {
+                                "type": "error",
+                                "error": "run_lost",
+                                "message": "The worker running this run was lost.",
+                            }
+                        ),
+                    )
+                ],
+            )
+        else:
+            logging_utility.warning("Run %s: worker lease expired; re-queued", run_id)
+
+    # ------------------------------------------------------------------ #
+    # Execution
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _gateway():
+        from entities_api.services.service_gateway import get_service_gateway
+
+        return get_service_gateway()
+
+    @staticmethod
+    def _provider_key(route) -> str:
+        """
+        The key a queued run streams with. Nobody is attached to hand one
+        in, so it is the platform key of the provider the run is routed to
+        (failover routes already carry theirs).
+        """
+        api_key = route.api_key or (
+            platform_api_key(route.provider) if route.provider else None
+        )
+        if not api_key:
+            raise ValueError(
+                f"No platform API key configured for provider "
+                f"{route.provider or 'unknown'} (model {route.model_id})"
+            )
+        return api_key
+
+    def execute(self, queued: QueuedRun) -> None:
+        run_id = queued.run_id
+        runs = self._gateway().runs
+        retrying = None
+        if queued.attempts > 1:
+            retrying = _frame({"status": "retrying", "attempt": queued.attempts})
+        publisher = ChunkLogPublisher(
+            self.queue,
+            run_id,
+            self.queue.last_seq(run_id),
+            self.flush_interval,
+            prelude=retrying,
+        )
+        with self._lock:
+            self._active[run_id] = publisher
+        started = time.monotonic()
+        error = None
+
+        try:
+            run = runs.retrieve_run(run_id)
+            if run is None:
+                raise ValueError(f"Run {run_id} not found")
+            status = getattr(run.status, "value", run.status)
+            if status in STOPPED_RUN_STATUSES:
+                logging_utility.info("Run %s is %s; skipping", run_id, status)
+                return
+
+            logging_utility.info(
+                "Run worker %s executing run %s (attempt %d)",
+                self.worker_id,
+                run_id,
+                queued.attempts,
+            )
+            runs.update_run_status(run_id, "in_progress")
+
+            route = get_provider_registry().route(run.model)
+            api_key = self._provider_key(route)
+            for chunk in route.handler.process_conversation(
+                thread_id=run.thread_id,
+                message_id=None,
+                run_id=run_id,
+                assistant_id=run.assistant_id,
+                model=route.model_id,
+                stream_reasoning=False,
+                api_key=api_key,
+            ):
+                publisher.add(chunk)
+
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logging_utility.error(
+                "Run %s failed in worker: %s", run_id, e, exc_info=True
+            )
+            try:
+                publisher.append(
+                    _frame(
+                        {
+                            "type": "error",
+                            "error": "run_failure",
+                            "message": "An internal error occurred while running.",
+                        }
+                    )
+                )
+                runs.update_run_status(run_id, "failed")
+            except Exception as report_error:
+                logging_utility.error(
+                    "Run %s: could not record failure: %s", run_id, report_error
+                )
+        finally:
+            try:
+                publisher.close()
+            finally:
+                with self._lock:
+                    self._active.pop(run_id, None)
+                self.queue.finish(run_id, error)
+            logging_utility.info(
+                "Run %s finished in worker after %.2f s (%d chunks, %d frames)",
+                run_id,
+                time.monotonic() - started,
+                publisher.coalescer.chunks_in,
+                publisher.coalescer.frames_out,
+            )
+
+
+def build_run_worker(queue: Optional[RunQueue] = None) -> RunWorker:
+    return RunWorker(
+        queue or get_run_queue(),
+        concurrency=int(os.getenv("RUN_WORKER_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        poll_interval=float(
+            os.getenv("RUN_WORKER_POLL_SECONDS", DEFAULT_POLL_SECONDS)
+        ),
+        lease=float(os.getenv("RUN_WORKER_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)),
+        heartbeat_interval=float(
+            os.getenv("RUN_WORKER_HEARTBEAT_SECONDS", DEFAULT_HEARTBEAT_SECONDS)
+        ),
+        flush_interval=float(os.getenv("RUN_WORKER_FLUSH_MS", DEFAULT_FLUSH_MS))
+        / 1000,
+        retention=float(
+            os.getenv("RUN_CHUNK_RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS)
+        ),
+    )
+
+
+def start_in_process_worker() -> Optional[RunWorker]:
+    """
+    With the local queue backend nothing outside this process can reach
+    the queue, so the API runs the worker itself. Returns None otherwise.
+    """
+    from entities_api.services.run_queue import LocalRunQueue
+
+    if not queued_execution() or not isinstance(get_run_queue(), LocalRunQueue):
+        return None
+    worker = build_run_worker()
+    worker.start()
+    return worker
+
+
+def _serve() -> None:
+    worker = build_run_worker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: worker.stopping.set())
+    worker.start()
+    worker.stopping.wait()
+    logging_utility.info("Run worker %s stopping", worker.worker_id)
+    worker.stop()
+
+
+def main() -> None:
+    processes = int(os.getenv("RUN_WORKER_PROCESSES", "1"))
+    if processes <= 1:
+        _serve()
+        return
+
+    children = [
+        multiprocessing.Process(target=_serve, name=f"run-worker-{index}")
+        for index in range(processes)
+    ]
+    for child in children:
+        child.start()
+
+    def forward(signum, _frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The API package lives under src/api and is not installed for the tests.
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src", "api"))
+)
@@ -0,0 +1,85 @@
+import threading
+
+from entities_api.services.action_waiter import (OUTCOME_CANCELLED,
+                                                 OUTCOME_COMPLETED,
+                                                 OUTCOME_EXPIRED,
+                                                 OUTCOME_RUN_STATUS,
+                                                 OUTCOME_TOOL_OUTPUT,
+                                                 ActionWaiter,
+                                                 ActionWaitResult)
+
+
+def wait_in_thread(waiter, action_id, **kwargs):
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(waiter.wait(action_id, **kwargs))
+    )
+    thread.start()
+    return thread, results
+
+
+def test_tool_output_wakes_the_waiter_with_the_output():
+    waiter = ActionWaiter(poll_interval=10)
+    waiter.register("act_1", run_id="run_1")
+    thread, results = wait_in_thread(waiter, "act_1", timeout=5)
+    waiter.notify_tool_output("act_1", "42")
+    thread.join(2)
+
+    (result,) = results
+    assert result.outcome == OUTCOME_TOOL_OUTPUT
+    assert result.output == "42"
+    assert result.resumable
+    assert result.waited < 2
+    assert waiter.pending_count == 0
+
+
+def test_outcome_before_wait_is_not_lost():
+    waiter = ActionWaiter()
+    waiter.register("act_1")
+    waiter.notify_action("act_1", "completed")
+    result = waiter.wait("act_1", timeout=1)
+    assert result.outcome == OUTCOME_COMPLETED
+
+
+def test_only_terminal_action_statuses_resolve():
+    waiter = ActionWaiter(poll_interval=0.01)
+    waiter.register("act_1")
+    waiter.notify_action("act_1", "processing")
+    assert waiter.wait("act_1", timeout=0.05).outcome == OUTCOME_EXPIRED
+
+
+def test_run_status_resolves_every_action_of_the_run():
+    waiter = ActionWaiter()
+    waiter.register("act_1", run_id="run_1")
+    waiter.register("act_2", run_id="run_1")
+    waiter.register("act_3", run_id="run_2")
+    waiter.notify_run("run_1", "action_required")
+    waiter.notify_run("run_1", "cancelled")
+    waiter.notify_run("run_2", "in_progress")
+
+    assert waiter.wait("act_1", timeout=1).outcome == OUTCOME_CANCELLED
+    assert waiter.wait("act_2", timeout=1).outcome == OUTCOME_CANCELLED
+    assert waiter.wait("act_3", timeout=1).outcome == OUTCOME_RUN_STATUS
+
+
+def test_fallback_poll_picks_up_outcomes_from_other_processes():
+    waiter = ActionWaiter(poll_interval=0.01)
+    polls = []
+
+    def poll(action_id):
+        polls.append(action_id)
+        if len(polls) < 3:
+            return None
+        return ActionWaitResult(action_id, OUTCOME_COMPLETED, status="completed")
+
+    result = waiter.wait("act_1", timeout=5, poll=poll)
+    assert result.outcome == OUTCOME_COMPLETED
+    assert len(polls) == 3
+
+
+def test_wait_times_out():
+    waiter = ActionWaiter(poll_interval=0.01)
+    result = waiter.wait("act_1", timeout=0.05)
+    assert result.outcome == OUTCOME_EXPIRED
+    assert not result.resumable
+    assert waiter.pending_count == 0
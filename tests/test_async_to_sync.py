@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("projectdavid_common")
+
+from entities_api.utils.async_to_sync import iterate_sync_in_thread  # noqa: E402
+
+
+def _collect(iterator):
+    async def run():
+        return [item async for item in iterate_sync_in_thread(iterator)]
+
+    return asyncio.run(run())
+
+
+def test_items_arrive_in_order_from_one_thread():
+    threads = set()
+
+    def produce():
+        for i in range(500):
+            threads.add(threading.get_ident())
+            yield i
+
+    assert _collect(produce()) == list(range(500))
+    assert len(threads) == 1
+    assert threading.get_ident() not in threads
+
+
+def test_producer_error_reaches_the_consumer():
+    def produce():
+        yield 1
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        _collect(produce())
+
+
+def test_disconnect_closes_a_sync_only_handler():
+    events = []
+    closed = threading.Event()
+
+    class Upstream:
+        def __iter__(self):
+            i = 0
+            while True:
+                i += 1
+                yield f"token {i}"
+
+        def close(self):
+            events.append("upstream closed")
+            closed.set()
+
+    def handler_stream():
+        upstream = Upstream()
+        try:
+            for delta in upstream:
+                yield delta
+        except GeneratorExit:
+            events.append("abandoned")
+            raise
+        finally:
+            upstream.close()
+
+    async def consume_then_drop():
+        chunks = iterate_sync_in_thread(handler_stream())
+        async for chunk in chunks:
+            assert chunk == "token 1"
+            break
+        await chunks.aclose()
+
+    asyncio.run(consume_then_drop())
+
+    assert closed.wait(2)
+    assert events == ["abandoned", "upstream closed"]
+
+
+def test_cancelled_consumer_closes_the_iterator():
+    closed = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        try:
+            while True:
+                started.set()
+                yield "tick"
+        finally:
+            closed.set()
+
+    async def run():
+        async def consume():
+            async for _ in iterate_sync_in_thread(slow()):
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(consume())
+        await asyncio.to_thread(started.wait, 2)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert closed.wait(2)
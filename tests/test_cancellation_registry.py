@@ -0,0 +1,35 @@
+from entities_api.services.cancellation_registry import (
+    CancellationRegistry, DatabaseCancellationBackend, LocalCancellationBackend,
+    build_cancellation_backend)
+
+
+def test_database_backend_is_the_default(monkeypatch):
+    monkeypatch.delenv("CANCELLATION_BACKEND", raising=False)
+    assert isinstance(build_cancellation_backend(), DatabaseCancellationBackend)
+
+
+def test_local_backend_is_opt_in(monkeypatch):
+    monkeypatch.setenv("CANCELLATION_BACKEND", "local")
+    assert isinstance(build_cancellation_backend(), LocalCancellationBackend)
+
+
+def test_unknown_backend_falls_back_to_database():
+    backend = build_cancellation_backend("carrier-pigeon")
+    assert isinstance(backend, DatabaseCancellationBackend)
+
+
+def test_cancel_before_watch_is_remembered():
+    registry = CancellationRegistry(LocalCancellationBackend())
+    registry.cancel("run_1")
+    registry.watch("run_1")
+    assert registry.is_cancelled("run_1")
+    assert not registry.is_cancelled("run_2")
+    assert registry.watched_runs() == ()
+
+
+def test_disconnect_cancels_and_is_recorded():
+    registry = CancellationRegistry(LocalCancellationBackend())
+    registry.watch("run_1")
+    registry.disconnect("run_1")
+    assert registry.is_cancelled("run_1")
+    assert registry.disconnected_at("run_1") is not None
@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip("projectdavid_common")
+
+from entities_api.inference import circuit_breaker  # noqa: E402
+from entities_api.inference.circuit_breaker import (  # noqa: E402
+    CLOSED, HALF_OPEN, OPEN, CircuitBreakerBoard)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def board(**kwargs):
+    options = dict(
+        window=10,
+        min_requests=4,
+        failure_threshold=0.5,
+        consecutive_failures=3,
+        cooldown=10.0,
+        max_cooldown=40.0,
+        probe_timeout=5.0,
+    )
+    options.update(kwargs)
+    return CircuitBreakerBoard(**options)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breakers = board()
+    for _ in range(2):
+        breakers.record_failure("p")
+    assert breakers.state("p") == CLOSED
+    breakers.record_failure("p")
+    assert breakers.state("p") == OPEN
+    assert not breakers.allow("p")
+    assert breakers.allow("other")
+
+
+def test_opens_on_failure_rate(clock):
+    breakers = board(consecutive_failures=100)
+    for ok in (True, False, True, False):
+        (breakers.record_success if ok else breakers.record_failure)("p")
+    assert breakers.state("p") == OPEN
+
+
+def test_success_resets_the_consecutive_count(clock):
+    breakers = board(min_requests=100)
+    for _ in range(5):
+        breakers.record_failure("p")
+        breakers.record_failure("p")
+        breakers.record_success("p")
+    assert breakers.state("p") == CLOSED
+
+
+def test_half_open_admits_one_probe_and_closes_on_success(clock):
+    breakers = board()
+    for _ in range(3):
+        breakers.record_failure("p")
+    clock.now += 10
+    assert breakers.allow("p")
+    assert breakers.state("p") == HALF_OPEN
+    assert not breakers.allow("p")
+    breakers.record_success("p")
+    assert breakers.state("p") == CLOSED
+    assert breakers.allow("p")
+
+
+def test_failed_probe_doubles_the_cooldown(clock):
+    breakers = board()
+    for _ in range(3):
+        breakers.record_failure("p")
+    for cooldown in (20, 40, 40):
+        clock.now += 100
+        assert breakers.allow("p")
+        breakers.record_failure("p")
+        assert breakers.state("p") == OPEN
+        clock.now += cooldown - 1
+        assert not breakers.allow("p")
+        clock.now -= cooldown - 1
+    assert breakers.stats()["p"]["times_opened"] == 4
+
+
+def test_lost_probe_frees_the_slot(clock):
+    breakers = board()
+    for _ in range(3):
+        breakers.record_failure("p")
+    clock.now += 10
+    assert breakers.allow("p")
+    clock.now += 5
+    assert breakers.allow("p")
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("projectdavid_common")
+
+from entities_api.inference import completion_cache  # noqa: E402
+from entities_api.inference.completion_cache import (  # noqa: E402
+    CACHE_FORCE, CACHE_OFF, CACHE_ON, CompletionCache)
+
+PAYLOAD = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+DELTAS = [("Hel", ""), ("lo", "")]
+
+
+def test_eligibility_by_mode_and_temperature():
+    assert not CompletionCache(CACHE_OFF).cacheable(PAYLOAD)
+    cache = CompletionCache(CACHE_ON)
+    assert cache.cacheable(PAYLOAD)
+    assert cache.cacheable({**PAYLOAD, "temperature": 0})
+    assert not cache.cacheable({**PAYLOAD, "temperature": 0.7})
+    assert CompletionCache(CACHE_FORCE).cacheable({**PAYLOAD, "temperature": 0.7})
+
+
+def test_key_ignores_order_stream_flag_and_unset_values():
+    key = CompletionCache.key(PAYLOAD)
+    reordered = {"messages": PAYLOAD["messages"], "model": "m", "stream": True}
+    assert CompletionCache.key(reordered) == key
+    assert CompletionCache.key({**PAYLOAD, "top_p": None}) == key
+    assert CompletionCache.key({**PAYLOAD, "model": "other"}) != key
+
+
+def test_stream_is_stored_then_replayed():
+    cache = CompletionCache(CACHE_ON)
+    key = cache.key(PAYLOAD)
+    opened = []
+
+    def open_deltas():
+        opened.append(True)
+        return iter(DELTAS)
+
+    assert list(cache.deltas(key, open_deltas)) == DELTAS
+    assert list(cache.deltas(key, open_deltas)) == DELTAS
+    assert len(opened) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_failed_stream_is_not_stored():
+    cache = CompletionCache(CACHE_ON)
+
+    def open_deltas():
+        yield ("partial", "")
+        raise ConnectionError("dropped")
+
+    with pytest.raises(ConnectionError):
+        list(cache.deltas("k", open_deltas))
+    assert cache.get("k") is None
+
+
+def test_memory_tier_is_bounded_and_expires(monkeypatch):
+    cache = CompletionCache(CACHE_ON, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, DELTAS)
+    assert cache.get("a") is None
+    assert cache.get("c") == DELTAS
+    assert cache.stats()["evictions"] == 1
+
+    now = completion_cache.time.time()
+    monkeypatch.setattr(completion_cache.time, "time", lambda: now + 10**6)
+    assert cache.get("c") is None
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    CompletionCache(CACHE_ON, disk_dir=str(tmp_path)).put("abcd", DELTAS)
+    cache = CompletionCache(CACHE_ON, disk_dir=str(tmp_path))
+    assert cache.get("abcd") == DELTAS
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("abcd") == DELTAS
+    assert cache.stats()["hits"] == 1
+
+
+def test_async_replay():
+    cache = CompletionCache(CACHE_ON)
+
+    async def open_deltas():
+        for delta in DELTAS:
+            yield delta
+
+    async def collect():
+        return [delta async for delta in cache.adeltas("k", open_deltas)]
+
+    assert asyncio.run(collect()) == DELTAS
+    assert cache.get("k") == DELTAS
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("projectdavid_common")
+
+from entities_api.inference import concurrency_governor  # noqa: E402
+from entities_api.inference.concurrency_governor import (  # noqa: E402
+    ConcurrencyGovernor, ProviderBusyError)
+
+
+def test_unlimited_by_default(monkeypatch):
+    monkeypatch.delenv("INFERENCE_MAX_CONCURRENCY", raising=False)
+    monkeypatch.setattr(concurrency_governor, "_governor", None)
+    governor = concurrency_governor.get_concurrency_governor()
+    assert governor.concurrency == 0
+
+    permits = [governor.acquire("p", "key") for _ in range(100)]
+    assert governor.stats()["inflight"] == 100
+    for permit in permits:
+        permit.release()
+    assert governor.stats()["inflight"] == 0
+
+
+def test_limit_rejects_after_max_queue_wait():
+    governor = ConcurrencyGovernor(concurrency=1, max_queue_wait=0.05)
+    permit = governor.acquire("p", "key")
+    with pytest.raises(ProviderBusyError):
+        governor.acquire("p", "key")
+    # Other keys have their own limiter.
+    governor.acquire("p", "other").release()
+    permit.release()
+    governor.acquire("p", "key").release()
+    assert governor.stats()["limiters"][0]["rejected"] == 1
+
+
+def test_provider_override_opts_into_a_limit():
+    governor = ConcurrencyGovernor(
+        max_queue_wait=0.05, provider_limits={"p": {"concurrency": 1}}
+    )
+    held = governor.acquire("p", "key")
+    with pytest.raises(ProviderBusyError):
+        governor.acquire("p", "key")
+    governor.acquire("q", "key").release()
+    held.release()
+
+
+def test_release_admits_queued_waiter():
+    governor = ConcurrencyGovernor(concurrency=1, max_queue_wait=5)
+    held = governor.acquire("p", "key")
+    admitted = threading.Event()
+
+    def waiter():
+        governor.acquire("p", "key", assistant_id="a").release()
+        admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not admitted.wait(0.05)
+    held.release()
+    assert admitted.wait(2)
+    thread.join()
+
+
+def test_queues_are_served_round_robin_by_assistant():
+    governor = ConcurrencyGovernor(concurrency=1, max_queue_wait=5)
+    held = governor.acquire("p", "key")
+    order = []
+    lock = threading.Lock()
+
+    def waiter(assistant):
+        permit = governor.acquire("p", "key", assistant_id=assistant)
+        with lock:
+            order.append(assistant)
+        permit.release()
+
+    threads = []
+    for assistant in ("a", "a", "a", "b"):
+        thread = threading.Thread(target=waiter, args=(assistant,))
+        thread.start()
+        threads.append(thread)
+        while governor.stats()["queued"] < len(threads):
+            pass
+    held.release()
+    for thread in threads:
+        thread.join(2)
+    assert order[:2] == ["a", "b"]
+
+
+def test_async_acquire_waits_without_blocking_the_loop():
+    governor = ConcurrencyGovernor(concurrency=1, max_queue_wait=5)
+
+    async def main():
+        held = await governor.aacquire("p", "key")
+        waiting = asyncio.ensure_future(governor.aacquire("p", "key"))
+        await asyncio.sleep(0.02)
+        assert not waiting.done()
+        held.release()
+        (await asyncio.wait_for(waiting, 2)).release()
+
+    asyncio.run(main())
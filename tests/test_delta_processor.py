@@ -0,0 +1,79 @@
+import types
+
+import pytest
+
+from entities_api.inference.delta_processor import StreamDeltaProcessor
+
+
+def test_native_reasoning_is_kept_when_not_streamed():
+    processor = StreamDeltaProcessor(stream_reasoning=False)
+    assert processor.feed_reasoning("step one, ") == []
+    assert processor.feed_reasoning("step two") == []
+    assert processor.feed("answer") == [{"type": "content", "content": "answer"}]
+    assert processor.reasoning_content == "step one, step two"
+    assert processor.assistant_reply == "answer"
+
+
+def test_native_reasoning_is_streamed_when_asked():
+    processor = StreamDeltaProcessor(stream_reasoning=True)
+    assert processor.feed_reasoning("thinking") == [
+        {"type": "reasoning", "content": "thinking"}
+    ]
+    assert processor.reasoning_content == "thinking"
+
+
+def test_format_message_tolerates_missing_content():
+    for module in ("sqlalchemy", "fastapi", "projectdavid_common"):
+        pytest.importorskip(module)
+    from entities_api.services.message_service import MessageService
+
+    db_message = types.SimpleNamespace(
+        role="assistant", tool_id=None, content=None, meta_data="{}"
+    )
+    assert MessageService._format_message(db_message) == {
+        "role": "assistant",
+        "content": "",
+    }
+
+
+def test_think_tags_split_across_chunks():
+    processor = StreamDeltaProcessor()
+    events = []
+    for delta in ("Hi <th", "ink>plan", "ning</thi", "nk> done"):
+        events.extend(processor.feed(delta))
+    events.extend(processor.flush())
+
+    assert processor.assistant_reply == "Hi  done"
+    assert processor.reasoning_content == "<think>planning</think>"
+    content = [e["content"] for e in events if e["type"] == "content"]
+    assert content == ["Hi ", " done"]
+
+
+def test_held_back_partial_tag_is_released_on_flush():
+    processor = StreamDeltaProcessor()
+    assert processor.feed("a <") == [{"type": "content", "content": "a "}]
+    assert processor.flush() == [{"type": "content", "content": "<"}]
+    assert processor.assistant_reply == "a <"
+
+
+def test_tags_are_plain_text_without_split_reasoning():
+    processor = StreamDeltaProcessor(split_reasoning=False)
+    processor.feed("<think>x</think>")
+    assert processor.assistant_reply == "<think>x</think>"
+    assert processor.reasoning_content == ""
+
+
+def test_code_interpreter_switches_to_hot_code():
+    processor = StreamDeltaProcessor()
+    events = []
+    deltas = ('{"name": "code_interpreter", ', '"arguments": {"code": "print(1)', "x")
+    for delta in deltas:
+        events.extend(processor.feed(delta))
+    events.extend(processor.flush())
+
+    assert processor.code_mode
+    # Code is buffered by line and released at the end of the stream.
+    assert [e["type"] for e in events] == ["content", "hot_code", "hot_code"]
+    assert events[1]["content"] == "```python\n"
+    assert events[2]["content"].endswith("print(1)x")
+
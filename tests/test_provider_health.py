@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("projectdavid_common")
+
+from entities_api.inference.circuit_breaker import (  # noqa: E402
+    CLOSED, OPEN, CircuitBreakerBoard)
+from entities_api.inference.provider_health import (  # noqa: E402
+    ProviderLatencyTracker, is_provider_fault)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+@pytest.mark.parametrize(
+    "error, fault",
+    [
+        (StatusError(500), True),
+        (StatusError(503), True),
+        (StatusError(429), True),
+        (StatusError(400), False),
+        (StatusError(401), False),
+        (StatusError(403), False),
+        (TimeoutError(), True),
+        (ConnectionResetError(), True),
+        (APIConnectionError(), True),
+        (ValueError("bad payload"), False),
+    ],
+)
+def test_is_provider_fault(error, fault):
+    assert is_provider_fault(error) is fault
+
+
+def _fail_with(tracker, error):
+    def open_deltas():
+        raise error
+        yield  # pragma: no cover
+
+    with pytest.raises(type(error)):
+        list(tracker.timed("together", "m", open_deltas))
+
+
+def test_caller_key_errors_do_not_open_the_circuit():
+    board = CircuitBreakerBoard(min_requests=2, consecutive_failures=3)
+    tracker = ProviderLatencyTracker(breakers=board)
+
+    for _ in range(10):
+        _fail_with(tracker, StatusError(401))
+    assert board.state("together") == CLOSED
+    assert "together" not in tracker.stats()
+
+    for _ in range(3):
+        _fail_with(tracker, StatusError(503))
+    assert board.state("together") == OPEN
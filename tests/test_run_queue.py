@@ -0,0 +1,178 @@
+import time
+import types
+
+import pytest
+
+from entities_api.services.run_queue import (CLAIMED, DONE, FAILED, QUEUED,
+                                             TERMINAL_STATES, LocalRunQueue)
+
+
+def expire(queue, run_id):
+    queue._items[run_id].heartbeat_at = time.time() - 120
+
+
+def test_claim_is_fifo_and_counts_attempts():
+    queue = LocalRunQueue()
+    queue.enqueue("run_1")
+    queue.enqueue("run_2")
+    first = queue.claim("w1")
+    assert (first.run_id, first.attempts) == ("run_1", 1)
+    assert queue.state("run_1") == CLAIMED
+    assert queue.claim("w1").run_id == "run_2"
+    assert queue.claim("w1") is None
+
+
+def test_heartbeat_keeps_the_lease():
+    queue = LocalRunQueue()
+    queue.enqueue("run_1")
+    queue.claim("w1")
+    expire(queue, "run_1")
+    queue.heartbeat("w2", ["run_1"])
+    queue.heartbeat("w1", ["run_1"])
+    assert queue.requeue_expired(lease=60) == []
+    assert queue.state("run_1") == CLAIMED
+
+
+def test_expired_run_without_output_is_requeued():
+    queue = LocalRunQueue(max_attempts=3)
+    queue.enqueue("run_1")
+    queue.claim("w1")
+    expire(queue, "run_1")
+    assert queue.requeue_expired(lease=60) == ["run_1"]
+    assert queue.state("run_1") == QUEUED
+    assert queue.claim("w2").attempts == 2
+
+
+def test_expired_run_with_output_is_failed_not_rerun():
+    queue = LocalRunQueue(max_attempts=3)
+    queue.enqueue("run_1")
+    queue.claim("w1")
+    queue.append_frames("run_1", [(1, "data: {}\n\n")])
+    expire(queue, "run_1")
+    assert queue.requeue_expired(lease=60) == ["run_1"]
+    assert queue.state("run_1") == FAILED
+    assert queue.claim("w2") is None
+
+
+def test_expired_run_out_of_attempts_is_failed():
+    queue = LocalRunQueue(max_attempts=1)
+    queue.enqueue("run_1")
+    queue.claim("w1")
+    expire(queue, "run_1")
+    queue.requeue_expired(lease=60)
+    assert queue.state("run_1") == FAILED
+
+
+def test_chunk_log_and_prune():
+    queue = LocalRunQueue()
+    queue.enqueue("run_1")
+    queue.claim("w1")
+    queue.append_frames("run_1", [(1, "a"), (2, "b"), (3, "c")])
+    assert queue.frames_after("run_1", 1) == [(2, "b"), (3, "c")]
+    assert queue.last_seq("run_1") == 3
+    queue.finish("run_1")
+    assert queue.state("run_1") == DONE
+    assert queue.prune(older_than=3600) == 0
+    assert queue.prune(older_than=-1) == 1
+    assert queue.last_seq("run_1") == 0
+
+
+def test_retry_notice_is_only_written_with_output():
+    run_worker = pytest.importorskip("entities_api.workers.run_worker")
+
+    queue = LocalRunQueue()
+    queue.enqueue("run_1")
+    publisher = run_worker.ChunkLogPublisher(queue, "run_1", prelude="retrying")
+    publisher.close()
+    assert queue.last_seq("run_1") == 0
+
+    publisher.append("data: first\n\n")
+    assert queue.frames_after("run_1", 0) == [
+        (1, "retrying"),
+        (2, "data: first\n\n"),
+    ]
+
+
+class StubHandler:
+    def __init__(self):
+        self.calls = []
+
+    def process_conversation(self, **kwargs):
+        self.calls.append(kwargs)
+        yield '{"type": "content", "content": "Hel"}'
+        yield '{"type": "content", "content": "lo"}'
+
+
+class StubRuns:
+    def __init__(self):
+        self.statuses = []
+
+    def retrieve_run(self, run_id):
+        return types.SimpleNamespace(
+            status="queued", model="hyperbolic/m", thread_id="t", assistant_id="a"
+        )
+
+    def update_run_status(self, run_id, status):
+        self.statuses.append(status)
+
+
+@pytest.fixture
+def worker_env(monkeypatch):
+    run_worker = pytest.importorskip("entities_api.workers.run_worker")
+    handler = StubHandler()
+    runs = StubRuns()
+    route = types.SimpleNamespace(
+        handler=handler, model_id="hyperbolic/m", api_key=None, provider="Hyperbolic"
+    )
+    registry = types.SimpleNamespace(route=lambda model_id, api_key=None: route)
+    gateway = types.SimpleNamespace(runs=runs)
+    monkeypatch.setattr(run_worker, "get_provider_registry", lambda: registry)
+    monkeypatch.setattr(run_worker.RunWorker, "_gateway", staticmethod(lambda: gateway))
+    return run_worker, handler, runs
+
+
+def run_queued(run_worker, run_id="run_1"):
+    queue = LocalRunQueue()
+    queue.enqueue(run_id)
+    worker = run_worker.RunWorker(
+        queue,
+        worker_id="w1",
+        concurrency=1,
+        poll_interval=0.01,
+        heartbeat_interval=0.05,
+        flush_interval=0.01,
+    )
+    worker.start()
+    deadline = time.monotonic() + 5
+    while queue.state(run_id) not in TERMINAL_STATES:
+        assert time.monotonic() < deadline, "worker did not finish the run"
+        time.sleep(0.01)
+    worker.stop(5)
+    frames = "".join(frame for _, frame in queue.frames_after(run_id, 0))
+    return queue.state(run_id), frames
+
+
+def test_worker_runs_a_queued_run_with_the_platform_key(worker_env, monkeypatch):
+    run_worker, handler, runs = worker_env
+    monkeypatch.setenv("HYPERBOLIC_API_KEY", "platform-key")
+
+    state, frames = run_queued(run_worker)
+
+    assert state == DONE
+    (call,) = handler.calls
+    assert call["api_key"] == "platform-key"
+    assert call["run_id"] == "run_1"
+    assert "Hel" in frames and "lo" in frames
+    assert runs.statuses == ["in_progress"]
+
+
+def test_worker_fails_a_run_without_a_provider_key(worker_env, monkeypatch):
+    run_worker, handler, runs = worker_env
+    monkeypatch.delenv("HYPERBOLIC_API_KEY", raising=False)
+
+    state, frames = run_queued(run_worker)
+
+    assert state == FAILED
+    assert handler.calls == []
+    assert runs.statuses == ["in_progress", "failed"]
+    assert "run_failure" in frames
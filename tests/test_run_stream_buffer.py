@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("projectdavid_common")
+
+from entities_api.inference.run_stream_buffer import (  # noqa: E402
+    ResumeGap, RunStream, RunStreamBuffers)
+
+
+def test_frames_are_numbered_and_resumable():
+    stream = RunStream("run_1")
+    for frame in ("a", "b", "c"):
+        stream.append(frame)
+    assert stream.frames_after(0) == [(1, "a"), (2, "b"), (3, "c")]
+    assert stream.frames_after(2) == [(3, "c")]
+    assert stream.frames_after(3) == []
+
+
+def test_resume_before_the_oldest_kept_frame_is_refused():
+    stream = RunStream("run_1", max_bytes=2)
+    for frame in ("a", "b", "c", "d"):
+        stream.append(frame)
+    assert stream.dropped == 2
+    assert stream.frames_after(2) == [(3, "c"), (4, "d")]
+    with pytest.raises(ResumeGap, match="Frames 2..2"):
+        stream.frames_after(1)
+    with pytest.raises(ResumeGap):
+        stream.frames_after(0)
+
+
+def test_newest_frame_is_kept_even_if_over_budget():
+    stream = RunStream("run_1", max_bytes=2)
+    stream.append("a")
+    stream.append("too long")
+    assert stream.frames_after(1) == [(2, "too long")]
+
+
+def test_follow_replays_then_tails_until_finished():
+    async def main():
+        stream = RunStream("run_1")
+        stream.append("a")
+
+        async def produce():
+            await asyncio.sleep(0.01)
+            stream.append("b")
+            stream.finish()
+
+        producer = asyncio.ensure_future(produce())
+        frames = [frame async for frame in stream.follow()]
+        await producer
+        return frames, stream.followers
+
+    frames, followers = asyncio.run(main())
+    assert frames == [(1, "a"), (2, "b")]
+    assert followers == 0
+
+
+def test_finished_streams_expire():
+    buffers = RunStreamBuffers(ttl=0)
+    stream = buffers.open("run_1")
+    assert buffers.resume("run_1") is stream
+    stream.finish()
+    assert buffers.get("run_1") is None
+    assert buffers.stats()["evicted"] == 1
@@ -0,0 +1,43 @@
+import types
+
+import pytest
+
+from entities_api.services import tokenizer_registry
+from entities_api.services.tokenizer_registry import TokenizerRegistry
+
+
+class FakeTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+
+class NoLoadRegistry(TokenizerRegistry):
+    def _load(self, model_name):
+        raise AssertionError(f"{model_name} loaded on the write path")
+
+
+def test_is_loaded_tracks_loaded_tokenizers():
+    registry = TokenizerRegistry()
+    assert not registry.is_loaded("m")
+    registry._tokenizers["m"] = FakeTokenizer()
+    assert registry.is_loaded("m")
+    assert registry.count("m", "one two three") == 3
+
+
+def test_message_writes_never_load_a_tokenizer(monkeypatch):
+    for module in ("sqlalchemy", "fastapi", "projectdavid_common"):
+        pytest.importorskip(module)
+    from entities_api.services import message_service
+
+    registry = NoLoadRegistry()
+    registry._tokenizers["loaded"] = FakeTokenizer()
+    monkeypatch.setattr(message_service, "get_tokenizer_registry", lambda: registry)
+    monkeypatch.setenv("TOKEN_COUNT_TOKENIZERS", "loaded,not-loaded")
+
+    added = []
+    service = types.SimpleNamespace(db=types.SimpleNamespace(add=added.append))
+    message = types.SimpleNamespace(id="msg_1", content=" hello there ")
+    message_service.MessageService._add_token_counts(service, message)
+
+    assert [(row.tokenizer, row.token_count) for row in added] == [("loaded", 2)]
+    assert tokenizer_registry.persisted_tokenizers() == ["loaded", "not-loaded"]
@@ -0,0 +1,100 @@
+from entities_api.inference.delta_processor import StreamDeltaProcessor
+from entities_api.inference.tool_call_recognizer import (STATE_CANDIDATE,
+                                                         STATE_PLAIN_TEXT,
+                                                         STATE_TOOL_CALL,
+                                                         ToolCallRecognizer)
+
+SCHEMAS = [
+    {
+        "name": "search",
+        "parameters": {"type": "object", "required": ["q"]},
+    }
+]
+
+
+def feed(recognizer, *deltas):
+    for delta in deltas:
+        recognizer.feed(delta)
+    return recognizer
+
+
+def test_call_split_across_deltas_is_reported_once_it_closes():
+    seen = []
+    recognizer = ToolCallRecognizer(SCHEMAS, on_tool_call=seen.append)
+    feed(recognizer, '{"name": "sea', 'rch", "argu')
+    assert recognizer.state == STATE_CANDIDATE
+    assert seen == []
+
+    feed(recognizer, 'ments": {"q": "a } in a string"}}')
+    assert seen == [{"name": "search", "arguments": {"q": "a } in a string"}}]
+    assert recognizer.state == STATE_TOOL_CALL
+    assert recognizer.detected_at == len(
+        '{"name": "search", "arguments": {"q": "a } in a string"}}'
+    )
+
+
+def test_several_calls_in_one_reply():
+    recognizer = feed(
+        ToolCallRecognizer(SCHEMAS),
+        '[{"name": "search", "arguments": {"q": "a"}},',
+        ' {"name": "search", "arguments": {"q": "b"}}]',
+    )
+    assert [call["arguments"]["q"] for call in recognizer.tool_calls] == ["a", "b"]
+
+
+def test_lenient_json_and_string_arguments():
+    recognizer = feed(
+        ToolCallRecognizer(),
+        "{'name': 'search', 'arguments': {'q': 'x',},}",
+        '{"name": "search", "arguments": "{\\"q\\": \\"y\\"}"}',
+    )
+    assert [call["arguments"] for call in recognizer.tool_calls] == [
+        {"q": "x"},
+        {"q": "y"},
+    ]
+
+
+def test_calls_failing_the_schema_are_rejected():
+    recognizer = feed(
+        ToolCallRecognizer(SCHEMAS, always_allowed=["code_interpreter"]),
+        '{"name": "search", "arguments": {}}',
+        '{"name": "unknown", "arguments": {"q": 1}}',
+        '{"name": "code_interpreter", "arguments": {"code": "1"}}',
+    )
+    assert [call["name"] for call in recognizer.rejected] == ["search", "unknown"]
+    assert recognizer.tool_call["name"] == "code_interpreter"
+
+
+def test_prose_with_embedded_call():
+    recognizer = feed(
+        ToolCallRecognizer(SCHEMAS),
+        "Let me look that up. ",
+        '{"name": "search", "arguments": {"q": "x"}}',
+    )
+    assert recognizer.tool_call == {"name": "search", "arguments": {"q": "x"}}
+
+
+def test_plain_reply_has_no_call():
+    recognizer = feed(ToolCallRecognizer(SCHEMAS), "Just {an answer}.")
+    assert recognizer.state == STATE_PLAIN_TEXT
+    assert recognizer.finish("Just {an answer}.") is None
+
+
+def test_finish_unwraps_a_json_string_reply():
+    reply = '"{\\"name\\": \\"search\\", \\"arguments\\": {\\"q\\": \\"x\\"}}"'
+    recognizer = feed(ToolCallRecognizer(SCHEMAS), reply)
+    assert recognizer.finish(reply) == {"name": "search", "arguments": {"q": "x"}}
+
+
+def test_visible_text_is_forwarded_to_the_recognizer():
+    recognizer = ToolCallRecognizer()
+    processor = StreamDeltaProcessor(
+        detect_code_interpreter=False, tool_call_recognizer=recognizer
+    )
+    for delta in (
+        '<think>{"name": "hidden", "arguments": {}}</think>',
+        '{"name": "search", ',
+        '"arguments": {"q": "x"}}',
+    ):
+        processor.feed(delta)
+    assert recognizer.tool_calls == [{"name": "search", "arguments": {"q": "x"}}]
@@ -0,0 +1,134 @@
+import json
+import types
+
+import pytest
+
+from entities_api.services.thread_context_cache import ThreadContextCache
+from entities_api.services.truncation_strategies import (
+    PIN_KEY, KeepFirstNStrategy, PinnedMessageStrategy, SlidingWindowStrategy,
+    ToolOutputAwareStrategy, apply_truncation, merge_consecutive_messages,
+    strip_pins)
+
+
+def conversation(turns):
+    messages = [{"role": "system", "content": "sys"}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"q{i}"})
+        messages.append({"role": "assistant", "content": f"a{i}"})
+    return messages
+
+
+def test_sliding_window_keeps_system_and_newest_tail():
+    messages = conversation(5)
+    kept = SlidingWindowStrategy().plan(messages, [1] * len(messages), budget=4)
+    assert kept == [0, 8, 9, 10]
+
+
+def test_plan_keeps_everything_within_budget():
+    messages = conversation(3)
+    counts = [1] * len(messages)
+    assert SlidingWindowStrategy().plan(messages, counts, budget=100) == list(
+        range(len(messages))
+    )
+
+
+def test_keep_first_n_pins_the_opening_turns():
+    messages = conversation(5)
+    kept = KeepFirstNStrategy(first_n=1).plan(messages, [1] * len(messages), budget=4)
+    assert kept == [0, 1, 9, 10]
+
+
+def test_tool_output_aware_never_starts_with_a_tool_output():
+    messages = [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "q"},
+        {"role": "assistant", "content": "call"},
+        {"role": "tool", "content": "out"},
+        {"role": "assistant", "content": "answer"},
+    ]
+    counts = [1, 1, 1, 1, 1]
+    assert SlidingWindowStrategy().plan(messages, counts, budget=3) == [0, 3, 4]
+    assert ToolOutputAwareStrategy().plan(messages, counts, budget=3) == [0, 4]
+
+
+def test_pinned_message_survives_truncation():
+    messages = conversation(5)
+    messages[1][PIN_KEY] = True
+    counts = [1] * len(messages)
+
+    truncated = apply_truncation(messages, counts, 3, PinnedMessageStrategy())
+    assert messages[1] in truncated
+    assert [m["content"] for m in truncated] == ["sys", "q0", "a4"]
+
+    dropped = apply_truncation(messages, counts, 3, SlidingWindowStrategy())
+    assert "q0" not in [m["content"] for m in dropped]
+
+
+def test_merge_consecutive_messages_joins_same_role_runs():
+    merged = merge_consecutive_messages(
+        [
+            {"role": "user", "content": "a"},
+            {"role": "user", "content": "b"},
+            {"role": "assistant", "content": "c"},
+        ]
+    )
+    assert merged == [
+        {"role": "user", "content": "a\nb"},
+        {"role": "assistant", "content": "c"},
+    ]
+
+
+def test_strip_pins_copies_only_pinned_messages():
+    plain = {"role": "user", "content": "a"}
+    pinned = {"role": "user", "content": "b", PIN_KEY: True}
+    stripped = strip_pins([plain, pinned])
+    assert stripped[0] is plain
+    assert stripped[1] == {"role": "user", "content": "b"}
+    assert PIN_KEY in pinned
+
+
+def test_context_cache_keeps_pin_flag():
+    rows = [
+        {"id": "m1", "created_at": 1, "role": "user", "content": "keep", PIN_KEY: True},
+        {"id": "m2", "created_at": 2, "role": "assistant", "content": "ok"},
+    ]
+
+    def normalize(messages):
+        return [
+            {k: v for k, v in m.items() if k in ("role", "content", PIN_KEY)}
+            for m in messages
+        ]
+
+    history, _ = ThreadContextCache().history(
+        "thread_1", load=lambda after, exclude: (list(rows), 2), normalize=normalize
+    )
+    assert history[0][PIN_KEY] is True
+    assert PIN_KEY not in history[1]
+
+
+def test_format_message_carries_pin_from_meta_data():
+    for module in ("sqlalchemy", "fastapi", "projectdavid_common"):
+        pytest.importorskip(module)
+    from entities_api.services.message_service import MessageService
+
+    def db_message(meta_data):
+        return types.SimpleNamespace(
+            role="user", tool_id=None, content="hi", meta_data=json.dumps(meta_data)
+        )
+
+    assert MessageService._format_message(db_message({"pinned": True}))[PIN_KEY]
+    assert PIN_KEY not in MessageService._format_message(db_message({}))
+
+
+def test_normalize_roles_keeps_pins_only_when_asked():
+    for module in ("openai", "together", "projectdavid", "sqlalchemy"):
+        pytest.importorskip(module)
+    from entities_api.inference.base_inference import BaseInference
+
+    history = [{"role": "user", "content": " hi ", PIN_KEY: True}]
+    assert BaseInference.normalize_roles(None, history) == [
+        {"role": "user", "content": "hi"}
+    ]
+    assert BaseInference.normalize_roles(None, history, keep_pins=True) == [
+        {"role": "user", "content": "hi", PIN_KEY: True}
+    ]
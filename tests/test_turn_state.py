@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from entities_api.inference.turn_state import begin_turn, current_turn
+
+CALL_A = {"name": "get_weather", "arguments": {"city": "Lisbon"}}
+CALL_B = {"name": "get_time", "arguments": {"zone": "UTC"}}
+
+
+def _run_turn(call):
+    """One run on a shared handler: stream (maybe a tool call), then resolve."""
+    begin_turn()
+    if call is not None:
+        current_turn().function_call = call
+        current_turn().tool_calls = [call]
+    return current_turn().function_call
+
+
+def test_back_to_back_runs_do_not_inherit_tool_calls():
+    assert _run_turn(CALL_A) == CALL_A
+    assert _run_turn(None) is None
+    assert current_turn().tool_calls == []
+
+
+def test_concurrent_runs_keep_their_own_tool_calls():
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def run(name, call):
+        begin_turn()
+        current_turn().function_call = call
+        barrier.wait()
+        seen[name] = current_turn().function_call
+
+    threads = [
+        threading.Thread(target=run, args=("a", CALL_A)),
+        threading.Thread(target=run, args=("b", CALL_B)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"a": CALL_A, "b": CALL_B}
+
+
+def test_async_run_shares_its_turn_with_its_worker_threads():
+    async def conversation(call):
+        begin_turn()
+        current_turn().function_call = call
+        await asyncio.sleep(0)
+        # Function calls are processed in a worker thread.
+        return await asyncio.to_thread(lambda: current_turn().function_call)
+
+    async def main():
+        return await asyncio.gather(conversation(CALL_A), conversation(CALL_B))
+
+    assert asyncio.run(main()) == [CALL_A, CALL_B]
+
+
+def test_base_inference_state_is_per_run():
+    for module in ("openai", "together", "projectdavid", "sqlalchemy"):
+        pytest.importorskip(module)
+    from entities_api.inference.base_inference import BaseInference
+
+    handler_cls = type(
+        "Handler",
+        (BaseInference,),
+        {name: lambda *a, **k: None for name in BaseInference.__abstractmethods__},
+    )
+    handler = object.__new__(handler_cls)
+
+    def run(call):
+        begin_turn()
+        if call is not None:
+            handler.set_function_call_state(call)
+            handler.set_tool_calls_state([call])
+        return handler.get_tool_calls_state()
+
+    assert run(CALL_A) == [CALL_A]
+    assert run(None) == []
+
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def concurrent(name, call):
+        begin_turn()
+        handler.set_function_call_state(call)
+        barrier.wait()
+        seen[name] = handler.get_function_call_state()
+
+    threads = [
+        threading.Thread(target=concurrent, args=("a", CALL_A)),
+        threading.Thread(target=concurrent, args=("b", CALL_B)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {"a": CALL_A, "b": CALL_B}